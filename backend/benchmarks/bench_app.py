@@ -0,0 +1,271 @@
+"""
+Benchmark celé aplikace: FastAPI app se spustí v tomto procesu (včetně
+lifespan) a požadavky jdou přes ASGI transport httpx, bez sítě. Měří se
+propustnost, latence (p50/p90/p99) a špičková paměť pro scénáře:
+
+- upload    POST /api/convert-email se syntetickým korpusem (viz synthetic_mailbox)
+- projects  GET /api/projects (inbox i ostatní)
+- listing   GET /api/projects/{projekt}/emails s různým řazením a stránkováním
+- search    GET /api/search
+
+Výsledky se uloží do JSON (--output) spolu s parametry korpusu, commitem
+a prostředím; --compare vypíše rozdíl proti dřívějšímu výsledku. Korpus je
+při stejném seedu vždy stejný, takže běhy před a po změně jsou srovnatelné.
+
+Výchozí --processes 0 spouští parsování ve vláknech hlavního procesu -
+špička RSS pak zahrnuje veškerou práci. S --processes N se měří i procesový
+pool, jeho špička paměti se vypíše po ukončení (RUSAGE_CHILDREN).
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.bench_app --messages 500 --concurrency 8 --output before.json
+    python -m benchmarks.bench_app --messages 500 --concurrency 8 --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from benchmarks import synthetic_mailbox  # noqa: E402
+
+# Počet projektů, do kterých se korpus rozdělí
+PROJECTS = 5
+
+# Metriky, které --compare porovnává (klíč, popis, True = vyšší je lepší)
+COMPARED = (
+    ("throughput", "req/s", True),
+    ("p50_ms", "p50 ms", False),
+    ("p99_ms", "p99 ms", False),
+    ("peak_rss_mb", "RSS MB", False),
+)
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentil metodou nejbližšího pořadí (hodnoty musí být seřazené)"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], statuses: Dict[int, int], elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "elapsed_s": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+
+async def run_scenario(
+    requests: List[Callable[[httpx.AsyncClient], Any]],
+    client: httpx.AsyncClient,
+    concurrency: int
+) -> Dict[str, Any]:
+    """Spustí požadavky s omezenou souběžností, vrátí souhrn latencí a status kódů"""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(request) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            response = await request(client)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(request) for request in requests))
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+
+def upload_requests(messages: List[Tuple[str, bytes]]) -> List[Callable]:
+    def upload(index: int, filename: str, raw: bytes):
+        return lambda client: client.post(
+            "/api/convert-email",
+            files={"file": (filename, raw, "message/rfc822")},
+            data={"project_name": f"bench_{index % PROJECTS}"}
+        )
+    return [upload(i, filename, raw) for i, (filename, raw) in enumerate(messages)]
+
+
+def listing_requests(repeat: int) -> List[Callable]:
+    variants = [
+        {"sort": "date", "order": "desc", "limit": 50},
+        {"sort": "date", "order": "desc", "offset": 50, "limit": 50},
+        {"sort": "subject", "order": "asc", "limit": 50},
+        {"sort": "from", "order": "asc", "limit": 50, "has_attachments": "true"},
+        {"domain": "firma.cz", "limit": 50},
+    ]
+    requests = []
+    for i in range(repeat):
+        params = variants[i % len(variants)]
+        project = f"bench_{i % PROJECTS}"
+        requests.append(lambda client, p=project, q=params: client.get(f"/api/projects/{p}/emails", params=q))
+    return requests
+
+
+def project_requests(repeat: int) -> List[Callable]:
+    return [
+        lambda client, i=i: client.get("/api/projects", params={"include_others": str(i % 2 == 1).lower()})
+        for i in range(repeat)
+    ]
+
+
+def search_requests(repeat: int) -> List[Callable]:
+    queries = ["faktura", "nabidku smlouvu", "reklam", "zluťoučký kůň", "invoice report"]
+    return [lambda client, q=queries[i % len(queries)]: client.get("/api/search", params={"q": q}) for i in range(repeat)]
+
+
+def load_corpus(args: argparse.Namespace) -> Tuple[List[Tuple[str, bytes]], Dict[str, Any]]:
+    """Načte .eml z --corpus, nebo vygeneruje syntetický korpus z parametrů"""
+    if args.corpus:
+        paths = sorted(Path(args.corpus).glob("*.eml"))[:args.messages or None]
+        messages = [(path.name, path.read_bytes()) for path in paths]
+        return messages, {"corpus": str(args.corpus), "messages": len(messages)}
+    options = synthetic_mailbox.options_from_args(args)
+    messages = list(synthetic_mailbox.generate(args.messages, args.seed, **options))
+    return messages, {"messages": args.messages, "seed": args.seed, **options}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(args: argparse.Namespace, messages: List[Tuple[str, bytes]]) -> Dict[str, Any]:
+    # main.py čte konfiguraci z prostředí při importu
+    import main
+
+    scenarios: Dict[str, Dict[str, Any]] = {}
+    async with main.lifespan(main.app):
+        # Zahřát pool (start procesů se nepočítá do měření)
+        await main.worker_pool.run_cpu(os.getpid)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            plan = [
+                ("upload", upload_requests(messages)),
+                ("projects", project_requests(args.repeat)),
+                ("listing", listing_requests(args.repeat)),
+                ("search", search_requests(args.repeat)),
+            ]
+            for name, requests in plan:
+                if args.scenarios and name not in args.scenarios:
+                    if name == "upload":
+                        # Ostatní scénáře potřebují nahrané emaily - nahrát bez měření
+                        await run_scenario(requests, client, args.concurrency)
+                    continue
+                scenarios[name] = await run_scenario(requests, client, args.concurrency)
+                print_row(name, scenarios[name])
+    return scenarios
+
+
+def print_row(name: str, stats: Dict[str, Any]) -> None:
+    statuses = " ".join(f"{code}:{count}" for code, count in stats["statuses"].items())
+    print(f"  {name:<9} {stats['requests']:6d} req  {stats['throughput']:8.1f} req/s  "
+          f"p50 {stats['p50_ms']:8.1f} ms  p90 {stats['p90_ms']:8.1f} ms  p99 {stats['p99_ms']:8.1f} ms  "
+          f"RSS {stats['peak_rss_mb']:7.1f} MB  [{statuses}]")
+
+
+def print_comparison(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    print(f"\nPorovnání s {baseline['meta'].get('commit') or '?'} ({baseline['meta'].get('timestamp', '?')}):")
+    for key in ("corpus", "concurrency", "repeat", "processes"):
+        # Tuple z parametrů korpusu je v uloženém JSON seznam
+        if json.loads(json.dumps(current["meta"][key])) != baseline["meta"].get(key):
+            print(f"  [WARNING] Jiné nastavení '{key}' než u porovnávaného běhu - výsledky nejsou přímo srovnatelné")
+    for name, stats in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        cells = []
+        for key, label, higher_is_better in COMPARED:
+            old, new = before.get(key), stats.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            # Změny pod 5 % jsou běžný šum, neoznačují se
+            better = change > 0 if higher_is_better else change < 0
+            marker = " " if abs(change) < 5 else "+" if better else "-"
+            cells.append(f"{label} {old:.1f} -> {new:.1f} ({change:+.1f} %){marker}")
+        print(f"  {name:<9} " + "   ".join(cells))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    synthetic_mailbox.add_arguments(parser)
+    parser.add_argument("--corpus", type=Path, help="adresář s .eml místo syntetického korpusu")
+    parser.add_argument("--concurrency", type=int, default=4, help="souběžné požadavky")
+    parser.add_argument("--repeat", type=int, default=200, help="počet požadavků u projects/listing/search")
+    parser.add_argument("--processes", type=int, default=0, help="CONVERT_PROCESSES (0 = vlákna v tomto procesu)")
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), help="jen vybrané scénáře, např. upload,listing")
+    parser.add_argument("--output", type=Path, help="uložit výsledek do JSON")
+    parser.add_argument("--compare", type=Path, help="JSON s dřívějším výsledkem pro porovnání")
+    args = parser.parse_args()
+
+    messages, corpus = load_corpus(args)
+    corpus["total_bytes"] = sum(len(raw) for _, raw in messages)
+    print(f"Korpus: {len(messages)} zpráv, {corpus['total_bytes'] / 1024 / 1024:.1f} MB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["ROOT_FOLDER"] = tmp
+        os.environ["CONVERT_PROCESSES"] = str(args.processes)
+        # Benchmark nemá narážet na ochranu proti přetížení
+        os.environ["MAX_PENDING_CONVERSIONS"] = str(max(args.concurrency, 1) * 4)
+        os.environ.setdefault("MAX_UPLOAD_SIZE_MB", "0")
+        scenarios = asyncio.run(run_benchmark(args, messages))
+
+    if args.processes:
+        print(f"  špička RSS procesů poolu: {peak_rss_mb(resource.RUSAGE_CHILDREN):.1f} MB")
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "repeat": args.repeat,
+            "processes": args.processes,
+            "pool_peak_rss_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1) if args.processes else None,
+            "corpus": corpus
+        },
+        "scenarios": scenarios
+    }
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Výsledek uložen do {args.output}")
+    if args.compare:
+        print_comparison(json.loads(args.compare.read_text(encoding="utf-8")), result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark extrakce velké přílohy: původní mailparser (celá zpráva v paměti,
+base64 payload jako string + b64decode) proti streamovanému dekódování
+MimeExtractorem do souboru. Každá varianta běží v samostatném procesu,
+měří se čas a špičková RSS paměť procesu.
+
+Výchozí velikost přílohy je 200 MB - ověřuje, že špička paměti nezávisí na
+velikosti přílohy a že dekódovaný soubor odpovídá originálu (SHA-256).
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.bench_attachments --size-mb 200
+    python -m benchmarks.bench_attachments --size-mb 200 --skip-legacy
+"""
+import argparse
+import base64
+import hashlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.email_processor import parse_eml_file, peak_rss_mb  # noqa: E402
+
+
+def build_eml(path: Path, size_mb: int) -> str:
+    """Zapíše .eml s jednou base64 přílohou po blocích (bez držení přílohy v paměti), vrátí její SHA-256"""
+    digest = hashlib.sha256()
+    chunk_size = 57 * 1024 * 16  # násobek 57 bajtů = celé 76znakové řádky base64
+    remaining = size_mb * 1024 * 1024
+    with open(path, "wb") as f:
+        f.write(
+            b"From: sender@example.com\r\n"
+            b"To: recipient@example.com\r\n"
+            b"Subject: Velka priloha\r\n"
+            b"Date: Tue, 06 Jan 2026 14:17:30 +0100\r\n"
+            b"MIME-Version: 1.0\r\n"
+            b'Content-Type: multipart/mixed; boundary="bench-boundary"\r\n\r\n'
+            b"--bench-boundary\r\n"
+            b"Content-Type: text/plain; charset=utf-8\r\n\r\n"
+            b"Priloha v priloze.\r\n"
+            b"--bench-boundary\r\n"
+            b"Content-Type: application/octet-stream\r\n"
+            b"Content-Transfer-Encoding: base64\r\n"
+            b'Content-Disposition: attachment; filename="velka.bin"\r\n\r\n'
+        )
+        while remaining > 0:
+            chunk = os.urandom(min(chunk_size, remaining))
+            remaining -= len(chunk)
+            digest.update(chunk)
+            f.write(base64.encodebytes(chunk).replace(b"\n", b"\r\n"))
+        f.write(b"--bench-boundary--\r\n")
+    return digest.hexdigest()
+
+
+def run_legacy(eml_path: Path, queue) -> None:
+    """Původní cesta - mailparser načte celou zprávu, payload se dekóduje z base64 stringu"""
+    import mailparser
+    start = time.perf_counter()
+    mail = mailparser.parse_from_file(str(eml_path))
+    payload = base64.b64decode(mail.attachments[0]["payload"])
+    sha256 = hashlib.sha256(payload).hexdigest()
+    queue.put((time.perf_counter() - start, peak_rss_mb(), sha256))
+
+
+def run_streaming(eml_path: Path, queue) -> None:
+    """Nová cesta - parse_eml_file se streamovanou extrakcí příloh do stagingu"""
+    start = time.perf_counter()
+    email_data = parse_eml_file(eml_path, eml_path.parent / "staging")
+    elapsed = time.perf_counter() - start
+    staged = email_data._attachment_files[0]
+    digest = hashlib.sha256()
+    with open(staged, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    staged.unlink()
+    queue.put((elapsed, peak_rss_mb(), digest.hexdigest()))
+
+
+def measure(label: str, target, eml_path: Path, expected_sha256: str) -> None:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=target, args=(eml_path, queue))
+    process.start()
+    elapsed, peak, sha256 = queue.get()
+    process.join()
+    status = "OK" if sha256 == expected_sha256 else "ŠPATNÝ OBSAH"
+    print(f"  {label:<10} {elapsed:7.2f} s   špička RSS {peak:8.1f} MB   {status}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=200, help="velikost přílohy v MB")
+    parser.add_argument("--skip-legacy", action="store_true", help="neměřit původní cestu (potřebuje několik GB RAM)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        eml_path = Path(tmp) / "velka.eml"
+        expected_sha256 = build_eml(eml_path, args.size_mb)
+        print(f"příloha {args.size_mb} MB, .eml {eml_path.stat().st_size / 1024 / 1024:.1f} MB")
+        measure("streaming", run_streaming, eml_path, expected_sha256)
+        if not args.skip_legacy:
+            measure("mailparser", run_legacy, eml_path, expected_sha256)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark dávkového importu mbox souboru přes BatchImporter.
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.bench_batch --messages 2000 --processes 4 --concurrency 8
+"""
+import argparse
+import asyncio
+import mailbox
+import sys
+import tempfile
+import time
+from email.message import EmailMessage
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.batch_importer import BatchImporter, iter_path_messages  # noqa: E402
+from services.email_processor import EmailProcessor  # noqa: E402
+from services.worker_pool import WorkerPool  # noqa: E402
+
+
+def build_mbox(path: Path, messages: int) -> None:
+    """Vytvoří mbox s různými zprávami (unikátní předmět, aby nevznikaly duplicity)"""
+    box = mailbox.mbox(str(path))
+    for i in range(messages):
+        msg = EmailMessage()
+        msg["Subject"] = f"Zpráva číslo {i}"
+        msg["From"] = f"user{i % 50}@example.com"
+        msg["To"] = "archive@example.com"
+        msg["Date"] = f"Tue, 06 Jan 2026 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d} +0100"
+        msg.set_content(f"Tělo zprávy {i}\n" * 20)
+        box.add(msg)
+    box.flush()
+    box.close()
+
+
+async def run(mbox_path: Path, output: Path, processes: int, concurrency: int) -> None:
+    pool = WorkerPool(processes=processes)
+    processor = EmailProcessor(str(output), pool=pool)
+    importer = BatchImporter(processor, concurrency=concurrency)
+    await pool.run_cpu(sum, [])
+
+    start = time.perf_counter()
+    counts = {}
+    async for result in importer.run(iter_path_messages(mbox_path), "bench_batch"):
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+
+    total = sum(counts.values())
+    print(f"{total} zpráv za {elapsed:.2f} s = {total / elapsed:.1f} zpráv/s, statusy {counts}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mbox_path = Path(tmp) / "bench.mbox"
+        build_mbox(mbox_path, args.messages)
+        asyncio.run(run(mbox_path, Path(tmp) / "output", args.processes, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Zátěžový test souběžných konverzí přes WorkerPool.
+
+Pro různé počty procesů spustí N souběžných konverzí (HTML emaily, které
+se převádí přes markdownify) a měří propustnost a maximální zpoždění event
+loopu - to odpovídá tomu, jak dlouho by čekal např. /health.
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.bench_concurrency --emails 32 --processes 0,1,2,4
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from email.message import EmailMessage
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.email_processor import EmailProcessor  # noqa: E402
+from services.worker_pool import WorkerPool  # noqa: E402
+
+
+def build_html_eml(path: Path, index: int, rows: int) -> None:
+    """Vytvoří .eml jen s HTML tělem (velká tabulka), aby se konvertoval markdownify"""
+    msg = EmailMessage()
+    msg["Subject"] = f"Newsletter {index}"
+    msg["From"] = "news@example.com"
+    msg["To"] = "recipient@example.com"
+    msg["Date"] = f"Tue, 06 Jan 2026 14:{index // 60 % 60:02d}:{index % 60:02d} +0100"
+    table = "".join(f"<tr><td><b>Řádek {i}</b></td><td><a href='https://example.com/{i}'>odkaz</a></td></tr>"
+                    for i in range(rows))
+    msg.set_content(f"<html><body><table>{table}</table></body></html>", subtype="html")
+    path.write_bytes(msg.as_bytes())
+
+
+async def event_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Měří maximální zpoždění event loopu oproti očekávanému probuzení"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run(processes: int, eml_paths, output: Path) -> None:
+    pool = WorkerPool(processes=processes, max_pending=len(eml_paths))
+    processor = EmailProcessor(str(output), pool=pool)
+
+    async def convert(eml_path: Path, index: int) -> None:
+        # Každá konverze dostane vlastní kopii, protože convert_and_save temp soubor maže
+        temp_path = processor.temp_dir / f"bench_{processes}_{index}.eml"
+        shutil.copyfile(eml_path, temp_path)
+        async with pool.slot():
+            email_data = await processor.parse_email(temp_path)
+            await processor.convert_and_save(temp_path, email_data, f"bench_{processes}")
+
+    # Zahřát pool (start procesů se nepočítá do měření)
+    await pool.run_cpu(os.getpid)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(event_loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(convert(p, i) for i, p in enumerate(eml_paths)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lag = await lag_task
+    pool.shutdown()
+
+    label = f"processes={processes}" if processes else "threads"
+    print(f"{label:<14} {elapsed:7.2f} s   {len(eml_paths) / elapsed:7.1f} emailů/s   "
+          f"max lag event loopu {lag * 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=1500, help="počet řádků HTML tabulky v emailu")
+    parser.add_argument("--processes", default=f"0,1,{os.cpu_count() or 1}",
+                        help="čárkou oddělené počty procesů (0 = vlákna)")
+    args = parser.parse_args()
+
+    print(f"CPU: {os.cpu_count()}")
+    with tempfile.TemporaryDirectory() as tmp:
+        eml_paths = []
+        for i in range(args.emails):
+            path = Path(tmp) / f"mail_{i}.eml"
+            build_html_eml(path, i, args.rows)
+            eml_paths.append(path)
+        for processes in [int(p) for p in args.processes.split(",")]:
+            asyncio.run(run(processes, eml_paths, Path(tmp) / "output"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Mikro-benchmark čtení YAML front-matter z .md souboru: původní čtení celého
+souboru + split + yaml.safe_load proti read_front_matter (čtení jen hlavičky,
+CSafeLoader, pokud je k dispozici).
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.bench_front_matter --body-kb 10,100,500
+"""
+import argparse
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services import email_index  # noqa: E402
+from services.email_index import read_front_matter  # noqa: E402
+
+
+class CountingFile(io.FileIO):
+    """Soubor, který počítá skutečně přečtené bajty"""
+    bytes_read = 0
+
+    def readinto(self, buffer):
+        count = super().readinto(buffer)
+        CountingFile.bytes_read += count or 0
+        return count
+
+    def readall(self):
+        data = super().readall()
+        CountingFile.bytes_read += len(data)
+        return data
+
+
+def counting_open(path, mode='r', encoding=None, **kwargs):
+    raw = CountingFile(path, 'r')
+    buffered = io.BufferedReader(raw)
+    if 'b' in mode:
+        return buffered
+    return io.TextIOWrapper(buffered, encoding=encoding)
+
+
+def legacy_read(md_path: Path):
+    """Původní chování get_project_emails"""
+    with counting_open(md_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if content.startswith('---'):
+        parts = content.split('---', 2)
+        if len(parts) >= 3:
+            return yaml.safe_load(parts[1].strip())
+    return None
+
+
+def measure(label: str, func, md_path: Path, repeat: int) -> None:
+    CountingFile.bytes_read = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(md_path)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<16} {elapsed / repeat * 1e6:9.1f} µs/soubor   {CountingFile.bytes_read / repeat:12.0f} B/soubor")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--body-kb", default="10,100,500", help="čárkou oddělené velikosti těla v kB")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"YAML loader: {email_index.yaml_loader().__name__}")
+    front_matter = {
+        "subject": "Re: Fwd: Nabídka",
+        "from": "sender@example.com",
+        "to": ["a@example.com", "b@example.com"],
+        "cc": ["c@example.com"],
+        "date": "2026-01-06T14:17:30",
+        "attachments": ["nabidka.pdf", "logo.png"]
+    }
+    # Původní implementace používá vestavěné open, nová také - obě se přesměrují na počítadlo
+    email_index.open = counting_open
+    with tempfile.TemporaryDirectory() as tmp:
+        for body_kb in [int(b) for b in args.body_kb.split(",")]:
+            md_path = Path(tmp) / f"email_{body_kb}.md"
+            with open(md_path, "w", encoding="utf-8") as f:
+                f.write("---\n")
+                f.write(yaml.dump(front_matter, allow_unicode=True, default_flow_style=False))
+                f.write("---\n\n")
+                f.write("> citovaný text předchozí zprávy\n" * (body_kb * 1024 // 34))
+            print(f"tělo {body_kb} kB:")
+            measure("celý soubor", legacy_read, md_path, args.repeat)
+            measure("jen hlavička", read_front_matter, md_path, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
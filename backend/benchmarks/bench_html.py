@@ -0,0 +1,134 @@
+"""
+Benchmark převodu HTML těla na Markdown: původní markdownify s html.parser
+proti enginům z services.html_converter - propustnost a věrnost výstupu.
+
+Korpus: adresář s .html nebo .eml soubory (skutečné newslettery, exporty
+z poštovního klienta). Bez --corpus se vygenerují syntetické marketingové
+emaily s vnořenými tabulkami, inline styly, <style> bloky a sledovacími pixely.
+
+Věrnost = podíl slov referenční konverze (markdownify + html.parser, bez
+obsahu <head>, <style> a <script>), která se objeví i ve výstupu enginu.
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.bench_html --corpus ~/newslettery
+    python -m benchmarks.bench_html --messages 20 --rows 400
+"""
+import argparse
+import re
+import sys
+import time
+from collections import Counter
+from email import policy
+from email.parser import BytesParser
+from pathlib import Path
+from typing import List, Tuple
+
+import markdownify
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services import html_converter  # noqa: E402
+from services.html_converter import LXML_AVAILABLE, _convert  # noqa: E402
+
+
+def build_marketing_html(index: int, rows: int) -> str:
+    """Newsletter ve stylu e-mailových editorů - tabulkové layouty a inline styly"""
+    style = "<style>" + "".join(f".c{i}{{color:#{i:06x};padding:{i % 9}px}}" for i in range(300)) + "</style>"
+    cells = []
+    for row in range(rows):
+        cells.append(
+            '<tr><td style="padding:0;margin:0;font-family:Arial,sans-serif" align="center">'
+            '<table width="100%" cellpadding="0" cellspacing="0" border="0"><tr>'
+            f'<td class="c{row % 300}" style="font-size:14px;line-height:20px">'
+            f'<a href="https://shop.example.com/p/{index}/{row}?utm_source=newsletter">Produkt {row}</a> '
+            f'za skvělou cenu {row * 10} Kč - nabídka platí jen do pátku</td>'
+            '<td width="120"><img src="https://cdn.example.com/img.png" width="120" height="80" alt="produkt"></td>'
+            '</tr></table></td></tr>'
+        )
+    return (
+        f"<html><head><meta charset='utf-8'>{style}</head><body>"
+        "<!--[if mso]><table><tr><td><![endif]-->"
+        f"<h1>Akce týdne č. {index}</h1>"
+        '<table width="600" align="center" cellpadding="0" cellspacing="0">' + "".join(cells) + "</table>"
+        '<img src="https://track.example.com/open.gif" width="1" height="1" style="display:block">'
+        "<script>track()</script></body></html>"
+    )
+
+
+def load_corpus(corpus: Path) -> List[Tuple[str, str]]:
+    """Načte HTML z .html souborů a HTML části .eml souborů"""
+    documents = []
+    for path in sorted(corpus.rglob("*")):
+        if path.suffix.lower() in (".html", ".htm"):
+            documents.append((path.name, path.read_text(encoding="utf-8", errors="replace")))
+        elif path.suffix.lower() == ".eml":
+            with open(path, "rb") as f:
+                message = BytesParser(policy=policy.default).parse(f)
+            part = message.get_body(preferencelist=("html",))
+            if part is not None:
+                documents.append((path.name, part.get_content()))
+    return documents
+
+
+def reference_words(html: str) -> Counter:
+    """Slova viditelného obsahu podle původní konverze"""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["head", "style", "script"]):
+        tag.decompose()
+    return words(markdownify.MarkdownConverter(heading_style="ATX").convert_soup(soup))
+
+
+def words(text: str) -> Counter:
+    return Counter(re.findall(r"\w+", text.lower()))
+
+
+def fidelity(reference: Counter, output: str) -> float:
+    total = sum(reference.values())
+    if not total:
+        return 1.0
+    return sum((reference & words(output)).values()) / total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, help="adresář s .html/.eml soubory")
+    parser.add_argument("--messages", type=int, default=10, help="počet syntetických emailů")
+    parser.add_argument("--rows", type=int, default=300, help="počet řádků tabulky syntetického emailu")
+    parser.add_argument("--max-size-kb", type=int, default=html_converter.DEFAULT_MAX_HTML_SIZE // 1024,
+                        help="limit HTML pro plnou konverzi (0 = bez limitu)")
+    args = parser.parse_args()
+
+    if args.corpus:
+        documents = load_corpus(args.corpus)
+    else:
+        documents = [(f"synthetic_{i}", build_marketing_html(i, args.rows)) for i in range(args.messages)]
+    if not documents:
+        print("Korpus neobsahuje žádné HTML")
+        return
+    total_mb = sum(len(html.encode("utf-8")) for _, html in documents) / 1024 / 1024
+    print(f"{len(documents)} dokumentů, {total_mb:.1f} MB HTML, lxml: {'ano' if LXML_AVAILABLE else 'není nainstalováno'}")
+
+    references = [reference_words(html) for _, html in documents]
+    start = time.perf_counter()
+    outputs = [markdownify.markdownify(html, heading_style="ATX") for _, html in documents]
+    legacy = time.perf_counter() - start
+    score = sum(fidelity(ref, out) for ref, out in zip(references, outputs)) / len(outputs)
+    print(f"  {'původní (markdownify)':<24} {legacy * 1000:9.1f} ms {total_mb / legacy:8.2f} MB/s   věrnost {score * 100:5.1f} %")
+
+    engines = ["lxml", "html.parser", "text"] if LXML_AVAILABLE else ["html.parser", "text"]
+    max_size = args.max_size_kb * 1024
+    # Bez limitu každý engine, s limitem automatický výběr (jak běží v aplikaci)
+    runs = [(engine, engine, 0) for engine in engines]
+    runs.append((f"{html_converter.resolve_engine('auto')} + limit {args.max_size_kb} kB",
+                 html_converter.resolve_engine("auto"), max_size))
+    for label, engine, limit in runs:
+        start = time.perf_counter()
+        outputs = [_convert(html, engine, limit) for _, html in documents]
+        elapsed = time.perf_counter() - start
+        score = sum(fidelity(ref, out) for ref, out in zip(references, outputs)) / len(outputs)
+        print(f"  {label:<24} {elapsed * 1000:9.1f} ms {total_mb / elapsed:8.2f} MB/s   věrnost {score * 100:5.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark výpisu emailů projektu: původní parsování všech .md souborů
+proti indexu metadat (EmailIndex) - první sestavení a běžný (teplý) dotaz.
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.bench_listing --messages 10000,100000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.email_index import EmailIndex, read_front_matter  # noqa: E402
+
+
+def build_project(project_path: Path, messages: int, body_kb: int) -> None:
+    """Vytvoří projekt s .md soubory ve stejném formátu, jaký zapisuje convert_and_save"""
+    project_path.mkdir(parents=True, exist_ok=True)
+    body = ("Lorem ipsum dolor sit amet. " * 40 + "\n") * max(1, body_kb)
+    for i in range(messages):
+        front_matter = {
+            "subject": f"Zpráva {i}",
+            "from": f"user{i % 100}@example.com",
+            "to": ["archive@example.com"],
+            "cc": [],
+            "date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}T{i % 24:02d}:{i % 60:02d}:00",
+            "attachments": []
+        }
+        with open(project_path / f"{i:07d}_zprava.md", "w", encoding="utf-8") as f:
+            f.write("---\n")
+            f.write(yaml.dump(front_matter, allow_unicode=True, default_flow_style=False))
+            f.write("---\n\n")
+            f.write(body)
+
+
+def full_parse(project_path: Path) -> int:
+    """Původní chování - přečíst a naparsovat každý soubor"""
+    count = 0
+    for md_file in project_path.glob("*.md"):
+        if read_front_matter(md_file) is not None:
+            count += 1
+    return count
+
+
+def timed(label: str, func) -> None:
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    count = result if isinstance(result, int) else len(result)
+    print(f"  {label:<22} {elapsed * 1000:10.1f} ms  ({count} emailů)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", default="10000", help="čárkou oddělené počty emailů")
+    parser.add_argument("--body-kb", type=int, default=4, help="přibližná velikost těla emailu v kB")
+    args = parser.parse_args()
+
+    for messages in [int(m) for m in args.messages.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            project_path = Path(tmp) / "projekt"
+            build_project(project_path, messages, args.body_kb)
+            print(f"{messages} emailů:")
+            index = EmailIndex(project_path)
+            timed("full parse", lambda: full_parse(project_path))
+            timed("index (sestavení)", index.list_emails)
+            timed("index (teplý)", index.list_emails)
+
+
+if __name__ == "__main__":
+    main()
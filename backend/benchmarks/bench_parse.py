@@ -0,0 +1,90 @@
+"""
+Benchmark parsování .eml: původní dvouprůchodová cesta (parse_email + znovu
+mailparser v convert_and_save) proti jednomu průchodu.
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.bench_parse --attachments 20 --attachment-size 2
+"""
+import argparse
+import asyncio
+import base64
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from email.message import EmailMessage
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mailparser  # noqa: E402
+
+from services.email_processor import EmailProcessor  # noqa: E402
+
+
+def build_eml(path: Path, attachments: int, attachment_size_mb: float) -> None:
+    """Vytvoří syntetický .eml s HTML tělem a binárními přílohami"""
+    msg = EmailMessage()
+    msg["Subject"] = "Benchmark newsletter"
+    msg["From"] = "sender@example.com"
+    msg["To"] = "recipient@example.com"
+    msg["Date"] = "Tue, 06 Jan 2026 14:17:30 +0100"
+    msg.set_content("Plain text body\n" * 200)
+    msg.add_alternative("<html><body>" + "<p>HTML body</p>" * 2000 + "</body></html>", subtype="html")
+    size = int(attachment_size_mb * 1024 * 1024)
+    for i in range(attachments):
+        msg.add_attachment(os.urandom(size), maintype="application", subtype="octet-stream",
+                           filename=f"priloha_{i}.bin")
+    path.write_bytes(msg.as_bytes())
+
+
+async def single_pass(processor: EmailProcessor, eml_path: Path) -> None:
+    """Nové chování - metadata i dekódované přílohy (streamovaně do stagingu) z jednoho parsování"""
+    email_data = await processor.parse_email(eml_path)
+    for staged_path in email_data._attachment_files:
+        if staged_path is not None:
+            staged_path.unlink()
+
+
+async def two_pass(processor: EmailProcessor, eml_path: Path) -> None:
+    """Původní chování - metadata z parse_email, payloady z druhého parsování"""
+    await single_pass(processor, eml_path)
+    mail = mailparser.parse_from_file(str(eml_path))
+    for att in mail.attachments:
+        if att["binary"]:
+            base64.b64decode(att["payload"])
+
+
+def measure(label: str, func, processor: EmailProcessor, eml_path: Path, repeat: int) -> None:
+    timings = []
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        asyncio.run(func(processor, eml_path))
+        timings.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    best = min(timings)
+    print(f"{label:<12} best {best * 1000:8.1f} ms   peak {peak / 1024 / 1024:8.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attachments", type=int, default=20, help="počet příloh")
+    parser.add_argument("--attachment-size", type=float, default=1.0, help="velikost přílohy v MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        eml_path = Path(tmp) / "bench.eml"
+        build_eml(eml_path, args.attachments, args.attachment_size)
+        print(f".eml velikost: {eml_path.stat().st_size / 1024 / 1024:.1f} MB")
+        processor = EmailProcessor(str(Path(tmp) / "output"))
+        measure("two-pass", two_pass, processor, eml_path, args.repeat)
+        measure("single-pass", single_pass, processor, eml_path, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
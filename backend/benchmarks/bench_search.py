@@ -0,0 +1,82 @@
+"""
+Benchmark fulltextového hledání (SearchIndex, SQLite FTS5): naplnění indexu
+a doba dotazů nad N emaily. Řazení podle relevance počítá bm25 pro každý
+odpovídající email - dotaz na slovo, které je skoro ve všech emailech
+(zde první výplňové slovo), je proto řádově pomalejší než běžný dotaz.
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.bench_search --messages 100000
+"""
+import argparse
+import itertools
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.search_index import SearchIndex  # noqa: E402
+
+WORDS = (
+    "nabídka faktura schůzka smlouva objednávka dodávka termín cena sleva projekt "
+    "příloha návrh rozpočet zpráva reklamace servis údržba výpověď kontrola audit "
+    "meeting invoice contract delivery budget report review deadline update request"
+).split()
+
+# Slovník se Zipfovým rozdělením - nejčastější jsou výplňová slova (jako
+# spojky a předložky), věcná slova jsou ve střední části, takže dotaz
+# odpovídá jen části emailů jako ve skutečné poště
+FILLER = list(dict.fromkeys("".join(random.Random(n).choices(string.ascii_lowercase, k=7)) for n in range(20000)))
+VOCABULARY = FILLER[:100] + WORDS + FILLER[100:]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+QUERIES = ["faktura", "nabidka sleva", "smlou", "REKLAMACE servis", "audit report 2025", "user42", FILLER[1234], FILLER[0]]
+
+
+def build_index(index: SearchIndex, messages: int, body_words: int) -> None:
+    rng = random.Random(42)
+    (index.root_path / "projekt").mkdir(parents=True, exist_ok=True)
+    with index._connect() as conn:
+        for i in range(messages):
+            front_matter = {
+                "subject": " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=5)),
+                "from": f"user{i % 1000}@example.com",
+                "to": ["archive@example.com"],
+                "cc": [],
+                "date": f"{2020 + i % 6}-{i % 12 + 1:02d}-{i % 28 + 1:02d}T10:00:00"
+            }
+            body = " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=body_words)) + f" {2020 + i % 6}"
+            index._upsert(conn, "projekt", f"{i:07d}.md", front_matter, body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--body-words", type=int, default=200, help="počet slov v těle emailu")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SearchIndex(tmp)
+        start = time.perf_counter()
+        build_index(index, args.messages, args.body_words)
+        elapsed = time.perf_counter() - start
+        size_mb = index.index_path.stat().st_size / 1024 / 1024
+        print(f"{args.messages} emailů zaindexováno za {elapsed:.1f} s, index {size_mb:.1f} MB")
+
+        for query in QUERIES:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                result = index.search(query, limit=20)
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            print(f"  {query!r:<24} median {timings[len(timings) // 2] * 1000:8.1f} ms   "
+                  f"max {timings[-1] * 1000:8.1f} ms   ({result['total']} výsledků)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Benchmark studeného startu: import aplikace a doba do první odpovědi.
+
+- import    `python -X importtime -c "import main"` v čerstvém procesu (--runs krát),
+            vypíše medián celkové doby importu main a nejpomalejší moduly
+            (kumulativně a vlastní čas) z posledního běhu
+- startup   spustí uvicorn jako samostatný proces a měří, za jak dlouho
+            odpoví /health a jak dlouho pak trvá první konverze emailu -
+            s WARM_UP=true (knihovny konverze se načítají na pozadí) i false;
+            --delay-ms odloží první konverzi (čas, který má zahřátí k dispozici)
+
+Výsledky lze uložit do JSON (--output) a porovnat před a po změně importů.
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --runs 5 --top 30 --output startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from benchmarks import synthetic_mailbox  # noqa: E402
+from benchmarks.bench_app import git_commit  # noqa: E402
+
+BACKEND_PATH = Path(__file__).resolve().parent.parent
+
+# Řádek výstupu -X importtime: "import time: <vlastní µs> | <kumulativní µs> | <odsazení><modul>"
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Jak dlouho čekat na /health a na první konverzi
+STARTUP_TIMEOUT = 60.0
+
+
+def app_env(root_folder: str, processes: int, **extra: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(ROOT_FOLDER=root_folder, CONVERT_PROCESSES=str(processes), **extra)
+    return env
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """Vrátí (modul, úroveň zanoření, vlastní µs, kumulativní µs) pro každý importovaný modul"""
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            modules.append((match.group(4), len(match.group(3)) // 2, int(match.group(1)), int(match.group(2))))
+    return modules
+
+
+def measure_import(root_folder: str, processes: int) -> List[Tuple[str, int, int, int]]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_PATH, env=app_env(root_folder, processes), capture_output=True, text=True, check=True
+    )
+    return parse_importtime(completed.stderr)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_startup(
+    root_folder: str, processes: int, warm_up: bool, message: bytes, delay: float = 0.0
+) -> Dict[str, float]:
+    """Spustí uvicorn, změří dobu do první odpovědi /health a trvání první konverze"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_PATH, env=app_env(root_folder, processes, WARM_UP=str(warm_up).lower()),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=base_url, timeout=STARTUP_TIMEOUT) as client:
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"Server skončil s kódem {server.returncode}")
+                if time.perf_counter() - start > STARTUP_TIMEOUT:
+                    raise RuntimeError("Server neodpověděl na /health")
+                try:
+                    if client.get("/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            health_ms = (time.perf_counter() - start) * 1000
+            time.sleep(delay)
+
+            convert_start = time.perf_counter()
+            response = client.post(
+                "/api/convert-email",
+                files={"file": ("startup.eml", message, "message/rfc822")},
+                data={"project_name": f"startup_{port}"}
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"Konverze vrátila {response.status_code}: {response.text[:200]}")
+            first_convert_ms = (time.perf_counter() - convert_start) * 1000
+    finally:
+        server.terminate()
+        server.wait()
+    return {"health_ms": round(health_ms, 1), "first_convert_ms": round(first_convert_ms, 1)}
+
+
+def main_imports(modules: List[Tuple[str, int, int, int]]) -> List[Tuple[str, int, int, int]]:
+    """
+    Moduly importované přímo z main. importtime vypisuje potomky před rodičem,
+    takže jsou to moduly úrovně 1 mezi předchozím modulem nejvyšší úrovně
+    (importy při startu interpretu - site) a samotným main.
+    """
+    position = max(index for index, module in enumerate(modules) if module[0] == "main" and module[1] == 0)
+    direct = []
+    for module in reversed(modules[:position]):
+        if module[1] == 0:
+            break
+        if module[1] == 1:
+            direct.append(module)
+    return direct
+
+
+def print_modules(modules: List[Tuple[str, int, int, int]], top: int) -> None:
+    print(f"\n  Nejpomalejší importy přímo z main (kumulativně, top {top}):")
+    direct = sorted(main_imports(modules), key=lambda m: m[3], reverse=True)
+    for name, _, _, cumulative in direct[:top]:
+        print(f"    {cumulative / 1000:8.1f} ms  {name}")
+    print(f"\n  Největší vlastní čas modulu (top {top}):")
+    for name, _, self_us, _ in sorted(modules, key=lambda m: m[2], reverse=True)[:top]:
+        print(f"    {self_us / 1000:8.1f} ms  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="počet opakování každého měření")
+    parser.add_argument("--top", type=int, default=20, help="počet vypsaných nejpomalejších modulů")
+    parser.add_argument("--processes", type=int, default=0, help="CONVERT_PROCESSES (0 = vlákna v hlavním procesu)")
+    parser.add_argument("--delay-ms", type=float, default=0, help="prodleva mezi /health a první konverzí")
+    parser.add_argument("--skip-server", action="store_true", help="měřit jen import, bez spuštění uvicornu")
+    parser.add_argument("--output", type=Path, help="uložit výsledek do JSON")
+    args = parser.parse_args()
+
+    _, message = next(synthetic_mailbox.generate(1, html_ratio=1.0, attachments=(1, 1)))
+    result: Dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processes": args.processes,
+            "runs": args.runs,
+            "delay_ms": args.delay_ms
+        }
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        import_ms = []
+        modules: List[Tuple[str, int, int, int]] = []
+        for _ in range(args.runs):
+            modules = measure_import(tmp, args.processes)
+            import_ms.append(next(m[3] for m in reversed(modules) if m[0] == "main") / 1000)
+        print(f"Import main: medián {statistics.median(import_ms):.1f} ms "
+              f"(min {min(import_ms):.1f}, max {max(import_ms):.1f}, {args.runs} běhů)")
+        print_modules(modules, args.top)
+        result["import"] = {
+            "median_ms": round(statistics.median(import_ms), 1),
+            "runs_ms": [round(value, 1) for value in import_ms],
+            "modules": [
+                {"module": name, "level": level, "self_ms": round(self_us / 1000, 2), "cumulative_ms": round(cumulative / 1000, 2)}
+                for name, level, self_us, cumulative in main_imports(modules)
+            ]
+        }
+
+        if not args.skip_server:
+            print()
+            result["startup"] = {}
+            for warm_up in (True, False):
+                runs = [measure_startup(tmp, args.processes, warm_up, message, args.delay_ms / 1000) for _ in range(args.runs)]
+                summary = {key: round(statistics.median(run[key] for run in runs), 1) for key in runs[0]}
+                result["startup"][f"warm_up_{str(warm_up).lower()}"] = summary
+                print(f"  WARM_UP={str(warm_up).lower():<5}  /health za {summary['health_ms']:7.1f} ms  "
+                      f"první konverze {summary['first_convert_ms']:7.1f} ms  (medián z {args.runs})")
+
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nVýsledek uložen do {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Benchmark a kontrola běhu více workerů nad jedním ROOT_FOLDER.
+
+Spustí --servers instancí uvicornu (repliky/uzly) nad společným ROOT_FOLDER,
+každou s --workers procesy (WEB_CONCURRENCY), a nahraje do nich korpus se
+souběžností --concurrency (požadavky se střídají mezi servery). Pro každou
+kombinaci workers × concurrency vypíše propustnost a latence.
+
+Zároveň ověří koordinaci mezi procesy:
+
+- všechny uploady mají stejný název souboru (mail.eml), takže se nesmí
+  přepsat dočasné soubory souběžných požadavků
+- každá --duplicate-every-tá zpráva se pošle dvakrát souběžně na různé
+  servery - uložit se musí právě jednou, druhý upload dostane 409
+- v projektech musí být přesně tolik .md souborů, kolik je různých zpráv
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.bench_workers --messages 300 --workers 1,2,4 --concurrency 4,16
+    python -m benchmarks.bench_workers --servers 2 --workers 2 --concurrency 16 --output workers.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from benchmarks import synthetic_mailbox  # noqa: E402
+from benchmarks.bench_app import git_commit, run_scenario  # noqa: E402
+from benchmarks.bench_startup import BACKEND_PATH, STARTUP_TIMEOUT, free_port  # noqa: E402
+
+# Počet projektů, do kterých se korpus rozdělí
+PROJECTS = 5
+
+# Název souboru všech uploadů - souběžné požadavky se stejným názvem se nesmí přepsat
+UPLOAD_FILENAME = "mail.eml"
+
+
+def parse_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def start_server(root_folder: str, workers: int, processes: Optional[int], max_pending: int) -> Tuple[subprocess.Popen, str]:
+    """Spustí uvicorn s workers procesy a počká na /health, vrátí proces a base URL"""
+    port = free_port()
+    env = dict(os.environ)
+    env.update(ROOT_FOLDER=root_folder, WEB_CONCURRENCY=str(workers), MAX_PENDING_CONVERSIONS=str(max_pending))
+    env.pop("CONVERT_PROCESSES", None)
+    if processes is not None:
+        env["CONVERT_PROCESSES"] = str(processes)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_PATH, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    with httpx.Client(base_url=base_url, timeout=STARTUP_TIMEOUT) as client:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server skončil s kódem {server.returncode}")
+            if time.perf_counter() - start > STARTUP_TIMEOUT:
+                server.terminate()
+                raise RuntimeError("Server neodpověděl na /health")
+            try:
+                if client.get("/health").status_code == 200:
+                    break
+            except httpx.TransportError:
+                time.sleep(0.05)
+    return server, base_url
+
+
+def upload_requests(
+    messages: List[Tuple[str, bytes]], clients: List[httpx.AsyncClient], duplicate_every: int
+) -> Tuple[List[Callable], int]:
+    """Uploady korpusu střídavě na servery; duplicity jdou hned za originálem na další server"""
+    requests = []
+    duplicates = 0
+
+    def upload(client: httpx.AsyncClient, index: int, raw: bytes) -> Callable:
+        return lambda _: client.post(
+            "/api/convert-email",
+            files={"file": (UPLOAD_FILENAME, raw, "message/rfc822")},
+            data={"project_name": f"bench_{index % PROJECTS}"}
+        )
+
+    for index, (_, raw) in enumerate(messages):
+        requests.append(upload(clients[len(requests) % len(clients)], index, raw))
+        if duplicate_every and index % duplicate_every == 0:
+            requests.append(upload(clients[len(requests) % len(clients)], index, raw))
+            duplicates += 1
+    return requests, duplicates
+
+
+def count_markdown(root_folder: Path) -> int:
+    return sum(1 for _ in root_folder.glob("*/bench_*/*.md"))
+
+
+async def run_combination(
+    args: argparse.Namespace, messages: List[Tuple[str, bytes]], workers: int, concurrency: int
+) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        servers = [
+            start_server(tmp, workers, args.processes, max(4, concurrency * 2))
+            for _ in range(args.servers)
+        ]
+        try:
+            clients = [httpx.AsyncClient(base_url=base_url, timeout=None) for _, base_url in servers]
+            try:
+                requests, duplicates = upload_requests(messages, clients, args.duplicate_every)
+                stats = await run_scenario(requests, None, concurrency)
+            finally:
+                for client in clients:
+                    await client.aclose()
+        finally:
+            for server, _ in servers:
+                server.terminate()
+            for server, _ in servers:
+                server.wait()
+        stored = count_markdown(Path(tmp))
+
+    statuses = stats["statuses"]
+    errors = []
+    if stored != len(messages):
+        errors.append(f"uloženo {stored} .md místo {len(messages)}")
+    if statuses.get("409", 0) != duplicates:
+        errors.append(f"{statuses.get('409', 0)}× 409 místo {duplicates}")
+    if any(code != "200" and code != "409" for code in statuses):
+        errors.append(f"neočekávané status kódy {statuses}")
+    return {**stats, "workers": workers, "concurrency": concurrency, "stored": stored,
+            "duplicates": duplicates, "errors": errors}
+
+
+def print_row(result: Dict[str, Any]) -> None:
+    statuses = " ".join(f"{code}:{count}" for code, count in result["statuses"].items())
+    check = "OK" if not result["errors"] else "CHYBA: " + "; ".join(result["errors"])
+    print(f"  workers {result['workers']:2d} × souběžnost {result['concurrency']:3d}  "
+          f"{result['throughput']:7.1f} req/s  p50 {result['p50_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  "
+          f"[{statuses}]  {check}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200, help="počet různých zpráv")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=parse_list, default=[1, 2], help="počty workerů, např. 1,2,4")
+    parser.add_argument("--concurrency", type=parse_list, default=[4, 16], help="souběžnosti, např. 4,16")
+    parser.add_argument("--servers", type=int, default=1, help="počet instancí uvicornu nad stejným ROOT_FOLDER")
+    parser.add_argument("--processes", type=int, help="CONVERT_PROCESSES pro každý worker (výchozí = aplikace)")
+    parser.add_argument("--duplicate-every", type=int, default=10, help="každou n-tou zprávu poslat dvakrát (0 = ne)")
+    parser.add_argument("--output", type=Path, help="uložit výsledek do JSON")
+    args = parser.parse_args()
+
+    messages = list(synthetic_mailbox.generate(args.messages, args.seed))
+    print(f"{args.messages} zpráv, {args.servers} server(y), CPU {os.cpu_count()}, "
+          f"CONVERT_PROCESSES {args.processes if args.processes is not None else 'výchozí'}")
+    results = []
+    for workers in args.workers:
+        for concurrency in args.concurrency:
+            result = asyncio.run(run_combination(args, messages, workers, concurrency))
+            print_row(result)
+            results.append(result)
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "messages": args.messages,
+                "seed": args.seed,
+                "servers": args.servers,
+                "processes": args.processes
+            },
+            "results": results
+        }, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nVýsledek uložen do {args.output}")
+    if any(result["errors"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
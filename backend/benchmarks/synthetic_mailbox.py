@@ -0,0 +1,199 @@
+"""
+Generátor syntetických .eml korpusů pro benchmarky.
+
+Stejné parametry a seed dají vždy stejné zprávy (bajt po bajtu), takže
+výsledky benchmarků před a po změně jsou srovnatelné. Nastavit lze počet
+zpráv, velikost těla, podíl HTML emailů, počet a velikost příloh, inline
+obrázky (multipart/related s cid: odkazy v HTML) a mix znakových sad.
+
+Spuštění (z adresáře backend/) - zapíše .eml soubory a manifest.json:
+    python -m benchmarks.synthetic_mailbox --out /tmp/korpus --messages 500 \\
+        --html-ratio 0.6 --attachments 0-3 --attachment-kb 50 --inline-images 0-2
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import format_datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.search_index import strip_diacritics  # noqa: E402
+
+# Znakové sady těl - us-ascii texty jsou bez diakritiky
+CHARSETS = ("utf-8", "iso-8859-2", "windows-1250", "us-ascii")
+
+WORDS = (
+    "dobrý den posílám nabídku fakturu smlouvu objednávku přílohu termín schůzky "
+    "děkuji za zprávu prosím o potvrzení rozpočet projektu změna dodávky reklamace "
+    "servisní zásah údržba kontrola výsledky měření žluťoučký kůň úpěl ďábelské ódy "
+    "meeting invoice contract delivery budget report review deadline update request"
+).split()
+
+DOMAINS = ("firma.cz", "example.com", "dodavatel.cz", "partner.sk", "newsletter.example.org")
+
+# Nejmenší platný PNG (1x1) - inline obrázky jsou tento obrázek s náhodným doplněním
+_PNG_HEADER = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d4944415478da63f8cfc0f01f0005000201a5d4f1c80000000049454e44ae426082"
+)
+
+
+def parse_range(value: str) -> Tuple[int, int]:
+    """'3' -> (3, 3), '0-5' -> (0, 5)"""
+    low, _, high = value.partition("-")
+    low_value = int(low)
+    high_value = int(high) if high else low_value
+    if low_value < 0 or high_value < low_value:
+        raise argparse.ArgumentTypeError(f"Neplatný rozsah {value}")
+    return low_value, high_value
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _paragraphs(rng: random.Random, size: int) -> list:
+    paragraphs = []
+    length = 0
+    while length < size:
+        paragraph = " ".join(_sentence(rng, rng.randint(6, 16)) for _ in range(rng.randint(2, 6)))
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    return paragraphs
+
+
+def _html(paragraphs: Sequence[str], cids: Sequence[str], index: int) -> str:
+    rows = "".join(
+        f'<tr><td style="padding:8px;font-family:Arial">{p}</td>'
+        f'<td><a href="https://example.com/clanek/{index}/{i}">Více</a></td></tr>'
+        for i, p in enumerate(paragraphs)
+    )
+    images = "".join(f'<img src="cid:{cid}" alt="obrázek {i}" width="200">' for i, cid in enumerate(cids))
+    return (
+        "<html><head><style>td { color: #333; }</style></head><body>"
+        f'<table width="600" align="center"><tr><td colspan="2"><h1>Zpráva {index}</h1>{images}</td></tr>'
+        f"{rows}</table>"
+        '<img src="https://tracking.example.com/open.gif" width="1" height="1">'
+        "</body></html>"
+    )
+
+
+def build_message(
+    rng: random.Random,
+    index: int,
+    html_ratio: float = 0.5,
+    body_kb: float = 4,
+    attachments: Tuple[int, int] = (0, 2),
+    attachment_kb: float = 50,
+    inline_images: Tuple[int, int] = (0, 1),
+    charsets: Sequence[str] = CHARSETS
+) -> bytes:
+    """Vytvoří jednu zprávu - všechna náhodná rozhodnutí jdou přes rng"""
+    charset = rng.choice(charsets)
+    paragraphs = _paragraphs(rng, int(body_kb * 1024))
+    subject = _sentence(rng, rng.randint(3, 8))[:-1]
+    if charset == "us-ascii":
+        paragraphs = [strip_diacritics(p) for p in paragraphs]
+    is_html = rng.random() < html_ratio
+    cids = [f"img{index}_{i}@bench" for i in range(rng.randint(*inline_images))] if is_html else []
+
+    msg = EmailMessage()
+    domain = rng.choice(DOMAINS)
+    msg["Subject"] = subject
+    msg["From"] = f"Odesílatel {index % 50} <user{index % 50}@{domain}>"
+    msg["To"] = "archiv@example.com"
+    if rng.random() < 0.3:
+        msg["Cc"] = f"kolega{rng.randint(1, 9)}@{rng.choice(DOMAINS)}"
+    date = datetime(2024, 1, 1, tzinfo=timezone(timedelta(hours=1))) + timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))
+    msg["Date"] = format_datetime(date)
+    msg["Message-ID"] = f"<bench{index}.{rng.getrandbits(32):08x}@{domain}>"
+
+    plain = "\n\n".join(paragraphs) + "\n"
+    if is_html:
+        html = _html(paragraphs, cids, index)
+        if charset == "us-ascii":
+            html = strip_diacritics(html)
+        if rng.random() < 0.5:
+            # Newsletter jen s HTML tělem - převádí se na Markdown
+            msg.set_content(html, subtype="html", charset=charset)
+            html_part = msg
+        else:
+            msg.set_content(plain, charset=charset)
+            msg.add_alternative(html, subtype="html", charset=charset)
+            html_part = msg.get_body(("html",))
+        for i, cid in enumerate(cids):
+            image = _PNG_HEADER + rng.randbytes(rng.randint(500, 5000))
+            html_part.add_related(image, maintype="image", subtype="png", cid=f"<{cid}>",
+                                  filename=f"obrazek_{i}.png", disposition="inline")
+    else:
+        msg.set_content(plain, charset=charset)
+
+    for i in range(rng.randint(*attachments)):
+        size = max(1, int(attachment_kb * 1024 * rng.uniform(0.5, 1.5)))
+        msg.add_attachment(rng.randbytes(size), maintype="application", subtype="pdf", filename=f"priloha_{index}_{i}.pdf")
+    # Boundary by jinak generoval globální random - pevné kvůli reprodukovatelnosti
+    for number, part in enumerate(part for part in msg.walk() if part.is_multipart()):
+        part.set_boundary(f"bench-{index}-{number}")
+    return msg.as_bytes()
+
+
+def generate(count: int, seed: int = 42, **options: Any) -> Iterator[Tuple[str, bytes]]:
+    """Vrací (název souboru, obsah .eml) pro count zpráv, options viz build_message"""
+    rng = random.Random(seed)
+    for index in range(count):
+        yield f"mail_{index:06d}.eml", build_message(rng, index, **options)
+
+
+def write_corpus(out_dir: Path, count: int, seed: int = 42, **options: Any) -> Dict[str, Any]:
+    """Zapíše korpus do adresáře a vrátí manifest (parametry a celková velikost)"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    total_bytes = 0
+    for filename, raw in generate(count, seed, **options):
+        (out_dir / filename).write_bytes(raw)
+        total_bytes += len(raw)
+    manifest = {"messages": count, "seed": seed, "total_bytes": total_bytes, "options": options}
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    return manifest
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Parametry korpusu - sdílí je CLI generátoru i bench_app"""
+    parser.add_argument("--messages", type=int, default=200, help="počet zpráv")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--html-ratio", type=float, default=0.5, help="podíl HTML emailů (0-1)")
+    parser.add_argument("--body-kb", type=float, default=4, help="přibližná velikost textu těla v kB")
+    parser.add_argument("--attachments", type=parse_range, default=(0, 2), help="počet příloh, např. 2 nebo 0-3")
+    parser.add_argument("--attachment-kb", type=float, default=50, help="průměrná velikost přílohy v kB")
+    parser.add_argument("--inline-images", type=parse_range, default=(0, 1), help="počet inline obrázků v HTML emailech")
+    parser.add_argument("--charsets", default=",".join(CHARSETS), help="čárkou oddělené znakové sady těl")
+
+
+def options_from_args(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "html_ratio": args.html_ratio,
+        "body_kb": args.body_kb,
+        "attachments": tuple(args.attachments),
+        "attachment_kb": args.attachment_kb,
+        "inline_images": tuple(args.inline_images),
+        "charsets": tuple(args.charsets.split(","))
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, required=True, help="výstupní adresář")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    manifest = write_corpus(args.out, args.messages, args.seed, **options_from_args(args))
+    print(f"{manifest['messages']} zpráv, {manifest['total_bytes'] / 1024 / 1024:.1f} MB -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,194 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from starlette.routing import Match
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+import asyncio
 import os
+import json
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-import yaml
-from datetime import datetime
+from typing import List, Literal, Optional
 
-from services.email_processor import EmailProcessor
+from services.email_processor import LARGE_BODY_MODES, EmailProcessor, UploadTooLargeError, peak_rss_mb, preload_converters
+from services.worker_pool import WorkerPool, PoolBusyError
+from services.email_index import EmailIndex
+from services.durable_writes import FsyncBatcher
+from services.project_cache import ProjectCache
+from services.job_queue import JobQueue, QueueFullError
+from services.search_index import SearchIndex
+from services.html_converter import HTML_ENGINES, resolve_engine
+from services.batch_importer import BatchImporter, BATCH_EXTENSIONS, iter_path_messages
+from services.spool_watcher import SpoolRouter, SpoolWatcher
+from services.threads import build_thread, thread_to_markdown
+from services.project_export import MEDIA_TYPES, Crc32Cache, ProjectArchive, collect_entries, parse_range
+from services.thumbnails import (
+    DEFAULT_THUMBNAIL_SIZE, IMAGE_EXTENSIONS, THUMBNAIL_SIZES,
+    ThumbnailCache, UnsupportedImageError, render_thumbnail, thumbnails_available
+)
+from services import metrics
 from models.schemas import EmailMetadata
 
-app = FastAPI(title="Convert e-mail to Markdown")
-
 # Initialize service
 ROOT_FOLDER = os.getenv("ROOT_FOLDER", "/app/output")
 INBOX_FOLDER = os.getenv("INBOX_FOLDER", "_from_email")
-email_processor = EmailProcessor(ROOT_FOLDER)
+# Maximální velikost uploadu v MB (0 = bez limitu)
+MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "200"))
+MAX_UPLOAD_SIZE = MAX_UPLOAD_SIZE_MB * 1024 * 1024 if MAX_UPLOAD_SIZE_MB > 0 else None
+# Počet worker procesů uvicornu (uvicorn čte WEB_CONCURRENCY sám) - výchozí počet procesů
+# konverze se dělí mezi workery, aby dohromady nepřetížily CPU
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+# Počet procesů pro parsování a konverzi v jednom workeru
+# (výchozí = počet CPU / WEB_CONCURRENCY, 0 = vlákna v hlavním procesu)
+CONVERT_PROCESSES = int(os.getenv("CONVERT_PROCESSES", str(max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY))))
+# Počet vláken pro zápis souborů
+IO_THREADS = int(os.getenv("IO_THREADS", "4"))
+# Maximální počet současně rozpracovaných konverzí, další dostanou 503
+MAX_PENDING_CONVERSIONS = int(os.getenv("MAX_PENDING_CONVERSIONS", str(max(1, CONVERT_PROCESSES) * 4)))
+worker_pool = WorkerPool(
+    processes=CONVERT_PROCESSES,
+    io_threads=IO_THREADS,
+    max_pending=MAX_PENDING_CONVERSIONS
+)
+# Engine převodu HTML na Markdown (auto, lxml, html.parser, text) a limit HTML v kB,
+# nad který se převádí zjednodušeně (0 = bez limitu)
+HTML_ENGINE = os.getenv("HTML_ENGINE", "auto")
+if HTML_ENGINE not in HTML_ENGINES:
+    print(f"[WARNING] Neznámý HTML_ENGINE '{HTML_ENGINE}', používám 'auto'")
+    HTML_ENGINE = "auto"
+print(f"[INFO] HTML engine: {resolve_engine(HTML_ENGINE)}")
+HTML_MAX_SIZE_KB = int(os.getenv("HTML_MAX_SIZE_KB", "1024"))
+# Textové tělo větší než LARGE_BODY_KB se nedrží v paměti a ukládá se podle LARGE_BODY_MODE
+# (inline = celé do markdownu, truncate = zkrátit, file = zkrátit a celé uložit jako přílohu)
+LARGE_BODY_KB = int(os.getenv("LARGE_BODY_KB", "1024"))
+LARGE_BODY_MODE = os.getenv("LARGE_BODY_MODE", "inline")
+if LARGE_BODY_MODE not in LARGE_BODY_MODES:
+    print(f"[WARNING] Neznámý LARGE_BODY_MODE '{LARGE_BODY_MODE}', používám 'inline'")
+    LARGE_BODY_MODE = "inline"
+# fsync zapsaných emailů a příloh (false = rychlejší, ale po výpadku napájení se mohou
+# ztratit poslední emaily) a jak dlouho v ms sbírat souběžné zápisy do jednoho kola fsync
+FSYNC_WRITES = os.getenv("FSYNC_WRITES", "true").lower() in ("1", "true", "yes")
+FSYNC_BATCH_MS = float(os.getenv("FSYNC_BATCH_MS", "0"))
+# Ukládat odpovědi bez citované historie, pokud je předchozí email vlákna už v projektu
+STRIP_QUOTED_REPLIES = os.getenv("STRIP_QUOTED_REPLIES", "false").lower() in ("1", "true", "yes")
+# Po startu na pozadí načíst knihovny konverze a spustit procesy poolu (false = až při první konverzi)
+WARM_UP = os.getenv("WARM_UP", "true").lower() in ("1", "true", "yes")
+project_cache = ProjectCache(ROOT_FOLDER, INBOX_FOLDER)
+search_index = SearchIndex(ROOT_FOLDER)
+thumbnail_cache = ThumbnailCache(ROOT_FOLDER)
+export_crc_cache = Crc32Cache()
+if not thumbnails_available():
+    print("[WARNING] Pillow není nainstalovaný - místo náhledů obrázků se vrací originály")
+email_processor = EmailProcessor(
+    ROOT_FOLDER,
+    max_upload_size=MAX_UPLOAD_SIZE,
+    pool=worker_pool,
+    project_cache=project_cache,
+    html_engine=HTML_ENGINE,
+    html_max_size=HTML_MAX_SIZE_KB * 1024,
+    search_index=search_index,
+    fsync_batcher=FsyncBatcher(enabled=FSYNC_WRITES, window_seconds=FSYNC_BATCH_MS / 1000),
+    strip_quoted_replies=STRIP_QUOTED_REPLIES,
+    body_spill_size=max(1, LARGE_BODY_KB) * 1024,
+    large_body_mode=LARGE_BODY_MODE,
+    prepare=False
+)
+# Dávkový import - počet souběžně konvertovaných zpráv a limit velikosti uploadu (0 = bez limitu)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(max(1, CONVERT_PROCESSES) * 2)))
+MAX_BATCH_UPLOAD_SIZE_MB = int(os.getenv("MAX_BATCH_UPLOAD_SIZE_MB", "4096"))
+MAX_BATCH_UPLOAD_SIZE = MAX_BATCH_UPLOAD_SIZE_MB * 1024 * 1024
+# Fronta úloh - adresář s perzistentní frontou, počet pracovníků, limit fronty a doba uchování výsledků
+JOBS_FOLDER = os.getenv("JOBS_FOLDER", str(Path(ROOT_FOLDER) / ".jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(max(1, CONVERT_PROCESSES))))
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "1000"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))
+job_queue = JobQueue(
+    JOBS_FOLDER,
+    email_processor,
+    INBOX_FOLDER,
+    workers=JOB_WORKERS,
+    max_queued=MAX_QUEUED_JOBS,
+    retention_seconds=JOB_RETENTION_HOURS * 3600
+)
+# Spool - adresář, do kterého mailová brána zapisuje .eml soubory; ty se automaticky
+# zkonvertují a rozdělí do projektů podle pravidel (prázdné SPOOL_FOLDER = vypnuto)
+SPOOL_FOLDER = os.getenv("SPOOL_FOLDER", "")
+SPOOL_RULES_FILE = os.getenv("SPOOL_RULES_FILE", "")
+SPOOL_DEFAULT_PROJECT = os.getenv("SPOOL_DEFAULT_PROJECT", "")
+SPOOL_WORKERS = int(os.getenv("SPOOL_WORKERS", str(max(1, CONVERT_PROCESSES))))
+SPOOL_POLL_SECONDS = float(os.getenv("SPOOL_POLL_SECONDS", "5"))
+SPOOL_SETTLE_SECONDS = float(os.getenv("SPOOL_SETTLE_SECONDS", "2"))
+SPOOL_FORCE_POLLING = os.getenv("SPOOL_FORCE_POLLING", "false").lower() in ("1", "true", "yes")
+metrics.REGISTRY.register(metrics.Gauge(
+    "email_conversions_in_progress", "Počet právě rozpracovaných konverzí", lambda: worker_pool.pending
+))
+
+
+def _resolve_project_in_inbox(project_name: str) -> bool:
+    """
+    Zjistí, kam ukládat emaily projektu.
+    Vrací True pro projekt v INBOX_FOLDER (i pro nový projekt), False pro projekt v root.
+    """
+    project_path = project_cache.find_project(project_name)
+    # Projekt, který neexistuje, se vytvoří v INBOX_FOLDER (výchozí)
+    return project_path is None or project_path.parent == project_cache.inbox_path
+
+
+def _create_spool_watcher() -> Optional[SpoolWatcher]:
+    if not SPOOL_FOLDER:
+        return None
+    if SPOOL_RULES_FILE:
+        router = SpoolRouter.from_file(SPOOL_RULES_FILE, SPOOL_DEFAULT_PROJECT)
+    else:
+        router = SpoolRouter([], SPOOL_DEFAULT_PROJECT)
+    if not router.rules and not router.default_project:
+        print("[WARNING] Spool nemá pravidla ani SPOOL_DEFAULT_PROJECT - všechny zprávy skončí ve failed/")
+    return SpoolWatcher(
+        SPOOL_FOLDER,
+        email_processor,
+        router,
+        _resolve_project_in_inbox,
+        INBOX_FOLDER,
+        workers=SPOOL_WORKERS,
+        poll_interval=SPOOL_POLL_SECONDS,
+        settle_seconds=SPOOL_SETTLE_SECONDS,
+        force_polling=SPOOL_FORCE_POLLING
+    )
+
+
+spool_watcher = _create_spool_watcher()
+
+
+async def _warm_up() -> None:
+    """Načte knihovny konverze (a spustí procesy poolu), zatímco aplikace už odpovídá"""
+    start = time.perf_counter()
+    try:
+        await worker_pool.warm_up(preload_converters)
+    except Exception as e:
+        print(f"[WARNING] Zahřátí konverze selhalo ({str(e)}), knihovny se načtou při první konverzi")
+        return
+    print(f"[INFO] Konverze připravena za {time.perf_counter() - start:.2f} s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await email_processor._run_io(email_processor.prepare)
+    await job_queue.start()
+    if spool_watcher is not None:
+        await spool_watcher.start()
+    warm_up_task = asyncio.create_task(_warm_up()) if WARM_UP else None
+    yield
+    # Ukončit pracovníky fronty a spoolu, procesy a vlákna
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+        await asyncio.gather(warm_up_task, return_exceptions=True)
+    if spool_watcher is not None:
+        await spool_watcher.stop()
+    await job_queue.stop()
+    worker_pool.shutdown()
+
+
+app = FastAPI(title="Convert e-mail to Markdown", lifespan=lifespan)
 
 # Mount static files
 static_path = Path(__file__).parent / "static"
@@ -22,17 +196,68 @@ if static_path.exists():
     app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
 
 
+def _route_template(request: Request) -> str:
+    """Šablona cesty požadavku (např. /api/projects/{project_name}/emails) pro labely metrik"""
+    for route in app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Odmítne upload podle Content-Length ještě předtím, než se začne číst tělo požadavku"""
+    if request.method == "POST":
+        limits = {
+            "/api/convert-email": MAX_UPLOAD_SIZE_MB,
+            "/api/jobs": MAX_UPLOAD_SIZE_MB,
+            "/api/convert-batch": MAX_BATCH_UPLOAD_SIZE_MB
+        }
+        limit_mb = limits.get(request.url.path)
+        content_length = request.headers.get("content-length")
+        if limit_mb and content_length and content_length.isdigit() and int(content_length) > limit_mb * 1024 * 1024:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Soubor je větší než povolený limit {limit_mb} MB"}
+            )
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Počet a doba HTTP požadavků podle šablony cesty (ne konkrétní URL - omezený počet labelů).
+    Registruje se poslední, aby byla vnější a počítala i odmítnuté uploady.
+    """
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = _route_template(request)
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route)
+        metrics.HTTP_REQUESTS.inc(method=request.method, route=route, status=str(status))
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Metriky v textovém formátu Prometheu (počty a doby požadavků, fáze konverze, bajty)"""
+    return PlainTextResponse(metrics.REGISTRY.render(), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+
 @app.get("/version.json")
 async def get_version():
     """Vrátí verzi aplikace"""
     version_path = Path(__file__).parent / "static" / "version.json"
     if version_path.exists():
-        import json
         with open(version_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     return {"version": "unknown"}
@@ -44,50 +269,10 @@ async def get_projects(include_others: bool = False):
     Vrátí seznam existujících projektů (složek).
     Pokud include_others=False, zobrazí jen složky z adresáře INBOX_FOLDER.
     Pokud include_others=True, zobrazí všechny složky kromě INBOX_FOLDER.
+    Seznam je seřazený abecedně a cachovaný podle mtime adresáře.
     """
     try:
-        output_path = Path(ROOT_FOLDER)
-        inbox_path = output_path / INBOX_FOLDER
-        
-        # Debug: logovat cestu
-        print(f"[DEBUG] ROOT_FOLDER: {ROOT_FOLDER}")
-        print(f"[DEBUG] INBOX_FOLDER: {INBOX_FOLDER}")
-        print(f"[DEBUG] output_path exists: {output_path.exists()}")
-        print(f"[DEBUG] inbox_path exists: {inbox_path.exists()}")
-        print(f"[DEBUG] include_others: {include_others}")
-        
-        projects = []
-        
-        if not include_others:
-            # Zobrazit jen složky z INBOX_FOLDER adresáře
-            if inbox_path.exists() and inbox_path.is_dir():
-                all_items = list(inbox_path.iterdir())
-                print(f"[DEBUG] All items in {inbox_path}: {[item.name for item in all_items]}")
-                
-                for item in all_items:
-                    if item.is_dir() and not item.name.startswith('.'):
-                        projects.append(item.name)
-                        print(f"[DEBUG] Found project in {INBOX_FOLDER}: {item.name}")
-            else:
-                print(f"[DEBUG] {INBOX_FOLDER} directory does not exist")
-        else:
-            # Zobrazit všechny složky kromě INBOX_FOLDER
-            if not output_path.exists():
-                print(f"[DEBUG] Path {output_path} does not exist")
-                return {"projects": []}
-            
-            all_items = list(output_path.iterdir())
-            print(f"[DEBUG] All items in {output_path}: {[item.name for item in all_items]}")
-            
-            for item in all_items:
-                if item.is_dir() and not item.name.startswith('.') and item.name != INBOX_FOLDER:
-                    projects.append(item.name)
-                    print(f"[DEBUG] Found project (excluding {INBOX_FOLDER}): {item.name}")
-        
-        # Seřadit abecedně
-        projects.sort()
-        
-        print(f"[DEBUG] Returning projects: {projects}")
+        projects = await email_processor._run_io(project_cache.list_projects, include_others)
         return {"projects": projects}
     except Exception as e:
         import traceback
@@ -97,95 +282,41 @@ async def get_projects(include_others: bool = False):
 
 
 @app.get("/api/projects/{project_name}/emails")
-async def get_project_emails(project_name: str):
-    """Vrátí seznam emailů (markdown souborů) v projektu"""
+async def get_project_emails(
+    project_name: str,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    sort: Literal["date", "from", "subject"] = "date",
+    order: Literal["asc", "desc"] = "desc",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    domain: Optional[str] = None,
+    has_attachments: Optional[bool] = None
+):
+    """
+    Vrátí stránku seznamu emailů (markdown souborů) v projektu.
+    Řazení (date/from/subject) i filtry (rozsah data, doména odesílatele,
+    přílohy) se vyhodnocují v indexu projektu, ne v Pythonu.
+    """
     try:
-        output_path = Path(ROOT_FOLDER)
-        inbox_path = output_path / INBOX_FOLDER
-        
         # Zkusit najít projekt - nejprve v INBOX_FOLDER, pak v root
-        project_path = None
-        
-        # Zkusit v INBOX_FOLDER adresáři
-        if inbox_path.exists() and inbox_path.is_dir():
-            potential_path = inbox_path / project_name
-            if potential_path.exists() and potential_path.is_dir():
-                project_path = potential_path
-                print(f"[DEBUG] Found project in {INBOX_FOLDER}: {project_path}")
-        
-        # Pokud nebyl nalezen v INBOX_FOLDER, zkusit v root
-        if project_path is None:
-            potential_path = output_path / project_name
-            if potential_path.exists() and potential_path.is_dir():
-                project_path = potential_path
-                print(f"[DEBUG] Found project in root: {project_path}")
+        project_path = project_cache.find_project(project_name)
         
         if project_path is None:
             raise HTTPException(status_code=404, detail=f"Projekt {project_name} neexistuje")
         
-        emails = []
-        
-        # Načíst všechny .md soubory v projektu (kromě attachments složky)
-        for md_file in project_path.glob("*.md"):
-            try:
-                # Přečíst soubor
-                with open(md_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Parsovat YAML front-matter
-                if content.startswith('---'):
-                    parts = content.split('---', 2)
-                    if len(parts) >= 3:
-                        yaml_content = parts[1].strip()
-                        front_matter = yaml.safe_load(yaml_content)
-                        
-                        # Extrahovat potřebné informace
-                        email_date_str = front_matter.get('date', '')
-                        email_date = None
-                        if email_date_str:
-                            try:
-                                # Zkusit ISO formát (s nebo bez timezone)
-                                if 'Z' in email_date_str:
-                                    email_date = datetime.fromisoformat(email_date_str.replace('Z', '+00:00'))
-                                elif '+' in email_date_str or email_date_str.count('-') >= 2:
-                                    # ISO formát s timezone nebo bez
-                                    email_date = datetime.fromisoformat(email_date_str.replace('+00:00', ''))
-                                else:
-                                    # Jiný formát - zkusit parsovat
-                                    email_date = datetime.fromisoformat(email_date_str)
-                            except:
-                                # Pokud selže parsing, zkusit extrahovat z názvu souboru
-                                try:
-                                    filename_parts = md_file.stem.split('_', 1)
-                                    if len(filename_parts) >= 1:
-                                        date_time_part = filename_parts[0]
-                                        # Formát: YYYY-MM-DD_HH-MM-SS
-                                        if len(date_time_part) >= 19:
-                                            email_date = datetime.strptime(date_time_part, '%Y-%m-%d_%H-%M-%S')
-                                        elif len(date_time_part) >= 10:
-                                            email_date = datetime.strptime(date_time_part, '%Y-%m-%d')
-                                except:
-                                    pass
-                        
-                        emails.append({
-                            "filename": md_file.name,
-                            "date": email_date.isoformat() if email_date else email_date_str,
-                            "from": front_matter.get('from', ''),
-                            "subject": front_matter.get('subject', ''),
-                            "date_obj": email_date  # Pro řazení
-                        })
-            except Exception as e:
-                print(f"[WARNING] Chyba při parsování souboru {md_file.name}: {str(e)}")
-                continue
-        
-        # Seřadit podle data (nejnovější nahoře)
-        emails.sort(key=lambda x: x.get('date_obj') or datetime.min, reverse=True)
-        
-        # Odstranit date_obj z výsledku (není potřeba v JSON)
-        for email in emails:
-            email.pop('date_obj', None)
-        
-        return {"emails": emails}
+        # Seznam z indexu metadat (srovnaného se soubory podle mtime)
+        return await email_processor._run_io(
+            EmailIndex(project_path).list_emails,
+            offset=offset,
+            limit=limit,
+            sort=sort,
+            order=order,
+            date_from=date_from,
+            date_to=date_to,
+            domain=domain,
+            has_attachments=has_attachments
+        )
         
     except HTTPException:
         raise
@@ -196,17 +327,209 @@ async def get_project_emails(project_name: str):
         raise HTTPException(status_code=500, detail=error_detail)
 
 
-@app.post("/api/convert-email")
-async def convert_email(
-    file: UploadFile = File(...),
-    project_name: str = Form(...)
+@app.get("/api/projects/{project_name}/threads")
+async def get_project_threads(
+    project_name: str,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """Vrátí stránku vláken projektu (podle Message-ID/In-Reply-To/References), nejnovější první"""
+    project_path = project_cache.find_project(project_name)
+    if project_path is None:
+        raise HTTPException(status_code=404, detail=f"Projekt {project_name} neexistuje")
+    return await email_processor._run_io(EmailIndex(project_path).list_threads, offset=offset, limit=limit)
+
+
+@app.get("/api/projects/{project_name}/threads/{thread_id}")
+async def get_project_thread(
+    project_name: str,
+    thread_id: str,
+    output_format: Literal["json", "markdown"] = Query("json", alias="format"),
+    strip_quotes: bool = True
 ):
     """
-    Konvertuje .eml soubor na markdown a uloží do projektu.
+    Celé vlákno jako jeden dokument - emaily seřazené podle data, z odpovědí
+    se (se strip_quotes) odstraní citace předchozích zpráv. format=markdown
+    vrátí vlákno jako jeden markdown soubor.
     """
-    if not file.filename.endswith('.eml'):
-        raise HTTPException(status_code=400, detail="Soubor musí být .eml")
+    project_path = project_cache.find_project(project_name)
+    if project_path is None:
+        raise HTTPException(status_code=404, detail=f"Projekt {project_name} neexistuje")
+    thread = await email_processor._run_io(build_thread, project_path, thread_id, strip_quotes)
+    if thread is None:
+        raise HTTPException(status_code=404, detail=f"Vlákno {thread_id} neexistuje")
+    if output_format == "markdown":
+        return PlainTextResponse(thread_to_markdown(thread), media_type="text/markdown")
+    return thread
+
+
+def _project_attachment_or_404(project_name: str, filename: str) -> Path:
+    """Najde přílohu v attachments/ projektu, jiné cesty (.., skryté soubory) odmítne"""
+    project_path = project_cache.find_project(project_name)
+    if project_path is None:
+        raise HTTPException(status_code=404, detail=f"Projekt {project_name} neexistuje")
+    if not filename or filename.startswith('.') or Path(filename).name != filename:
+        raise HTTPException(status_code=404, detail=f"Příloha {filename} neexistuje")
+    attachment_path = project_path / "attachments" / filename
+    if not attachment_path.is_file():
+        raise HTTPException(status_code=404, detail=f"Příloha {filename} neexistuje")
+    return attachment_path
+
+
+# Přílohy, které se smí zobrazit přímo v prohlížeči (inline obrázky v markdownu) -
+# jen rastrové obrázky s pevným typem. Ostatní (hlavně .html a .svg od odesílatele)
+# by na origin aplikace mohly spustit skript, posílají se proto ke stažení.
+INLINE_MEDIA_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp"
+}
+
+
+def _attachment_response(attachment_path: Path) -> FileResponse:
+    """Odpověď se souborem přílohy - rastrové obrázky inline, ostatní jako attachment"""
+    headers = {"X-Content-Type-Options": "nosniff"}
+    media_type = INLINE_MEDIA_TYPES.get(attachment_path.suffix.lower())
+    if media_type is not None:
+        return FileResponse(
+            str(attachment_path), media_type=media_type, headers=headers,
+            filename=attachment_path.name, content_disposition_type="inline"
+        )
+    return FileResponse(str(attachment_path), headers=headers, filename=attachment_path.name)
+
+
+@app.get("/api/projects/{project_name}/attachments/{filename}")
+async def get_attachment(project_name: str, filename: str):
+    """Vrátí přílohu nebo inline obrázek emailu (soubor z attachments/ projektu)"""
+    return _attachment_response(_project_attachment_or_404(project_name, filename))
+
+
+@app.get("/api/projects/{project_name}/attachments/{filename}/thumbnail")
+async def get_attachment_thumbnail(project_name: str, filename: str, size: int = DEFAULT_THUMBNAIL_SIZE):
+    """
+    Náhled obrázkové přílohy (delší strana max. size px). Vytváří se při prvním
+    požadavku a ukládá do cache podle SHA-256 obsahu, další požadavky (i na
+    stejný obrázek v jiném emailu) ho vrací z disku.
+    """
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Nepodporovaná velikost náhledu (povoleno: {', '.join(str(s) for s in THUMBNAIL_SIZES)})"
+        )
+    attachment_path = _project_attachment_or_404(project_name, filename)
+    if attachment_path.suffix.lower() not in IMAGE_EXTENSIONS:
+        raise HTTPException(status_code=415, detail=f"Příloha {filename} není obrázek")
+    if not thumbnails_available():
+        return _attachment_response(attachment_path)
     
+    sha256, thumbnail_path = await email_processor._run_io(thumbnail_cache.lookup, attachment_path, size)
+    if thumbnail_path is None:
+        try:
+            thumbnail_path = await email_processor._run_cpu(
+                render_thumbnail, attachment_path, thumbnail_cache.target_base(sha256, size), size
+            )
+        except UnsupportedImageError as e:
+            raise HTTPException(status_code=415, detail=str(e))
+    return FileResponse(str(thumbnail_path), headers={"Cache-Control": "private, max-age=86400"})
+
+
+@app.get("/api/projects/{project_name}/export")
+async def export_project(
+    request: Request,
+    project_name: str,
+    archive_format: Literal["zip", "tar"] = Query("zip", alias="format"),
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    attachments: bool = True
+):
+    """
+    Export projektu (markdown a přílohy) jako zip nebo tar. Archiv se skládá
+    za běhu přímo ze souborů projektu - bez dočasného souboru a bez načtení
+    do paměti. Podporuje Range a If-Range, přerušené stahování lze navázat.
+    """
+    project_path = project_cache.find_project(project_name)
+    if project_path is None:
+        raise HTTPException(status_code=404, detail=f"Projekt {project_name} neexistuje")
+    
+    entries = await email_processor._run_io(collect_entries, project_path, date_from, date_to, attachments)
+    archive = ProjectArchive(entries, archive_format, project_path.name, export_crc_cache)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": archive.etag,
+        "Content-Disposition": f'attachment; filename="{project_path.name}.{archive_format}"'
+    }
+    
+    # Range platí jen pro stejný archiv (If-Range s ETagem z prvního stažení)
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range == archive.etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), archive.size)
+        except ValueError as e:
+            raise HTTPException(status_code=416, detail=str(e), headers={"Content-Range": f"bytes */{archive.size}"})
+    start, end = byte_range or (0, archive.size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{archive.size}"
+    
+    async def stream():
+        chunks = archive.iter_range(start, end)
+        try:
+            while True:
+                # Čtení souborů je blokující - běží ve vláknovém poolu
+                chunk = await email_processor._run_io(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        except OSError as e:
+            # Hlavičky už jsou odeslané - přerušit spojení, klient pozná nekompletní archiv
+            print(f"[ERROR] Export projektu {project_name} přerušen: {str(e)}")
+            raise
+    
+    print(f"[INFO] Export {project_name}: {len(entries)} souborů, {archive_format}, bajty {start}-{end}/{archive.size}")
+    return StreamingResponse(
+        stream(),
+        status_code=206 if byte_range is not None else 200,
+        media_type=MEDIA_TYPES[archive_format],
+        headers=headers
+    )
+
+
+@app.get("/api/search")
+async def search_emails(
+    q: str,
+    project: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Fulltextové hledání v předmětu, adresách a těle všech emailů.
+    Výsledky jsou seřazené podle relevance, diakritika a velikost písmen se ignorují.
+    """
+    try:
+        return await email_processor._run_io(
+            search_index.search, q, project=project, offset=offset, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        import traceback
+        error_detail = f"Chyba při hledání: {str(e)}\n{traceback.format_exc()}"
+        print(f"[ERROR] {error_detail}")
+        raise HTTPException(status_code=500, detail=error_detail)
+
+
+@app.get("/api/stats/dedup")
+async def get_dedup_stats():
+    """Statistika deduplikace příloh - kolik bajtů ušetřilo sdílené úložiště"""
+    return await email_processor._run_io(email_processor.attachment_store.stats)
+
+
+def _normalize_project_name_or_400(project_name: str) -> str:
+    """Ověří a normalizuje název projektu, při chybě vyhodí HTTP 400"""
     if not project_name or not project_name.strip():
         raise HTTPException(status_code=400, detail="Název projektu je povinný")
     
@@ -214,56 +537,249 @@ async def convert_email(
     project_name = email_processor._normalize_project_name(project_name.strip())
     if not project_name:
         raise HTTPException(status_code=400, detail="Neplatný název projektu")
+    return project_name
+
+
+@app.post("/api/convert-email")
+async def convert_email(
+    file: UploadFile = File(...),
+    project_name: str = Form(...)
+):
+    """
+    Konvertuje .eml soubor na markdown a uloží do projektu.
+    """
+    if not file.filename.endswith('.eml'):
+        raise HTTPException(status_code=400, detail="Soubor musí být .eml")
+    
+    project_name = _normalize_project_name_or_400(project_name)
     
     try:
-        # Zjistit, jestli projekt existuje v INBOX_FOLDER nebo v root
-        output_path = Path(ROOT_FOLDER)
-        inbox_path = output_path / INBOX_FOLDER
-        
-        # Zkontrolovat, jestli projekt existuje v INBOX_FOLDER nebo v root
-        project_in_inbox = None  # None = nový projekt, použije se výchozí (INBOX_FOLDER)
-        
-        # Zkontrolovat, jestli projekt existuje v INBOX_FOLDER
-        if inbox_path.exists() and inbox_path.is_dir():
-            potential_path = inbox_path / project_name
-            if potential_path.exists() and potential_path.is_dir():
-                project_in_inbox = True
-                print(f"[DEBUG] Project {project_name} found in {INBOX_FOLDER}, will save there")
-        
-        # Pokud nebyl nalezen v INBOX_FOLDER, zkontrolovat v root
-        if project_in_inbox is None:
-            potential_path = output_path / project_name
-            if potential_path.exists() and potential_path.is_dir():
-                project_in_inbox = False
-                print(f"[DEBUG] Project {project_name} found in root, will save there")
-            else:
-                # Projekt neexistuje - vytvořit v INBOX_FOLDER (výchozí)
-                project_in_inbox = True
-                print(f"[DEBUG] Project {project_name} does not exist, will create in {INBOX_FOLDER} (default)")
+        async with worker_pool.slot():
+            return await _convert_uploaded_email(file, project_name)
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+
+async def _convert_uploaded_email(file: UploadFile, project_name: str):
+    """Zpracuje jeden nahraný .eml soubor (volá se s rezervovaným místem ve frontě)"""
+    try:
+        project_in_inbox = _resolve_project_in_inbox(project_name)
         
-        # Uložit dočasně soubor
+        # Uložit dočasně soubor (streamovaně po blocích)
         temp_path = await email_processor.save_temp_file(file)
+        try:
+            # Zpracovat email
+            email_data = await email_processor.parse_email(temp_path)
+            
+            # Konvertovat a uložit - předat informaci, jestli ukládat do INBOX_FOLDER
+            result = await email_processor.convert_and_save(
+                temp_path,
+                email_data,
+                project_name,
+                project_in_inbox=project_in_inbox,
+                inbox_folder=INBOX_FOLDER
+            )
+        finally:
+            # Dočasný soubor má unikátní název - i po duplicitě nebo chybě se musí smazat
+            temp_path.unlink(missing_ok=True)
         
-        # Zpracovat email
-        email_data = await email_processor.parse_email(temp_path)
-        
-        # Konvertovat a uložit - předat informaci, jestli ukládat do INBOX_FOLDER
-        result = await email_processor.convert_and_save(
-            temp_path,
-            email_data,
-            project_name,
-            project_in_inbox=project_in_inbox,
-            inbox_folder=INBOX_FOLDER
+        # Parsování běží v procesu poolu - jeho RSS měří parse_eml_file,
+        # zápis (přílohy, markdown) běží v procesu aplikace
+        print(
+            f"[INFO] Upload {file.filename}: {metrics.format_timings(email_data._timings)} "
+            f"peak RSS parsování {email_data._parse_peak_rss_mb:.1f} MB (+{email_data._parse_rss_growth_mb:.1f} MB), "
+            f"aplikace {peak_rss_mb():.1f} MB"
         )
+        metrics.CONVERSIONS.inc(source="upload", status="200")
         
         return result
         
+    except UploadTooLargeError as e:
+        metrics.CONVERSIONS.inc(source="upload", status="413")
+        raise HTTPException(status_code=413, detail=str(e))
     except FileExistsError as e:
+        metrics.CONVERSIONS.inc(source="upload", status="409")
         raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
+        metrics.CONVERSIONS.inc(source="upload", status="500")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    project_name: str = Form(...)
+):
+    """
+    Asynchronní konverze - uloží .eml do fronty a hned vrátí job_id.
+    Stav se zjistí přes GET /api/jobs/{job_id} nebo SSE /api/jobs/{job_id}/events.
+    """
+    if not file.filename.endswith('.eml'):
+        raise HTTPException(status_code=400, detail="Soubor musí být .eml")
+    project_name = _normalize_project_name_or_400(project_name)
+    
+    eml_path = job_queue.new_job_path()
+    queued = False
+    try:
+        await email_processor.save_temp_file(file, temp_path=eml_path)
+        job = await job_queue.submit(
+            eml_path,
+            file.filename,
+            project_name,
+            project_in_inbox=_resolve_project_in_inbox(project_name)
+        )
+        queued = True
+        return job
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    finally:
+        # Soubor, který se do fronty nedostal (limit, plná fronta, chyba disku
+        # nebo SQLite, přerušený upload), by v JOBS_FOLDER zůstal navždy
+        if not queued:
+            eml_path.unlink(missing_ok=True)
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Vrátí stav úlohy (queued/running/done/failed), u dokončené i výsledek nebo chybu"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Úloha {job_id} neexistuje")
+    return job
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def get_job_events(job_id: str):
+    """Server-Sent Events se stavem úlohy při každé změně, stream končí dokončením úlohy"""
+    if await job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Úloha {job_id} neexistuje")
+    
+    async def stream():
+        async for job in job_queue.events(job_id):
+            yield f"data: {json.dumps(job, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/api/convert-batch")
+async def convert_batch(
+    files: List[UploadFile] = File(...),
+    project_name: str = Form(...)
+):
+    """
+    Dávková konverze - přijme více .eml souborů, zip archivy s .eml nebo mbox soubory.
+    Vrací NDJSON stream: jeden řádek s výsledkem pro každou zprávu
+    (status 200/409/500 jako u /api/convert-email) a na konci souhrn ("done": true).
+    """
+    for file in files:
+        if not file.filename.lower().endswith(BATCH_EXTENSIONS):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Nepodporovaný soubor {file.filename} (povoleno: {', '.join(BATCH_EXTENSIONS)})"
+            )
+    project_name = _normalize_project_name_or_400(project_name)
+    _raise_if_pool_full()
+    
+    # Uploady uložit na disk ještě před streamováním odpovědi
+    saved = []
+    try:
+        for file in files:
+            temp_path = email_processor.unique_temp_path(Path(file.filename).suffix.lower())
+            saved.append((file.filename, await email_processor.save_temp_file(
+                file, temp_path=temp_path, max_size=MAX_BATCH_UPLOAD_SIZE
+            )))
+    except UploadTooLargeError as e:
+        for _, temp_path in saved:
+            temp_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    return StreamingResponse(
+        _stream_batch(_iter_uploaded_messages(saved), project_name, [path for _, path in saved]),
+        media_type="application/x-ndjson"
+    )
+
+
+@app.post("/api/import")
+async def import_mailbox(
+    path: str = Form(...),
+    project_name: str = Form(...)
+):
+    """
+    Hromadný import z cesty v ROOT_FOLDER - mbox soubor, Maildir adresář,
+    adresář s .eml soubory nebo zip archiv. Odpověď je stejný NDJSON stream
+    jako u /api/convert-batch.
+    """
+    project_name = _normalize_project_name_or_400(project_name)
+    root_path = Path(ROOT_FOLDER).resolve()
+    source_path = (root_path / path).resolve()
+    if source_path != root_path and root_path not in source_path.parents:
+        raise HTTPException(status_code=400, detail="Cesta musí být uvnitř ROOT_FOLDER")
+    if not source_path.exists():
+        raise HTTPException(status_code=404, detail=f"Cesta {path} neexistuje")
+    _raise_if_pool_full()
+    
+    return StreamingResponse(
+        _stream_batch(iter_path_messages(source_path), project_name),
+        media_type="application/x-ndjson"
+    )
+
+
+def _raise_if_pool_full() -> None:
+    if worker_pool.pending >= worker_pool.max_pending:
+        raise HTTPException(
+            status_code=503,
+            detail="Server zpracovává maximum konverzí, zkuste to později",
+            headers={"Retry-After": "5"}
+        )
+
+
+def _iter_uploaded_messages(saved):
+    """Vrací zprávy z uložených uploadů - .eml přímo, zip a mbox rozbalí"""
+    for filename, temp_path in saved:
+        if temp_path.suffix == '.eml':
+            # Dočasný soubor převezme BatchImporter a po konverzi ho smaže
+            yield filename, temp_path
+        else:
+            try:
+                yield from iter_path_messages(temp_path, filename)
+            finally:
+                temp_path.unlink(missing_ok=True)
+
+
+async def _stream_batch(messages, project_name: str, temp_paths: List[Path] = ()):
+    """Spustí dávkovou konverzi a průběžně vrací výsledky jako NDJSON řádky"""
+    summary = {"total": 0, "succeeded": 0, "duplicates": 0, "failed": 0}
+    # Každá souběžná konverze dávky zabírá místo ve frontě jako jednotlivý upload
+    concurrency = min(BATCH_CONCURRENCY, worker_pool.max_pending)
+    try:
+        async with worker_pool.slot(concurrency):
+            importer = BatchImporter(email_processor, concurrency=concurrency)
+            async for result in importer.run(
+                messages,
+                project_name,
+                project_in_inbox=_resolve_project_in_inbox(project_name),
+                inbox_folder=INBOX_FOLDER
+            ):
+                summary["total"] += 1
+                if result["status"] == 200:
+                    summary["succeeded"] += 1
+                elif result["status"] == 409:
+                    summary["duplicates"] += 1
+                else:
+                    summary["failed"] += 1
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+    except PoolBusyError as e:
+        yield json.dumps({"status": 503, "detail": str(e)}, ensure_ascii=False) + "\n"
+    finally:
+        for temp_path in temp_paths:
+            temp_path.unlink(missing_ok=True)
+    
+    print(f"[INFO] Batch {project_name}: {summary}")
+    yield json.dumps({"done": True, "project_name": project_name, **summary}, ensure_ascii=False) + "\n"
+
+
 @app.get("/")
 async def root():
     """Serve app index.html"""
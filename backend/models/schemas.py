@@ -1,6 +1,7 @@
-from pydantic import BaseModel, field_validator
-from typing import List, Dict, Any, Union
+from pydantic import BaseModel, PrivateAttr, field_validator
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
+from pathlib import Path
 
 
 class EmailMetadata(BaseModel):
@@ -14,6 +15,26 @@ class EmailMetadata(BaseModel):
     body_html: str
     attachments: List[Dict[str, Any]] = []
     inline_images: List[Dict[str, Any]] = []
+    # Message-ID hlavička a hash obsahu (odesílatel, datum, tělo, přílohy) pro detekci duplicit
+    message_id: str = ""
+    content_hash: str = ""
+    # Odpověď na email (In-Reply-To) a předci ve vlákně od kořene (References)
+    in_reply_to: str = ""
+    references: List[str] = []
+    
+    # Soubory s dekódovanými přílohami ve stagingu úložiště (ve stejném pořadí
+    # jako attachments, None = prázdná příloha) z jediného parsování .eml,
+    # neserializují se do JSON
+    _attachment_files: Optional[List[Optional[Path]]] = PrivateAttr(default=None)
+    # Tělo větší než limit pro paměť - soubor v UTF-8 ve stagingu ({"path", "size",
+    # "sha256"}), body_text je pak prázdný
+    _body_file: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    # Doby fází konverze v sekundách (pro /metrics a log)
+    _timings: Dict[str, float] = PrivateAttr(default_factory=dict)
+    # Špičková RSS procesu, který email parsoval (worker poolu), a její nárůst
+    # během parsování v MB
+    _parse_peak_rss_mb: float = PrivateAttr(default=0.0)
+    _parse_rss_growth_mb: float = PrivateAttr(default=0.0)
     
     @field_validator('date', mode='before')
     @classmethod
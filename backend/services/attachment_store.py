@@ -0,0 +1,109 @@
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict
+
+from services.durable_writes import publish_exclusive
+
+
+# Adresář úložiště v ROOT_FOLDER (tečka = nezobrazí se jako projekt)
+STORE_FOLDER = ".attachments-store"
+
+# Podadresář pro právě dekódované přílohy - na stejném disku jako úložiště,
+# aby je šlo do úložiště jen přejmenovat
+STAGING_FOLDER = ".staging"
+
+
+class AttachmentStore:
+    """
+    Obsahově adresované úložiště příloh sdílené všemi projekty.
+
+    Každý unikátní obsah je na disku jen jednou (`.attachments-store/ab/abcdef...`)
+    a do `attachments/` projektů se vkládá jako hardlink. Stejné logo v podpisu
+    nebo stejné PDF ve všech odpovědích vlákna tak zabírá místo i zápis jen jednou.
+    Kde hardlinky nejsou podporované (jiný souborový systém, některé síťové
+    disky), soubor se zkopíruje.
+    """
+
+    def __init__(self, root_folder: str):
+        self.store_path = Path(root_folder) / STORE_FOLDER
+        self.staging_path = self.store_path / STAGING_FOLDER
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.store_path / sha256[:2] / sha256
+
+    def put_file(self, staged_path: Path, sha256: str) -> Path:
+        """
+        Přesune soubor ze stagingu do úložiště, pokud tam stejný obsah ještě
+        není (jinak ho smaže), a vrátí cestu k blobu. Přejmenování je atomické -
+        souběžné uložení stejného obsahu ani pád uprostřed nezanechá poškozený blob.
+        """
+        blob_path = self.blob_path(sha256)
+        if blob_path.exists():
+            staged_path.unlink(missing_ok=True)
+            return blob_path
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged_path, blob_path)
+        return blob_path
+
+    def cleanup_staging(self, max_age_seconds: float = 24 * 3600) -> None:
+        """Smaže staging soubory po přerušených konverzích (starší než max_age_seconds)"""
+        if not self.staging_path.exists():
+            return
+        threshold = time.time() - max_age_seconds
+        with os.scandir(self.staging_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < threshold:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def link(self, blob_path: Path, target_path: Path) -> bool:
+        """
+        Vloží blob na cílovou cestu jako hardlink (nebo kopii).
+        Vrací True, pokud se podařilo vytvořit hardlink. Existující cíl se
+        nikdy nepřepíše - FileExistsError a volající zvolí jiný název.
+        """
+        try:
+            os.link(blob_path, target_path)
+            return True
+        except FileExistsError:
+            raise
+        except OSError:
+            # Kopie přes dočasný soubor - pod cílovým názvem nikdy není rozepsaná
+            # a soubor, který tam mezitím vytvořila souběžná konverze, se nepřepíše
+            temp_path = target_path.parent / f".{uuid.uuid4().hex}.tmp"
+            try:
+                shutil.copyfile(blob_path, temp_path)
+                publish_exclusive(temp_path, target_path)
+            finally:
+                temp_path.unlink(missing_ok=True)
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Statistika úložiště. Úspora je počítána z počtu hardlinků:
+        blob s n odkazy (1 v úložišti + n-1 v projektech) by bez deduplikace
+        zabíral (n-1) × velikost, takže ušetřeno je (n-2) × velikost.
+        """
+        blobs = 0
+        stored_bytes = 0
+        referenced_bytes = 0
+        if self.store_path.exists():
+            for blob in self.store_path.glob("??/*"):
+                if blob.name.startswith('.'):
+                    continue
+                stat = blob.stat()
+                references = max(1, stat.st_nlink - 1)
+                blobs += 1
+                stored_bytes += stat.st_size
+                referenced_bytes += stat.st_size * references
+        return {
+            "blobs": blobs,
+            "stored_bytes": stored_bytes,
+            "referenced_bytes": referenced_bytes,
+            "saved_bytes": max(0, referenced_bytes - stored_bytes)
+        }
@@ -0,0 +1,173 @@
+import asyncio
+import mailbox
+import zipfile
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple, Union
+
+from services.email_processor import EmailProcessor
+from services import metrics
+
+
+# Přípony souborů, které umí dávkový import zpracovat
+BATCH_EXTENSIONS = ('.eml', '.zip', '.mbox')
+
+# Zdroj zprávy: (popis zdroje, obsah .eml jako bytes nebo cesta k již uloženému .eml)
+MessageSource = Tuple[str, Union[bytes, Path]]
+
+
+def iter_zip_messages(zip_path: Path, source_name: str = "") -> Iterator[MessageSource]:
+    """Vrací .eml soubory ze zip archivu (po jednom, archiv se nečte celý do paměti)"""
+    with zipfile.ZipFile(zip_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith('.eml'):
+                continue
+            yield f"{source_name}/{info.filename}", archive.read(info)
+
+
+def iter_mbox_messages(mbox_path: Path, source_name: str = "") -> Iterator[MessageSource]:
+    """Vrací zprávy z mbox souboru"""
+    box = mailbox.mbox(str(mbox_path), create=False)
+    try:
+        for index, key in enumerate(box.iterkeys()):
+            yield f"{source_name}#{index + 1}", box.get_bytes(key)
+    finally:
+        box.close()
+
+
+def iter_maildir_messages(maildir_path: Path, source_name: str = "") -> Iterator[MessageSource]:
+    """Vrací zprávy z Maildir adresáře (podsložky cur/ a new/)"""
+    box = mailbox.Maildir(str(maildir_path), factory=None, create=False)
+    for key in box.iterkeys():
+        yield f"{source_name}/{key}", box.get_bytes(key)
+
+
+def iter_path_messages(path: Path, source_name: Optional[str] = None) -> Iterator[MessageSource]:
+    """
+    Vrací zprávy z cesty na disku podle jejího typu:
+    Maildir adresář, adresář s .eml soubory, zip archiv, mbox nebo samotný .eml.
+    """
+    source_name = source_name or path.name
+    if path.is_dir():
+        if (path / "cur").is_dir() or (path / "new").is_dir():
+            yield from iter_maildir_messages(path, source_name)
+        else:
+            for eml_file in sorted(path.rglob("*.eml")):
+                yield f"{source_name}/{eml_file.relative_to(path)}", eml_file.read_bytes()
+    elif path.suffix.lower() == '.zip':
+        yield from iter_zip_messages(path, source_name)
+    elif path.suffix.lower() == '.eml':
+        yield source_name, path.read_bytes()
+    else:
+        # Ostatní soubory se zkusí načíst jako mbox
+        yield from iter_mbox_messages(path, source_name)
+
+
+class BatchImporter:
+    """
+    Paralelní konverze většího množství zpráv do jednoho projektu.
+
+    Zprávy se čtou ze zdroje postupně a zpracovává je `concurrency` souběžných
+    pracovníků nad sdíleným EmailProcessorem (a jeho WorkerPoolem). Fronta mezi
+    čtením a konverzí je omezená, takže i mbox s desítkami tisíc zpráv drží
+    v paměti jen několik zpráv najednou.
+
+    Výsledky se vrací průběžně v pořadí dokončení. Každá položka má stejnou
+    sémantiku jako /api/convert-email: status 200, 409 (duplicita) nebo 500.
+    """
+
+    def __init__(self, processor: EmailProcessor, concurrency: int = 4):
+        self.processor = processor
+        self.concurrency = max(1, concurrency)
+
+    async def run(
+        self,
+        messages: Iterator[MessageSource],
+        project_name: str,
+        project_in_inbox: bool = True,
+        inbox_folder: str = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results: asyncio.Queue = asyncio.Queue()
+        done_marker = object()
+
+        async def produce() -> None:
+            index = 0
+            try:
+                while True:
+                    # Čtení archivu / mboxu je blokující - běží mimo event loop
+                    item = await self.processor._run_io(next, messages, None)
+                    if item is None:
+                        break
+                    await queue.put((index, item[0], item[1]))
+                    index += 1
+            except Exception as e:
+                await results.put({
+                    "index": index,
+                    "source": "",
+                    "status": 500,
+                    "detail": f"Chyba při čtení zdroje: {str(e)}"
+                })
+            finally:
+                for _ in range(self.concurrency):
+                    await queue.put(done_marker)
+
+        async def consume() -> None:
+            while True:
+                item = await queue.get()
+                if item is done_marker:
+                    break
+                index, source, payload = item
+                result = await self._convert_one(payload, project_name, project_in_inbox, inbox_folder)
+                result.update({"index": index, "source": source})
+                await results.put(result)
+            await results.put(done_marker)
+
+        producer = asyncio.create_task(produce())
+        consumers = [asyncio.create_task(consume()) for _ in range(self.concurrency)]
+        try:
+            finished = 0
+            while finished < self.concurrency:
+                result = await results.get()
+                if result is done_marker:
+                    finished += 1
+                    continue
+                yield result
+        finally:
+            # Při přerušení (např. klient zavřel spojení) zrušit rozpracovanou práci
+            for task in [producer, *consumers]:
+                task.cancel()
+            await asyncio.gather(producer, *consumers, return_exceptions=True)
+
+    async def _convert_one(
+        self,
+        payload: Union[bytes, Path],
+        project_name: str,
+        project_in_inbox: bool,
+        inbox_folder: str
+    ) -> Dict[str, Any]:
+        """Zkonvertuje jednu zprávu a vrátí výsledek místo vyhození výjimky"""
+        if isinstance(payload, Path):
+            temp_path = payload
+        else:
+            temp_path = self.processor.unique_temp_path('.eml')
+            await self.processor._run_io(temp_path.write_bytes, payload)
+        try:
+            email_data = await self.processor.parse_email(temp_path)
+            result = await self.processor.convert_and_save(
+                temp_path,
+                email_data,
+                project_name,
+                project_in_inbox=project_in_inbox,
+                inbox_folder=inbox_folder
+            )
+            metrics.CONVERSIONS.inc(source="batch", status="200")
+            return {"status": 200, "filename": result["filename"]}
+        except FileExistsError as e:
+            metrics.CONVERSIONS.inc(source="batch", status="409")
+            return {"status": 409, "detail": str(e)}
+        except Exception as e:
+            metrics.CONVERSIONS.inc(source="batch", status="500")
+            return {"status": 500, "detail": str(e)}
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
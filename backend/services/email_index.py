@@ -0,0 +1,527 @@
+import hashlib
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+
+# Název souboru s indexem v adresáři projektu (tečka = skrytý, nezobrazí se jako email)
+INDEX_FILENAME = ".emails-index.sqlite"
+
+# Verze schématu - při změně se index zahodí a vytvoří znovu ze souborů
+SCHEMA_VERSION = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS emails (
+    filename TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    date_sort TEXT NOT NULL,
+    from_email TEXT NOT NULL,
+    from_domain TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    attachment_count INTEGER NOT NULL,
+    message_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    in_reply_to TEXT NOT NULL,
+    thread_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS emails_date_sort ON emails (date_sort);
+CREATE INDEX IF NOT EXISTS emails_from ON emails (from_email COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS emails_subject ON emails (subject COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS emails_from_domain ON emails (from_domain);
+CREATE INDEX IF NOT EXISTS emails_message_id ON emails (message_id) WHERE message_id != '';
+CREATE INDEX IF NOT EXISTS emails_content_hash ON emails (content_hash) WHERE content_hash != '';
+CREATE INDEX IF NOT EXISTS emails_thread ON emails (thread_id, date_sort);
+CREATE TABLE IF NOT EXISTS email_refs (
+    filename TEXT NOT NULL,
+    message_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS email_refs_message_id ON email_refs (message_id);
+CREATE INDEX IF NOT EXISTS email_refs_filename ON email_refs (filename);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Povolené klíče řazení -> výraz pro ORDER BY (druhý klíč zajistí stabilní stránkování)
+SORT_COLUMNS = {
+    "date": "date_sort {order}, filename {order}",
+    "from": "from_email COLLATE NOCASE {order}, date_sort DESC, filename DESC",
+    "subject": "subject COLLATE NOCASE {order}, date_sort DESC, filename DESC"
+}
+
+
+# Maximální počet Message-ID z References, podle kterých se hledá vlákno
+# (první = kořen vlákna a posledních několik předků stačí)
+MAX_THREAD_REFERENCES = 50
+
+
+def thread_key(root: str) -> str:
+    """Krátký identifikátor vlákna (do URL) z Message-ID jeho kořene"""
+    return hashlib.sha1(root.encode('utf-8')).hexdigest()[:16]
+
+
+FRONT_MATTER_DELIMITER = b'---'
+
+
+def yaml_loader():
+    """
+    YAML loader pro front-matter - C implementace (libyaml) je řádově
+    rychlejší, pokud je k dispozici. yaml se importuje až při prvním čtení,
+    start aplikace na něj nečeká.
+    """
+    import yaml
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def read_front_matter(md_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Načte YAML front-matter z markdown souboru (None, pokud soubor žádný nemá).
+    Čte se jen po uzavírací řádek `---`, tělo emailu se vůbec nenačítá.
+    """
+    lines = []
+    with open(md_path, 'rb') as f:
+        if f.readline().rstrip(b'\r\n') != FRONT_MATTER_DELIMITER:
+            return None
+        for line in f:
+            if line.rstrip(b'\r\n') == FRONT_MATTER_DELIMITER:
+                break
+            lines.append(line)
+        else:
+            # Chybí uzavírací oddělovač
+            return None
+    import yaml
+    return yaml.load(b''.join(lines).decode('utf-8'), Loader=yaml_loader()) or {}
+
+
+def parse_email_date(email_date_str: str, md_stem: str) -> Optional[datetime]:
+    """
+    Převede datum z front-matter na datetime.
+    Pokud se to nepodaří, zkusí datum vyčíst z názvu souboru (YYYY-MM-DD_HH-MM-SS_slug).
+    """
+    if not email_date_str:
+        return None
+    try:
+        # Zkusit ISO formát (s nebo bez timezone)
+        if 'Z' in email_date_str:
+            return datetime.fromisoformat(email_date_str.replace('Z', '+00:00'))
+        elif '+' in email_date_str or email_date_str.count('-') >= 2:
+            # ISO formát s timezone nebo bez
+            return datetime.fromisoformat(email_date_str.replace('+00:00', ''))
+        else:
+            # Jiný formát - zkusit parsovat
+            return datetime.fromisoformat(email_date_str)
+    except Exception:
+        # Pokud selže parsing, zkusit extrahovat z názvu souboru
+        try:
+            date_time_part = md_stem[:19]
+            # Formát: YYYY-MM-DD_HH-MM-SS
+            if len(date_time_part) >= 19:
+                return datetime.strptime(date_time_part, '%Y-%m-%d_%H-%M-%S')
+            elif len(date_time_part) >= 10:
+                return datetime.strptime(date_time_part[:10], '%Y-%m-%d')
+        except Exception:
+            pass
+    return None
+
+
+class EmailIndex:
+    """
+    Index metadat emailů jednoho projektu (SQLite soubor v adresáři projektu).
+
+    Index plní convert_and_save při zápisu emailu. Při čtení se porovná se
+    soubory na disku podle mtime a velikosti - nové nebo změněné soubory se
+    doparsují, smazané se z indexu odeberou. Výpis emailů tak místo čtení
+    a parsování všech .md souborů stojí jeden průchod adresářem a jeden dotaz.
+    """
+
+    def __init__(self, project_path: Path):
+        self.project_path = Path(project_path)
+        self.index_path = self.project_path / INDEX_FILENAME
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.index_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            # Journal se jen zkracuje místo mazání - každý zápis by jinak vytvářel
+            # a mazal soubor v adresáři projektu
+            conn.execute("PRAGMA journal_mode=TRUNCATE")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # Zámek na zápis a nové ověření - souběžná konverze mohla schéma právě vytvořit
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    # Staré schéma - zahodit, data se doplní ze souborů při synchronizaci
+                    conn.execute("DROP TABLE IF EXISTS emails")
+                    conn.execute("DROP TABLE IF EXISTS email_refs")
+                    conn.execute("DROP TABLE IF EXISTS meta")
+                    for statement in SCHEMA.split(";"):
+                        if statement.strip():
+                            conn.execute(statement)
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                conn.commit()
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_from_front_matter(md_path: Path, front_matter: Dict[str, Any], stat: os.stat_result) -> Dict[str, Any]:
+        email_date_str = str(front_matter.get('date') or '')
+        email_date = parse_email_date(email_date_str, md_path.stem)
+        from_email = str(front_matter.get('from') or '')
+        attachments = front_matter.get('attachments') or []
+        references = front_matter.get('references') or []
+        return {
+            "filename": md_path.name,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "date": email_date.isoformat() if email_date else email_date_str,
+            "date_sort": email_date.isoformat() if email_date else "",
+            "from_email": from_email,
+            "from_domain": from_email.split('@')[-1].lower() if '@' in from_email else "",
+            "subject": str(front_matter.get('subject') or ''),
+            "attachment_count": len(attachments) if isinstance(attachments, list) else 0,
+            "message_id": str(front_matter.get('message_id') or ''),
+            "content_hash": str(front_matter.get('content_hash') or ''),
+            "in_reply_to": str(front_matter.get('in_reply_to') or ''),
+            "references": [str(ref) for ref in references] if isinstance(references, list) else []
+        }
+
+    def _upsert(self, conn: sqlite3.Connection, row: Dict[str, Any]) -> None:
+        # Předci emailu - References (od kořene) a In-Reply-To
+        ancestors = list(dict.fromkeys([*row["references"], row["in_reply_to"]]))
+        ancestors = [ref for ref in ancestors if ref and ref != row["message_id"]]
+        if len(ancestors) > MAX_THREAD_REFERENCES:
+            ancestors = ancestors[:1] + ancestors[-(MAX_THREAD_REFERENCES - 1):]
+        conn.execute("DELETE FROM email_refs WHERE filename = ?", (row["filename"],))
+        thread_id = self._thread_id(conn, row["filename"], row["message_id"], ancestors)
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO emails
+                (filename, mtime_ns, size, date, date_sort, from_email, from_domain, subject,
+                 attachment_count, message_id, content_hash, in_reply_to, thread_id)
+            VALUES
+                (:filename, :mtime_ns, :size, :date, :date_sort, :from_email, :from_domain, :subject,
+                 :attachment_count, :message_id, :content_hash, :in_reply_to, :thread_id)
+            """,
+            {**row, "thread_id": thread_id}
+        )
+        conn.executemany(
+            "INSERT INTO email_refs (filename, message_id) VALUES (?, ?)",
+            [(row["filename"], ref) for ref in ancestors]
+        )
+
+    @staticmethod
+    def _thread_id(conn: sqlite3.Connection, filename: str, message_id: str, ancestors: List[str]) -> str:
+        """
+        Určí vlákno emailu. Vlákno je skupina emailů propojených přes Message-ID,
+        In-Reply-To a References - na pořadí importu nezáleží. Email se připojí
+        k vláknu předka, k vláknu odpovědí, které přišly dřív než on, i k vláknu
+        sourozenců se stejným (třeba chybějícím) předkem. Propojí-li email dvě
+        dosud samostatná vlákna, sloučí se. Nové vlákno dostane klíč podle
+        kořene (první z References), takže odpovědi mají stejný klíč, i když
+        kořenový email v projektu chybí.
+        """
+        found = set()
+        if ancestors:
+            placeholders = ",".join("?" * len(ancestors))
+            found.update(row[0] for row in conn.execute(
+                f"SELECT DISTINCT thread_id FROM emails WHERE message_id IN ({placeholders}) AND filename != ?",
+                (*ancestors, filename)
+            ))
+            found.update(row[0] for row in conn.execute(
+                f"""
+                SELECT DISTINCT e.thread_id FROM email_refs r JOIN emails e ON e.filename = r.filename
+                WHERE r.message_id IN ({placeholders}) AND e.filename != ?
+                """,
+                (*ancestors, filename)
+            ))
+        if message_id:
+            found.update(row[0] for row in conn.execute(
+                """
+                SELECT DISTINCT e.thread_id FROM email_refs r JOIN emails e ON e.filename = r.filename
+                WHERE r.message_id = ? AND e.filename != ?
+                """,
+                (message_id, filename)
+            ))
+        if not found:
+            return thread_key(ancestors[0] if ancestors else message_id or filename)
+        thread_id = min(found)
+        merged = sorted(found - {thread_id})
+        if merged:
+            conn.execute(
+                f"UPDATE emails SET thread_id = ? WHERE thread_id IN ({','.join('?' * len(merged))})",
+                (thread_id, *merged)
+            )
+        return thread_id
+
+    @contextmanager
+    def locked(self):
+        """
+        Spojení se zámkem indexu pro zápis (BEGIN IMMEDIATE). Zámek SQLite platí
+        i mezi procesy - kontrola duplicit, zveřejnění .md a zápis do indexu
+        pod ním proběhnou pro projekt vždy jen jednou, i když na stejný
+        ROOT_FOLDER zapisuje víc workerů. Spojení se předává do find_duplicate
+        a add.
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+    def add(self, md_path: Path, front_matter: Dict[str, Any], conn: Optional[sqlite3.Connection] = None) -> None:
+        """Zapíše do indexu právě uložený email (volá convert_and_save)"""
+        row = self._row_from_front_matter(md_path, front_matter, md_path.stat())
+        if conn is not None:
+            self._upsert(conn, row)
+            return
+        with self._connect() as conn:
+            self._upsert(conn, row)
+
+    def find_duplicate(
+        self, message_id: str, content_hash: str, filename: str, conn: Optional[sqlite3.Connection] = None
+    ) -> Optional[str]:
+        """
+        Najde v projektu již uložený stejný email a vrátí název jeho souboru.
+        Shoda je podle Message-ID nebo obsahového hashe. Soubor se stejným
+        názvem bez uloženého hashe (starší emaily) se bere jako duplicita,
+        jak tomu bylo dříve.
+
+        Běží při každé konverzi (i pod zámkem indexu), proto adresář neprochází:
+        dotazuje se přímo na indexované sloupce a stat() dělá jen u nalezených
+        souborů a u cílového názvu. Soubory přidané mimo aplikaci se do indexu
+        dostanou při nejbližším výpisu nebo hledání (sync).
+        """
+        if conn is None:
+            with self._connect() as conn:
+                return self.find_duplicate(message_id, content_hash, filename, conn)
+        # Cílový název mohl vzniknout nebo se změnit mimo aplikaci
+        self._refresh_file(conn, filename)
+        for column, value in (("message_id", message_id), ("content_hash", content_hash)):
+            if not value:
+                continue
+            rows = conn.execute(f"SELECT filename FROM emails WHERE {column} = ?", (value,)).fetchall()
+            for row in rows:
+                # Smazaný nebo přepsaný soubor se v indexu opraví a shoda se ověří znovu
+                if self._refresh_file(conn, row["filename"]) and conn.execute(
+                    f"SELECT 1 FROM emails WHERE filename = ? AND {column} = ?", (row["filename"], value)
+                ).fetchone():
+                    return row["filename"]
+        row = conn.execute(
+            "SELECT filename FROM emails WHERE filename = ? AND content_hash = ''", (filename,)
+        ).fetchone()
+        return row["filename"] if row is not None else None
+
+    def _refresh_file(self, conn: sqlite3.Connection, filename: str) -> bool:
+        """
+        Srovná řádek indexu s jedním souborem (jeden stat). Vrací True, pokud
+        je soubor v indexu jako email.
+        """
+        md_path = self.project_path / filename
+        try:
+            stat = md_path.stat()
+        except FileNotFoundError:
+            self._delete(conn, [filename])
+            return False
+        row = conn.execute("SELECT mtime_ns, size FROM emails WHERE filename = ?", (filename,)).fetchone()
+        if row is not None and (row["mtime_ns"], row["size"]) == (stat.st_mtime_ns, stat.st_size):
+            return True
+        return self._reindex(conn, md_path, stat)
+
+    def _reindex(self, conn: sqlite3.Connection, md_path: Path, stat: os.stat_result) -> bool:
+        """Znovu načte front-matter nového nebo změněného souboru do indexu"""
+        try:
+            front_matter = read_front_matter(md_path)
+        except Exception as e:
+            print(f"[WARNING] Chyba při parsování souboru {md_path.name}: {str(e)}")
+            front_matter = None
+        if front_matter is None:
+            # Soubor bez front-matter se nezobrazuje
+            self._delete(conn, [md_path.name])
+            return False
+        self._upsert(conn, self._row_from_front_matter(md_path, front_matter, stat))
+        return True
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, filenames: List[str]) -> None:
+        conn.executemany("DELETE FROM emails WHERE filename = ?", [(name,) for name in filenames])
+        conn.executemany("DELETE FROM email_refs WHERE filename = ?", [(name,) for name in filenames])
+
+    def sync(self, conn: sqlite3.Connection) -> None:
+        """
+        Srovná index se soubory na disku podle mtime a velikosti (pro výpis
+        a hledání). Adresář se prochází vždy - úprava .md na místě mtime
+        adresáře nemění, přepsaný front-matter se ale musí projevit. Znovu se
+        čtou jen nové a změněné soubory, ostatní stojí jeden stat().
+        """
+        indexed = {
+            row["filename"]: (row["mtime_ns"], row["size"])
+            for row in conn.execute("SELECT filename, mtime_ns, size FROM emails")
+        }
+        seen = set()
+        with os.scandir(self.project_path) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.md') or not entry.is_file():
+                    continue
+                seen.add(entry.name)
+                stat = entry.stat()
+                if indexed.get(entry.name) != (stat.st_mtime_ns, stat.st_size):
+                    self._reindex(conn, Path(entry.path), stat)
+        removed = [name for name in indexed if name not in seen]
+        if removed:
+            self._delete(conn, removed)
+
+    def list_emails(
+        self,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        sort: str = "date",
+        order: str = "desc",
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        domain: Optional[str] = None,
+        has_attachments: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Vrátí stránku seznamu emailů projektu a celkový počet odpovídajících emailů.
+        
+        Args:
+            offset, limit: Stránkování (limit None = všechny emaily)
+            sort: Klíč řazení - "date", "from" nebo "subject"
+            order: "asc" nebo "desc"
+            date_from, date_to: Rozsah data (ISO formát, date_to včetně celého dne)
+            domain: Doména odesílatele (včetně subdomén)
+            has_attachments: Jen emaily s přílohami (True) nebo bez nich (False)
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Neplatný klíč řazení: {sort}")
+        if order not in ("asc", "desc"):
+            raise ValueError(f"Neplatný směr řazení: {order}")
+        
+        conditions = []
+        params: List[Any] = []
+        if date_from:
+            conditions.append("date_sort != '' AND date_sort >= ?")
+            params.append(date_from)
+        if date_to:
+            # Datum bez času zahrnuje celý den
+            conditions.append("date_sort != '' AND date_sort < ?")
+            params.append(date_to + "\uffff" if len(date_to) <= 10 else date_to)
+        if domain:
+            domain = domain.lower().lstrip('@')
+            conditions.append("(from_domain = ? OR from_domain LIKE ?)")
+            params.extend([domain, f"%.{domain}"])
+        if has_attachments is not None:
+            conditions.append("attachment_count > 0" if has_attachments else "attachment_count = 0")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order_by = SORT_COLUMNS[sort].format(order=order.upper())
+        
+        with self._connect() as conn:
+            self.sync(conn)
+            total = conn.execute(f"SELECT COUNT(*) FROM emails {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"""
+                SELECT filename, date, from_email, subject, attachment_count, thread_id FROM emails
+                {where} ORDER BY {order_by} LIMIT ? OFFSET ?
+                """,
+                [*params, -1 if limit is None else limit, offset]
+            ).fetchall()
+        return {
+            "emails": [
+                {
+                    "filename": row["filename"],
+                    "date": row["date"],
+                    "from": row["from_email"],
+                    "subject": row["subject"],
+                    "attachments": row["attachment_count"],
+                    "thread_id": row["thread_id"]
+                }
+                for row in rows
+            ],
+            "total": total,
+            "offset": offset,
+            "limit": limit
+        }
+
+    def list_threads(self, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Vrátí stránku vláken projektu seřazenou podle posledního emailu (nejnovější první)"""
+        with self._connect() as conn:
+            self.sync(conn)
+            total = conn.execute("SELECT COUNT(DISTINCT thread_id) FROM emails").fetchone()[0]
+            rows = conn.execute(
+                """
+                SELECT thread_id, COUNT(*) AS messages, MIN(date_sort) AS first_date, MAX(date_sort) AS last_date,
+                       GROUP_CONCAT(DISTINCT from_email) AS participants,
+                       (SELECT subject FROM emails first WHERE first.thread_id = e.thread_id
+                        ORDER BY date_sort, filename LIMIT 1) AS subject
+                FROM emails e GROUP BY thread_id
+                ORDER BY last_date DESC, thread_id LIMIT ? OFFSET ?
+                """,
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+        return {
+            "threads": [
+                {
+                    "thread_id": row["thread_id"],
+                    "subject": row["subject"],
+                    "messages": row["messages"],
+                    "first_date": row["first_date"],
+                    "last_date": row["last_date"],
+                    "participants": sorted(filter(None, (row["participants"] or "").split(",")))
+                }
+                for row in rows
+            ],
+            "total": total,
+            "offset": offset,
+            "limit": limit
+        }
+
+    def thread_messages(self, thread_id: str) -> List[Dict[str, Any]]:
+        """Emaily vlákna seřazené podle data"""
+        with self._connect() as conn:
+            self.sync(conn)
+            rows = conn.execute(
+                """
+                SELECT filename, date, from_email, subject, attachment_count, message_id, in_reply_to
+                FROM emails WHERE thread_id = ? ORDER BY date_sort, filename
+                """,
+                (thread_id,)
+            ).fetchall()
+        return [
+            {
+                "filename": row["filename"],
+                "date": row["date"],
+                "from": row["from_email"],
+                "subject": row["subject"],
+                "attachments": row["attachment_count"],
+                "message_id": row["message_id"],
+                "in_reply_to": row["in_reply_to"]
+            }
+            for row in rows
+        ]
+
+    def has_message(self, message_ids: Iterable[str]) -> bool:
+        """
+        Zjistí, jestli je v projektu uložený některý z emailů podle Message-ID.
+        Volá se při konverzi, proto jako find_duplicate neprochází adresář.
+        """
+        message_ids = [message_id for message_id in message_ids if message_id]
+        if not message_ids:
+            return False
+        with self._connect() as conn:
+            placeholders = ','.join('?' * len(message_ids))
+            rows = conn.execute(
+                f"SELECT filename FROM emails WHERE message_id IN ({placeholders})", message_ids
+            ).fetchall()
+            for row in rows:
+                if self._refresh_file(conn, row["filename"]) and conn.execute(
+                    f"SELECT 1 FROM emails WHERE filename = ? AND message_id IN ({placeholders})",
+                    (row["filename"], *message_ids)
+                ).fetchone():
+                    return True
+        return False
@@ -1,88 +1,394 @@
 import os
+import io
 import re
-import unicodedata
-import base64
+import hashlib
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import quote, unquote
 import tempfile
-import mailparser
+import threading
+import time
+import uuid
+import resource
+import sqlite3
+import aiofiles
 from datetime import datetime
-import markdownify
-import yaml
 from models.schemas import EmailMetadata
+from services.worker_pool import WorkerPool
+from services.email_index import EmailIndex
+from services.project_cache import ProjectCache
+from services.attachment_store import AttachmentStore
+from services.durable_writes import FsyncBatcher, publish_exclusive
+from services.mime_extractor import DEFAULT_TEXT_SPILL_SIZE, MimeExtractor
+from services.search_index import MAX_INDEXED_BODY_SIZE, SearchIndex, strip_diacritics
+from services.html_converter import DEFAULT_MAX_HTML_SIZE, html_to_markdown, load_converter
+from services.threads import strip_quoted_text
+from services import metrics
+
+
+# Velikost bloku pro streamované ukládání uploadu
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Odkaz na inline obrázek: "[cid:...]" v textové části (Outlook), jinak "cid:..." v Markdown odkazu
+_CID_PLACEHOLDER_RE = re.compile(r"(?<![!\]])\[cid:([^\]\s]+)\]", re.IGNORECASE)
+_CID_REFERENCE_RE = re.compile(r"cid:([^\s)\]>\"']+)", re.IGNORECASE)
+
+# Message-ID v hlavičkách In-Reply-To a References
+_MESSAGE_ID_RE = re.compile(r"<[^<>\s]+>")
+
+# Uložení těla většího než limit pro paměť: celé do markdownu, zkrácené na limit,
+# nebo zkrácené s celým tělem jako textovou přílohou
+LARGE_BODY_MODES = ("inline", "truncate", "file")
+
+# Fáze měřené v convert_and_save (fáze parsování zapisuje do metrik parse_email)
+WRITE_STAGES = ("reparse", "write_attachments", "yaml_dump", "write_markdown", "fsync", "index")
+
+
+class UploadTooLargeError(Exception):
+    """Uploadovaný soubor překročil povolenou velikost"""
+
+
+def peak_rss_mb() -> float:
+    """Vrátí špičkovou RSS paměť procesu v MB (ru_maxrss je na Linuxu v KB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def compute_content_hash(
+    from_email: str,
+    date: datetime,
+    body_text: str,
+    attachments: List[Dict[str, Any]],
+    body_path: Optional[Path] = None
+) -> str:
+    """
+    Hash obsahu emailu pro detekci duplicit. Předmět se záměrně nepočítá -
+    stejný email uložený znovu s upraveným předmětem (např. prefix brány
+    "[EXT]") je pořád tentýž email. Velké tělo uložené v souboru (body_path,
+    UTF-8) se čte po blocích - hash je stejný jako pro stejný body_text.
+    """
+    digest = hashlib.sha256()
+    parts = [from_email.lower(), date.isoformat(), body_text]
+    parts.extend(sorted(att.get("sha256", "") for att in attachments))
+    for position, part in enumerate(parts):
+        if position == 2 and body_path is not None:
+            with open(body_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+        else:
+            digest.update(part.encode('utf-8', 'surrogatepass'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _join_text_parts(text_parts: List[Dict[str, Any]], staging_folder: Path, spill_size: int) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Spojí textové části zprávy (v pořadí zprávy, oddělené jedním prázdným
+    řádkem) do těla emailu. Vrací (text, None), nebo - je-li tělo větší než spill_size -
+    ("", {"path", "size", "sha256"}) se souborem těla ve stagingu.
+    """
+    parts = [part for part in text_parts if part.get("path") is not None or part["text"]]
+    total = sum(part["size"] if "path" in part else len(part["text"]) for part in parts)
+    if not any("path" in part for part in parts) and total <= spill_size:
+        text = ""
+        for part in parts:
+            if text:
+                text += "\n" if text.endswith("\n") else "\n\n"
+            text += part["text"]
+        return text, None
+    
+    body_path = Path(staging_folder) / f"{uuid.uuid4().hex}.txt"
+    digest = hashlib.sha256()
+    size = 0
+    last = b""
+    with open(body_path, 'wb') as out:
+        def write(data: bytes) -> None:
+            nonlocal size, last
+            if data:
+                digest.update(data)
+                out.write(data)
+                size += len(data)
+                last = data[-1:]
+        
+        for position, part in enumerate(parts):
+            if position:
+                write(b"\n" if last == b"\n" else b"\n\n")
+            if "path" not in part:
+                write(part["text"].encode('utf-8', 'surrogatepass'))
+                continue
+            with open(part["path"], 'rb') as f:
+                for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+                    write(chunk)
+    for part in parts:
+        if "path" in part:
+            Path(part["path"]).unlink(missing_ok=True)
+    return "", {"path": body_path, "size": size, "sha256": digest.hexdigest()}
+
+
+def parse_message_ids(header: Optional[str]) -> List[str]:
+    """Seznam Message-ID z hlavičky In-Reply-To nebo References (v původním pořadí, bez opakování)"""
+    if not header:
+        return []
+    return list(dict.fromkeys(_MESSAGE_ID_RE.findall(str(header))))
+
+
+def rewrite_cid_references(text: str, cid_files: Dict[str, str]) -> str:
+    """
+    Přepíše odkazy na inline obrázky (cid:) na relativní cesty k uloženým
+    přílohám (attachments/<soubor>). cid_files mapuje Content-ID (bez <>) na
+    název souboru v attachments/. Neznámé cid: odkazy zůstanou beze změny.
+    """
+    if not cid_files or "cid:" not in text.lower():
+        return text
+    
+    def placeholder(match: re.Match) -> str:
+        filename = cid_files.get(match.group(1))
+        return f"![{filename}](attachments/{quote(filename)})" if filename else match.group(0)
+    
+    def reference(match: re.Match) -> str:
+        filename = cid_files.get(match.group(1)) or cid_files.get(unquote(match.group(1)))
+        return f"attachments/{quote(filename)}" if filename else match.group(0)
+    
+    text = _CID_PLACEHOLDER_RE.sub(placeholder, text)
+    return _CID_REFERENCE_RE.sub(reference, text)
+
+
+def preload_converters() -> None:
+    """
+    Naimportuje knihovny konverze (mailparser, yaml, BeautifulSoup, markdownify).
+    Importují se líně až při první konverzi, aby aplikace startovala rychle;
+    po startu se tato funkce volá na pozadí (i v procesech poolu), takže
+    první konverze na import nečeká.
+    """
+    import mailparser  # noqa: F401
+    import mailparser.utils  # noqa: F401
+    import yaml  # noqa: F401
+    load_converter()
+
+
+def parse_eml_file(
+    eml_path: Path,
+    staging_folder: Path,
+    html_engine: str = "auto",
+    html_max_size: int = DEFAULT_MAX_HTML_SIZE,
+    body_spill_size: int = DEFAULT_TEXT_SPILL_SIZE
+) -> EmailMetadata:
+    """
+    Parsuje .eml soubor a vrátí metadata. Přílohy se dekódují streamovaně
+    do souborů ve staging_folder (cesty jsou v _attachment_files), mailparser
+    dostane jen kostru zprávy s hlavičkami a HTML částmi. Textové části
+    dekóduje MimeExtractor a tělo je jejich spojení; tělo větší než
+    body_spill_size zůstává v souboru ve stagingu (_body_file) a v metadatech
+    je body_text prázdný.
+    Funkce je na úrovni modulu, aby ji šlo spustit v procesovém poolu.
+    Doby jednotlivých fází vrací v _timings, špičkovou RSS procesu
+    (ru_maxrss měří jen proces, ve kterém parsování běží) v _parse_peak_rss_mb.
+    """
+    import mailparser
+    rss_before = peak_rss_mb()
+    timings: Dict[str, float] = {}
+    extractor = MimeExtractor(staging_folder, text_spill_size=body_spill_size)
+    with metrics.span(timings, "extract_attachments"):
+        skeleton, extracted = extractor.extract(eml_path)
+    try:
+        # Stejné čtení jako mailparser.parse_from_file - UTF-8 text s univerzálními konci řádků
+        with metrics.span(timings, "mailparser"):
+            mail = mailparser.parse_from_file_obj(
+                io.TextIOWrapper(io.BytesIO(skeleton), encoding="utf-8", errors="ignore")
+            )
+        body_text, body_file = _join_text_parts(extractor.text_parts, staging_folder, body_spill_size)
+    except BaseException:
+        extractor.discard()
+        raise
+    
+    # Extrahovat základní metadata
+    from_email = mail.from_[0][1] if mail.from_ else ""
+    from_domain = from_email.split('@')[-1] if '@' in from_email else ""
+    
+    to_emails = [addr[1] for addr in mail.to] if mail.to else []
+    cc_emails = [addr[1] for addr in mail.cc] if mail.cc else []
+    
+    # Tělo emailu jsou všechny textové části, HTML jen když žádná není
+    body_html = mail.text_html[0] if mail.text_html else ""
+    
+    # Pokud není plain text, převést z HTML
+    if not body_text and body_file is None and body_html:
+        with metrics.span(timings, "html_to_markdown"):
+            body_text = html_to_markdown(body_html, engine=html_engine, max_size=html_max_size)
+    
+    # Přílohy a inline obrázky - obsah je už na disku, v metadatech jen cesty,
+    # aby convert_and_save nemusel .eml soubor parsovat znovu
+    attachments = []
+    inline_images = []
+    attachment_files = []
+    for att in extracted:
+        filename = att["filename"] or "unknown"
+        attachments.append({
+            "filename": filename,
+            "content_type": att["mail_content_type"] or "application/octet-stream",
+            "size": att["size"],
+            "sha256": att["sha256"],
+            "content_id": att["content-id"].strip().strip("<>")
+        })
+        attachment_files.append(att["path"])
+        if EmailProcessor._is_inline(att):
+            inline_images.append({
+                "cid": att["content-id"].strip("<>"),
+                "filename": filename,
+                "content_type": att["mail_content_type"] or ""
+            })
+    
+    # Hlavičky vlákna - In-Reply-To může obsahovat i komentář, bere se první Message-ID
+    in_reply_to = parse_message_ids(mail.message.get("In-Reply-To"))
+    references = parse_message_ids(mail.message.get("References"))
+    
+    date = mail.date if mail.date else datetime.now()
+    email_data = EmailMetadata(
+        subject=mail.subject or "",
+        from_email=from_email,
+        from_domain=from_domain,
+        to=to_emails,
+        cc=cc_emails,
+        date=date,
+        body_text=body_text,
+        body_html=body_html,
+        attachments=attachments,
+        inline_images=inline_images,
+        message_id=(mail.message_id or "").strip(),
+        in_reply_to=in_reply_to[0] if in_reply_to else "",
+        references=references,
+        content_hash=compute_content_hash(
+            from_email, date, body_text, attachments, body_file["path"] if body_file else None
+        )
+    )
+    email_data._attachment_files = attachment_files
+    email_data._body_file = body_file
+    email_data._timings = timings
+    email_data._parse_peak_rss_mb = peak_rss_mb()
+    email_data._parse_rss_growth_mb = email_data._parse_peak_rss_mb - rss_before
+    return email_data
 
 
 class EmailProcessor:
-    def __init__(self, root_folder: str):
+    def __init__(
+        self,
+        root_folder: str,
+        max_upload_size: Optional[int] = None,
+        pool: Optional[WorkerPool] = None,
+        project_cache: Optional[ProjectCache] = None,
+        html_engine: str = "auto",
+        html_max_size: int = DEFAULT_MAX_HTML_SIZE,
+        search_index: Optional[SearchIndex] = None,
+        fsync_batcher: Optional[FsyncBatcher] = None,
+        strip_quoted_replies: bool = False,
+        body_spill_size: int = DEFAULT_TEXT_SPILL_SIZE,
+        large_body_mode: str = "inline",
+        prepare: bool = True
+    ):
         self.root_folder = Path(root_folder)
-        self.root_folder.mkdir(parents=True, exist_ok=True)
         self.temp_dir = Path(tempfile.gettempdir()) / "transcendence_emails"
+        # Maximální velikost uploadu v bajtech (None = bez limitu)
+        self.max_upload_size = max_upload_size
+        # Pool pro CPU práci a souborové I/O (None = vše synchronně v event loopu)
+        self.pool = pool
+        # Cache seznamu projektů - zneplatní se při vytvoření nového projektu
+        self.project_cache = project_cache
+        # Sdílené obsahově adresované úložiště příloh
+        self.attachment_store = AttachmentStore(root_folder)
+        # Engine převodu HTML těla na Markdown a limit velikosti HTML pro plnou konverzi
+        self.html_engine = html_engine
+        self.html_max_size = html_max_size
+        # Fulltextový index celého archivu (None = neindexovat)
+        self.search_index = search_index
+        # Skupinový fsync zapsaných souborů - souběžné konverze sdílí jedno kolo
+        self.fsync_batcher = fsync_batcher or FsyncBatcher()
+        # U odpovědí, jejichž předchozí email už v projektu je, ukládat tělo bez citované historie
+        self.strip_quoted_replies = strip_quoted_replies
+        # Tělo větší než body_spill_size se nedrží v paměti a ukládá se podle large_body_mode
+        self.body_spill_size = body_spill_size
+        self.large_body_mode = large_body_mode
+        # Zámky projektů - kontrola duplicit a zveřejnění .md probíhá pro projekt vždy jen jednou
+        self._project_locks: Dict[Path, threading.Lock] = {}
+        self._project_locks_guard = threading.Lock()
+        if prepare:
+            self.prepare()
+    
+    def prepare(self) -> None:
+        """
+        Vytvoří výstupní a dočasný adresář a smaže zbytky po přerušených
+        konverzích. Aplikace to s prepare=False volá až v lifespan ve
+        vláknovém poolu - start (a /health) na procházení disku nečeká.
+        """
+        self.root_folder.mkdir(parents=True, exist_ok=True)
         self.temp_dir.mkdir(exist_ok=True)
+        self.attachment_store.cleanup_staging()
     
-    async def save_temp_file(self, file) -> Path:
-        """Uloží uploadovaný soubor dočasně"""
-        temp_path = self.temp_dir / file.filename
-        
-        with open(temp_path, 'wb') as f:
-            content = await file.read()
-            f.write(content)
-        
+    def unique_temp_path(self, suffix: str = "") -> Path:
+        """Vrátí jedinečnou cestu v dočasném adresáři"""
+        return self.temp_dir / f"{uuid.uuid4().hex}{suffix}"
+    
+    async def save_temp_file(self, file, temp_path: Optional[Path] = None, max_size: Optional[int] = None) -> Path:
+        """
+        Uloží uploadovaný soubor dočasně (bez temp_path pod jedinečným názvem -
+        stejně pojmenované uploady souběžných požadavků ani workerů se nepřepíšou).
+        Soubor se čte a zapisuje po blocích, v paměti je vždy jen jeden blok.
+        Při překročení limitu (max_size, jinak max_upload_size; 0 = bez limitu)
+        se zápis přeruší a vyhodí UploadTooLargeError.
+        """
+        if temp_path is None:
+            temp_path = self.unique_temp_path(".eml")
+        limit = self.max_upload_size if max_size is None else max_size
+        
+        written = 0
+        start = time.perf_counter()
+        try:
+            async with aiofiles.open(temp_path, 'wb') as f:
+                while True:
+                    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    if limit and written > limit:
+                        raise UploadTooLargeError(
+                            f"Soubor je větší než povolený limit {limit} bajtů"
+                        )
+                    await f.write(chunk)
+        except BaseException:
+            if temp_path.exists():
+                temp_path.unlink()
+            raise
+        
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - start, stage="save_temp")
         return temp_path
     
     async def parse_email(self, eml_path: Path) -> EmailMetadata:
-        """Parsuje .eml soubor a vrátí metadata"""
-        mail = mailparser.parse_from_file(str(eml_path))
-        
-        # Extrahovat základní metadata
-        from_email = mail.from_[0][1] if mail.from_ else ""
-        from_domain = from_email.split('@')[-1] if '@' in from_email else ""
-        
-        to_emails = [addr[1] for addr in mail.to] if mail.to else []
-        cc_emails = [addr[1] for addr in mail.cc] if mail.cc else []
-        
-        # Parsovat tělo emailu
-        body_text = mail.text_plain[0] if mail.text_plain else ""
-        body_html = mail.text_html[0] if mail.text_html else ""
-        
-        # Pokud není plain text, převést z HTML
-        if not body_text and body_html:
-            body_text = markdownify.markdownify(body_html, heading_style="ATX")
-        
-        # Extrahovat přílohy
-        attachments = []
-        if mail.attachments:
-            for att in mail.attachments:
-                att_data = {
-                    "filename": att.get("filename", "unknown"),
-                    "content_type": att.get("content_type", "application/octet-stream"),
-                    "size": len(att.get("payload", b"")) if att.get("payload") else 0
-                }
-                attachments.append(att_data)
-        
-        # Extrahovat inline obrázky (CID)
-        inline_images = []
-        if mail.attachments:
-            for att in mail.attachments:
-                if att.get("content_disposition") == "inline":
-                    img_data = {
-                        "cid": att.get("content_id", ""),
-                        "filename": att.get("filename", ""),
-                        "content_type": att.get("content_type", "")
-                    }
-                    inline_images.append(img_data)
-        
-        return EmailMetadata(
-            subject=mail.subject or "",
-            from_email=from_email,
-            from_domain=from_domain,
-            to=to_emails,
-            cc=cc_emails,
-            date=mail.date if mail.date else datetime.now(),
-            body_text=body_text,
-            body_html=body_html,
-            attachments=attachments,
-            inline_images=inline_images
+        """Parsuje .eml soubor a vrátí metadata (v procesovém poolu, pokud je k dispozici)"""
+        size = eml_path.stat().st_size
+        start = time.perf_counter()
+        email_data = await self._run_cpu(
+            parse_eml_file, eml_path, self.attachment_store.staging_path,
+            self.html_engine, self.html_max_size, self.body_spill_size
         )
+        # Celková doba včetně předání do procesu a zpět, dílčí fáze změřil parse_eml_file
+        email_data._timings["parse"] = time.perf_counter() - start
+        metrics.observe_stages(email_data._timings)
+        metrics.BYTES_IN.inc(size)
+        return email_data
+    
+    async def _run_cpu(self, func, *args, **kwargs):
+        if self.pool is None:
+            return func(*args, **kwargs)
+        return await self.pool.run_cpu(func, *args, **kwargs)
+    
+    async def _run_io(self, func, *args, **kwargs):
+        if self.pool is None:
+            return func(*args, **kwargs)
+        return await self.pool.run_io(func, *args, **kwargs)
+    
+    @staticmethod
+    def _is_inline(att: Dict[str, Any]) -> bool:
+        """Zjistí, jestli je příloha inline (Content-Disposition: inline)"""
+        disposition = att.get("content-disposition") or att.get("content_disposition") or ""
+        return disposition.strip().lower().startswith("inline")
     
     def _normalize_project_name(self, text: str) -> str:
         """Normalizuje název projektu - odstraní diakritiku, speciální znaky, ponechá jen alfanumerické a _"""
@@ -90,7 +396,7 @@ class EmailProcessor:
             return ""
         
         # Odstranit diakritiku
-        text = unicodedata.normalize('NFKD', text)
+        text = strip_diacritics(text)
         text = text.encode('ascii', 'ignore').decode('ascii')
         
         # Nahradit mezery a další oddělovače podtržítkem
@@ -110,7 +416,7 @@ class EmailProcessor:
     def _slugify(self, text: str, max_length: int = 100) -> str:
         """Převede text na slug - max 100 znaků, bez diakritiky a speciálních znaků"""
         # Odstranit diakritiku
-        text = unicodedata.normalize('NFKD', text)
+        text = strip_diacritics(text)
         text = text.encode('ascii', 'ignore').decode('ascii')
         
         # Převede na lowercase
@@ -134,7 +440,8 @@ class EmailProcessor:
         email_data: EmailMetadata,
         project_name: str,
         project_in_inbox: bool = True,
-        inbox_folder: str = None
+        inbox_folder: str = None,
+        keep_eml: bool = False
     ) -> Dict[str, Any]:
         """
         Konvertuje email na markdown a uloží do projektu.
@@ -144,6 +451,7 @@ class EmailProcessor:
             project_in_inbox: Pokud True, ukládat do inbox_folder/project_name. 
                               Pokud None/True (výchozí), vytvoří nový projekt v INBOX_FOLDER.
             inbox_folder: Název inbox adresáře (např. "_from_email")
+            keep_eml: Pokud True, .eml soubor se po uložení nesmaže (spool ho přesouvá sám)
         """
         # Vytvořit cestu k projektu
         # Výchozí je INBOX_FOLDER pro nové projekty
@@ -152,11 +460,6 @@ class EmailProcessor:
         else:
             project_path = self.root_folder / project_name
         
-        attachments_path = project_path / "attachments"
-        
-        project_path.mkdir(parents=True, exist_ok=True)
-        attachments_path.mkdir(parents=True, exist_ok=True)
-        
         # Vytvořit slug z subject
         slug = self._slugify(email_data.subject)
         
@@ -165,62 +468,132 @@ class EmailProcessor:
         
         # Vytvořit název souboru
         md_filename = f"{date_str}_{slug}.md"
-        md_path = project_path / md_filename
-        
-        # Kontrola duplicit - pokud soubor existuje, vyhodit chybu
-        if md_path.exists():
-            raise FileExistsError(f"Soubor {md_filename} již existuje v projektu {project_name}")
-        
-        # Načíst přílohy z .eml souboru
-        attachment_payloads = {}
-        inline_image_payloads = {}
-        
-        if temp_eml_path.exists():
-            mail = mailparser.parse_from_file(str(temp_eml_path))
-            if mail.attachments:
-                for att in mail.attachments:
-                    filename = att.get("filename", "unknown")
-                    payload = att.get("payload")
-                    if payload:
-                        # Zajistit, že payload je bytes
-                        if isinstance(payload, str):
-                            # Mailparser může vracet base64 encoded string
-                            # Zkusit dekódovat jako base64
-                            try:
-                                # Odstranit případné whitespace
-                                payload_clean = payload.strip()
-                                payload = base64.b64decode(payload_clean)
-                            except Exception:
-                                # Pokud to není base64, zkusit jako UTF-8
-                                try:
-                                    payload = payload.encode('utf-8')
-                                except Exception:
-                                    # Pokud selže, zkusit jako latin-1 (zachová binární data)
-                                    try:
-                                        payload = payload.encode('latin-1')
-                                    except Exception:
-                                        # Pokud všechno selže, přeskočit tuto přílohu
-                                        continue
-                        elif isinstance(payload, bytes):
-                            # Už je to bytes, použít přímo
-                            pass
-                        else:
-                            # Pokud je to něco jiného (list, dict, atd.), zkusit převést
-                            try:
-                                if isinstance(payload, list):
-                                    # Pokud je to list bytů, spojit je
-                                    payload = b''.join(bytes([b]) if isinstance(b, int) else b for b in payload)
-                                else:
-                                    payload = bytes(payload)
-                            except Exception:
-                                # Pokud selže, přeskočit tuto přílohu
-                                continue
-                        
-                        # Uložit payload podle typu přílohy
-                        if att.get("content_disposition") == "inline":
-                            inline_image_payloads[filename] = payload
-                        else:
-                            attachment_payloads[filename] = payload
+        
+        # Přílohy jsou už dekódované do staging souborů z parse_email. Znovu
+        # parsovat .eml jen pokud metadata nevznikla přes parse_email.
+        attachment_files = email_data._attachment_files
+        if attachment_files is None and temp_eml_path.exists():
+            with metrics.span(email_data._timings, "reparse"):
+                reparsed = await self._run_cpu(
+                    parse_eml_file, temp_eml_path, self.attachment_store.staging_path,
+                    self.html_engine, self.html_max_size, self.body_spill_size
+                )
+            attachment_files = reparsed._attachment_files
+            # Tělo je v předaných metadatech, soubor těla z nového parsování se nepoužije
+            if reparsed._body_file is not None:
+                Path(reparsed._body_file["path"]).unlink(missing_ok=True)
+        attachment_files = attachment_files or []
+        
+        try:
+            md_filename = await self._run_io(
+                self._write_email_files,
+                temp_eml_path,
+                email_data,
+                project_name,
+                project_path,
+                md_filename,
+                attachment_files,
+                keep_eml
+            )
+        finally:
+            # Nepoužité staging soubory (duplicita, chyba zápisu) smazat
+            for staged_path in attachment_files:
+                if staged_path is not None:
+                    Path(staged_path).unlink(missing_ok=True)
+            if email_data._body_file is not None:
+                Path(email_data._body_file["path"]).unlink(missing_ok=True)
+            metrics.observe_stages(email_data._timings, WRITE_STAGES)
+        
+        return {
+            "status": "success",
+            "project_name": project_name,
+            "filename": md_filename,
+            "path": str(project_path / md_filename)
+        }
+    
+    def _write_email_files(
+        self,
+        temp_eml_path: Path,
+        email_data: EmailMetadata,
+        project_name: str,
+        project_path: Path,
+        md_filename: str,
+        attachment_files: List[Optional[Path]],
+        keep_eml: bool = False
+    ) -> str:
+        """
+        Zapíše markdown a přílohy na disk (blokující, běží ve vláknovém poolu).
+        Vrací skutečný název markdown souboru.
+
+        Markdown se nejdřív zapíše do stagingu a spolu s přílohami projde
+        skupinovým fsync. Teprve pak se pod zámkem projektu znovu zkontrolují
+        duplicity a .md se zveřejní bez přepsání existujícího souboru
+        (publish_exclusive). Pád uprostřed tak nikdy nezanechá rozepsaný
+        markdown ani markdown bez příloh - nanejvýš přílohy bez markdownu,
+        které jsou díky deduplikaci neškodné.
+        """
+        attachments_path = project_path / "attachments"
+        # Adresáře, jejichž nové záznamy musí být na disku spolu s emailem
+        new_entry_dirs = {project_path}
+        
+        if not project_path.is_dir():
+            new_entry_dirs.add(project_path.parent)
+            project_path.mkdir(parents=True, exist_ok=True)
+            if self.project_cache is not None:
+                self.project_cache.invalidate()
+        attachments_path.mkdir(parents=True, exist_ok=True)
+        
+        # Kontrola duplicit - stejný Message-ID nebo obsah už v projektu je
+        # (rychlé odmítnutí před zápisem příloh, závazně se ověří při zveřejnění)
+        index = EmailIndex(project_path)
+        self._raise_if_duplicate(index, email_data, project_name, md_filename)
+        
+        timings = email_data._timings
+        
+        # Uložit přílohy i inline obrázky přes sdílené úložiště (hardlinky)
+        stored_attachments = []
+        attachment_bytes = 0
+        sync_files = []
+        with metrics.span(timings, "write_attachments"):
+            for att, staged_path in zip(email_data.attachments, attachment_files):
+                filename = att["filename"]
+                if staged_path is None or not Path(staged_path).exists():
+                    stored_attachments.append(filename)
+                    continue
+                stored_attachments.append(self._store_attachment(attachments_path, filename, Path(staged_path), att["sha256"]))
+                sync_files.append(self.attachment_store.blob_path(att["sha256"]))
+                attachment_bytes += att["size"]
+        
+        # Odkazy cid: v těle vedou na uložené přílohy (název se mohl změnit pořadovým číslem)
+        cid_files = {
+            att["content_id"]: stored
+            for att, stored in zip(email_data.attachments, stored_attachments)
+            if att.get("content_id")
+        }
+        body_file = email_data._body_file
+        body_text = rewrite_cid_references(email_data.body_text, cid_files)
+        
+        # Citovaná historie odpovědi je už v archivu v předchozím emailu vlákna
+        # (velké tělo v souboru se nezkracuje - muselo by se načíst celé)
+        parent_id = email_data.in_reply_to or (email_data.references[-1] if email_data.references else "")
+        if self.strip_quoted_replies and body_file is None and parent_id and index.has_message([parent_id]):
+            body_text = strip_quoted_text(body_text)
+        
+        # Velké tělo - v režimu file se celé uloží do attachments/ jako textový
+        # soubor; v front-matter je pod body_file, mezi přílohy emailu nepatří
+        body_source = body_path_limit = body_attachment = None
+        if body_file is not None:
+            body_source = Path(body_file["path"])
+            if self.large_body_mode != "inline":
+                body_path_limit = self.body_spill_size
+            if self.large_body_mode == "file":
+                with metrics.span(timings, "write_attachments"):
+                    body_attachment = self._store_attachment(
+                        attachments_path, f"{Path(md_filename).stem}_body.txt", body_source, body_file["sha256"]
+                    )
+                body_source = self.attachment_store.blob_path(body_file["sha256"])
+                sync_files.append(body_source)
+                attachment_bytes += body_file["size"]
         
         # Vytvořit YAML front matter
         front_matter = {
@@ -229,43 +602,188 @@ class EmailProcessor:
             "to": email_data.to,
             "cc": email_data.cc,
             "date": email_data.date.isoformat(),
-            "attachments": [att["filename"] for att in email_data.attachments]
+            "attachments": stored_attachments,
+            "message_id": email_data.message_id,
+            "in_reply_to": email_data.in_reply_to,
+            "references": email_data.references,
+            "content_hash": email_data.content_hash
         }
-        
-        # Zapsat markdown soubor
-        with open(md_path, 'w', encoding='utf-8') as f:
-            f.write("---\n")
-            f.write(yaml.dump(front_matter, allow_unicode=True, default_flow_style=False))
-            f.write("---\n\n")
-            f.write(email_data.body_text)
-        
-        # Uložit přílohy
-        for att in email_data.attachments:
-            filename = att["filename"]
-            payload = attachment_payloads.get(filename)
-            if payload and isinstance(payload, bytes) and len(payload) > 0:
-                att_path = attachments_path / filename
-                # Zajistit, že soubor má správnou příponu
-                with open(att_path, 'wb') as f:
-                    f.write(payload)
-        
-        # Uložit inline obrázky
-        for img in email_data.inline_images:
-            filename = img["filename"]
-            payload = inline_image_payloads.get(filename)
-            if payload and isinstance(payload, bytes) and len(payload) > 0:
-                img_path = attachments_path / filename
-                # Zajistit, že soubor má správnou příponu
-                with open(img_path, 'wb') as f:
-                    f.write(payload)
+        if body_path_limit is not None:
+            front_matter["body_size"] = body_file["size"]
+        if body_attachment is not None:
+            front_matter["body_file"] = body_attachment
+        
+        import yaml
+        with metrics.span(timings, "yaml_dump"):
+            front_matter_yaml = yaml.dump(front_matter, allow_unicode=True, default_flow_style=False)
+        
+        # Zapsat markdown soubor do stagingu (na stejném disku jako projekty)
+        staged_md = self.attachment_store.staging_path / f"{uuid.uuid4().hex}.md"
+        staged_md.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with metrics.span(timings, "write_markdown"):
+                with open(staged_md, 'w', encoding='utf-8') as f:
+                    f.write("---\n")
+                    f.write(front_matter_yaml)
+                    f.write("---\n\n")
+                    if body_source is None:
+                        f.write(body_text)
+                    else:
+                        body_text, written = self._copy_large_body(f, body_source, cid_files, body_path_limit)
+                        if body_path_limit is not None and written < body_file["size"]:
+                            f.write(self._truncation_note(written, body_file["size"], body_attachment))
+            
+            # Obsah markdownu a příloh musí být na disku dřív, než se markdown zveřejní
+            with metrics.span(timings, "fsync"):
+                self.fsync_batcher.sync(
+                    files=[staged_md, *sync_files],
+                    dirs={attachments_path, *(path.parent for path in sync_files)}
+                )
+            
+            with metrics.span(timings, "index"):
+                # Zámek vláken v procesu a zámek indexu projektu mezi procesy (další workery)
+                with self._project_lock(project_path), index.locked() as conn:
+                    # Souběžná konverze stejného emailu mohla mezitím skončit
+                    self._raise_if_duplicate(index, email_data, project_name, md_filename, conn)
+                    md_filename = self._publish_markdown(staged_md, project_path, md_filename)
+                    md_path = project_path / md_filename
+                    # Zapsat metadata do indexu projektu (pro rychlý výpis emailů)
+                    index.add(md_path, front_matter, conn)
+        finally:
+            staged_md.unlink(missing_ok=True)
+        
+        # Záznam nového .md v adresáři projektu (a nového projektu v nadřazeném adresáři)
+        with metrics.span(timings, "fsync"):
+            self.fsync_batcher.sync(dirs=new_entry_dirs)
+        
+        metrics.BYTES_OUT.inc(md_path.stat().st_size, kind="markdown")
+        metrics.BYTES_OUT.inc(attachment_bytes, kind="attachments")
+        metrics.ATTACHMENTS.inc(len(email_data.attachments))
+        
+        with metrics.span(timings, "index"):
+            # Zaindexovat pro fulltextové hledání - chyba indexu nesmí zmařit uložení emailu
+            if self.search_index is not None:
+                try:
+                    self.search_index.add(project_path, md_path, front_matter, body_text)
+                except Exception as e:
+                    print(f"[WARNING] Email {md_filename} se nepodařilo zaindexovat pro hledání: {str(e)}")
         
         # Smazat dočasný .eml soubor
-        if temp_eml_path.exists():
+        if not keep_eml and temp_eml_path.exists():
             temp_eml_path.unlink()
         
-        return {
-            "status": "success",
-            "project_name": project_name,
-            "filename": md_filename,
-            "path": str(md_path)
-        }
+        return md_filename
+    
+    @staticmethod
+    def _copy_large_body(f, body_path: Path, cid_files: Dict[str, str], limit: Optional[int]) -> Tuple[str, int]:
+        """
+        Zapíše velké tělo ze souboru do markdownu po blocích - v paměti je
+        vždy jen jeden blok. Odkazy cid: se přepisují po řádcích. S limit se
+        zapíše jen prvních limit bajtů (zkráceno na celé řádky). Vrací začátek
+        těla pro fulltextový index a počet zapsaných bajtů.
+        """
+        head = []
+        head_length = 0
+        written = 0
+        pending = ""
+        with open(body_path, 'r', encoding='utf-8', errors='replace', newline='') as source:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                done = not chunk
+                text = pending + chunk
+                if not done:
+                    # Přepisovat celé řádky (odkaz cid: nesmí ležet přes hranici bloku),
+                    # řádek delší než blok se zpracuje po částech
+                    cut = text.rfind("\n") + 1 or len(text)
+                    text, pending = text[:cut], text[cut:]
+                text = rewrite_cid_references(text, cid_files)
+                data = text.encode('utf-8', 'surrogatepass')
+                if limit is not None and written + len(data) > limit:
+                    text = data[:limit - written].decode('utf-8', 'ignore')
+                    line_end = text.rfind("\n")
+                    if line_end >= 0:
+                        text = text[:line_end + 1]
+                    data = text.encode('utf-8', 'surrogatepass')
+                    done = True
+                f.write(text)
+                written += len(data)
+                if head_length < MAX_INDEXED_BODY_SIZE:
+                    head.append(text[:MAX_INDEXED_BODY_SIZE - head_length])
+                    head_length += len(head[-1])
+                if done:
+                    return "".join(head), written
+    
+    @staticmethod
+    def _truncation_note(written: int, size: int, body_attachment: Optional[str]) -> str:
+        kept_kb, size_kb = round(written / 1024), round(size / 1024)
+        if body_attachment:
+            return (f"\n\n*[Tělo emailu zkráceno - celé tělo ({size_kb} kB) je v příloze "
+                    f"[{body_attachment}](attachments/{quote(body_attachment)})]*\n")
+        return f"\n\n*[Tělo emailu zkráceno - uloženo {kept_kb} kB z {size_kb} kB]*\n"
+    
+    def _project_lock(self, project_path: Path) -> threading.Lock:
+        with self._project_locks_guard:
+            return self._project_locks.setdefault(project_path, threading.Lock())
+    
+    @staticmethod
+    def _raise_if_duplicate(
+        index: EmailIndex, email_data: EmailMetadata, project_name: str, md_filename: str,
+        conn: Optional[sqlite3.Connection] = None
+    ) -> None:
+        duplicate = index.find_duplicate(email_data.message_id, email_data.content_hash, md_filename, conn)
+        if duplicate:
+            raise FileExistsError(f"Soubor {duplicate} již existuje v projektu {project_name}")
+    
+    def _publish_markdown(self, staged_md: Path, project_path: Path, md_filename: str) -> str:
+        """
+        Zveřejní markdown ze stagingu pod volným názvem v projektu a vrátí ho.
+        Jiný email se stejným datem a předmětem dostane pořadové číslo; existující
+        soubor se nikdy nepřepíše, ani když ho mezitím vytvořil jiný proces.
+        """
+        while True:
+            md_filename = self._free_filename(project_path, md_filename)
+            try:
+                publish_exclusive(staged_md, project_path / md_filename)
+                return md_filename
+            except FileExistsError:
+                continue
+    
+    @staticmethod
+    def _free_filename(directory: Path, filename: str) -> str:
+        """Vrátí filename, nebo při kolizi název s pořadovým číslem (name_2.ext, name_3.ext, ...)"""
+        if not (directory / filename).exists():
+            return filename
+        stem, suffix = os.path.splitext(filename)
+        counter = 2
+        while (directory / f"{stem}_{counter}{suffix}").exists():
+            counter += 1
+        return f"{stem}_{counter}{suffix}"
+    
+    def _store_attachment(self, attachments_path: Path, filename: str, staged_path: Path, sha256: str) -> str:
+        """
+        Přesune dekódovanou přílohu ze stagingu do úložiště a vloží ji do attachments/ projektu.
+        Stejný obsah pod stejným názvem se nezapisuje znovu; jiný obsah pod
+        existujícím názvem dostane pořadové číslo. Vrací název souboru v attachments/.
+        """
+        blob_path = self.attachment_store.put_file(staged_path, sha256)
+        while True:
+            target_path = attachments_path / filename
+            if target_path.exists():
+                if os.path.samefile(blob_path, target_path) or self._file_sha256(target_path) == sha256:
+                    return filename
+                filename = self._free_filename(attachments_path, filename)
+                target_path = attachments_path / filename
+            try:
+                self.attachment_store.link(blob_path, target_path)
+                return filename
+            except FileExistsError:
+                # Stejný název mezitím vytvořila souběžná konverze (i v jiném procesu)
+                continue
+    
+    @staticmethod
+    def _file_sha256(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
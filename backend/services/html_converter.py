@@ -0,0 +1,185 @@
+import hashlib
+import importlib.util
+import re
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Any, List, Optional, Tuple
+
+# lxml je volitelné - jen se ověří, že je nainstalované, importuje ho až BeautifulSoup
+LXML_AVAILABLE = importlib.util.find_spec("lxml") is not None
+
+
+# Dostupné konverzní enginy:
+#   auto        - lxml, pokud je nainstalované, jinak html.parser
+#   lxml        - BeautifulSoup s parserem lxml (C) + markdownify
+#   html.parser - BeautifulSoup s čistě pythonovým parserem + markdownify (původní chování)
+#   text        - zjednodušená konverze přes streamovaný HTMLParser (bez stromu)
+HTML_ENGINES = ("auto", "lxml", "html.parser", "text")
+
+# HTML větší než tento limit (po odstranění skriptů, stylů...) se převádí
+# zjednodušeně - markdownify nad obřími tabulkami trvá sekundy
+DEFAULT_MAX_HTML_SIZE = 1024 * 1024
+
+# Počet naposledy převedených HTML těl, jejichž výsledek se drží v paměti procesu,
+# a limit jejich celkové velikosti (ve znacích) - větší výsledek se necachuje
+CACHE_SIZE = 64
+CACHE_MAX_CHARS = 4 * 1024 * 1024
+CACHE_MAX_ENTRY_CHARS = 256 * 1024
+
+# Bloky, které se do Markdownu nikdy nedostanou - odstraní se ještě před parsováním
+_STRIP_BLOCKS_RE = re.compile(
+    r"<!--.*?-->|<(script|style|head|title|noscript|template)\b[^>]*>.*?</\1\s*>",
+    re.IGNORECASE | re.DOTALL
+)
+_IMG_RE = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+_ATTR_RE = re.compile(r"""\b(width|height|style)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+_HIDDEN_STYLE_RE = re.compile(r"display\s*:\s*none|visibility\s*:\s*hidden", re.IGNORECASE)
+_PIXEL_SIZE_RE = re.compile(r"^\s*[01](?:px)?\s*$", re.IGNORECASE)
+
+_HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_BLOCK_TAGS = {
+    "p", "div", "table", "tr", "ul", "ol", "blockquote", "pre", "hr", "center",
+    "section", "article", "header", "footer"
+} | _HEADING_TAGS
+
+_cache: "OrderedDict[Tuple[str, str, int], str]" = OrderedDict()
+_cache_chars = 0
+# Při CONVERT_PROCESSES=0 převádí HTML víc vláken najednou
+_cache_lock = threading.Lock()
+
+
+def resolve_engine(engine: str) -> str:
+    """Převede 'auto' (a nedostupné lxml) na skutečně použitý engine"""
+    if engine in ("auto", "lxml"):
+        return "lxml" if LXML_AVAILABLE else "html.parser"
+    return engine
+
+
+def _is_tracking_pixel(img_tag: str) -> bool:
+    """Obrázek 1×1 (nebo 0×0) či skrytý obrázek - sledovací pixel newsletteru"""
+    attrs = {}
+    for match in _ATTR_RE.finditer(img_tag):
+        attrs[match.group(1).lower()] = match.group(2) or match.group(3) or match.group(4) or ""
+    if _HIDDEN_STYLE_RE.search(attrs.get("style", "")):
+        return True
+    width = attrs.get("width")
+    height = attrs.get("height")
+    return bool(width and height and _PIXEL_SIZE_RE.match(width) and _PIXEL_SIZE_RE.match(height))
+
+
+def strip_html(html: str) -> str:
+    """
+    Odstraní části HTML bez obsahu pro Markdown: komentáře (včetně podmíněných
+    komentářů Outlooku), <head>, <style>, <script> a sledovací pixely.
+    Běží nad řetězcem regulárními výrazy, takže parser pak staví menší strom.
+    """
+    html = _STRIP_BLOCKS_RE.sub("", html)
+    return _IMG_RE.sub(lambda match: "" if _is_tracking_pixel(match.group(0)) else match.group(0), html)
+
+
+class _TextExtractor(HTMLParser):
+    """Zjednodušený převod HTML na Markdown - jen odstavce, řádky, seznamy, odkazy a inline obrázky (cid:)"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        # (index v parts, href) otevřených odkazů
+        self._links: List[Tuple[int, Optional[str]]] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "br":
+            self.parts.append("\n")
+        elif tag == "li":
+            self.parts.append("\n- ")
+        elif tag in _HEADING_TAGS:
+            self.parts.append("\n\n" + "#" * int(tag[1]) + " ")
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n\n")
+        elif tag in ("td", "th"):
+            self.parts.append(" ")
+        elif tag == "a":
+            self._links.append((len(self.parts), dict(attrs).get("href")))
+        elif tag == "img":
+            attributes = dict(attrs)
+            src = attributes.get("src") or ""
+            # Externí obrázky se vynechají, vložené do emailu se odkazují (přepíší se na přílohu)
+            if src.lower().startswith("cid:"):
+                self.parts.append(f"![{attributes.get('alt') or ''}]({src})")
+
+    def handle_endtag(self, tag):
+        if tag in _BLOCK_TAGS:
+            self.parts.append("\n\n")
+        elif tag == "a" and self._links:
+            start, href = self._links.pop()
+            text = "".join(self.parts[start:]).strip()
+            if href and text and not href.startswith("#"):
+                self.parts[start:] = [f"[{text}]({href})"]
+
+    def handle_data(self, data):
+        self.parts.append(re.sub(r"\s+", " ", data))
+
+    def markdown(self) -> str:
+        text = "".join(self.parts)
+        text = re.sub(r"[ \t]+\n", "\n", text)
+        text = re.sub(r"\n[ \t]+", "\n", text)
+        return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def html_to_text_markdown(html: str) -> str:
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.markdown()
+
+
+def load_converter() -> Tuple[Any, Any]:
+    """
+    BeautifulSoup a markdownify se importují až při první konverzi HTML -
+    import trvá desítky ms a start aplikace ho nepotřebuje. Volá se i při
+    zahřátí po startu, aby první konverze na import nečekala.
+    """
+    from bs4 import BeautifulSoup
+    from markdownify import MarkdownConverter
+    return BeautifulSoup, MarkdownConverter
+
+
+def _convert(html: str, engine: str, max_size: int) -> str:
+    html = strip_html(html)
+    if engine == "text" or (max_size and len(html) > max_size):
+        return html_to_text_markdown(html)
+    BeautifulSoup, MarkdownConverter = load_converter()
+    soup = BeautifulSoup(html, engine)
+    # Obrázky v buňkách tabulek a v odkazech (běžné v newsletterech) zachovat jako obrázky
+    return MarkdownConverter(
+        heading_style="ATX", keep_inline_images_in=["td", "th", "a"]
+    ).convert_soup(soup)
+
+
+def html_to_markdown(html: str, engine: str = "auto", max_size: int = DEFAULT_MAX_HTML_SIZE) -> str:
+    """
+    Převede HTML tělo emailu na Markdown zvoleným enginem.
+
+    HTML se parsuje jen jednou a výsledek se uloží do malé LRU cache procesu
+    (klíčem je SHA-256 HTML), takže stejné tělo - znovu importovaná zpráva,
+    tentýž newsletter ve více projektech - se nepřevádí opakovaně. Cache je
+    omezená počtem i celkovou velikostí výsledků.
+    """
+    global _cache_chars
+    engine = resolve_engine(engine)
+    key = (hashlib.sha256(html.encode("utf-8", "surrogatepass")).hexdigest(), engine, max_size)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    markdown = _convert(html, engine, max_size)
+    if len(markdown) <= CACHE_MAX_ENTRY_CHARS:
+        with _cache_lock:
+            if key not in _cache:
+                _cache[key] = markdown
+                _cache_chars += len(markdown)
+            while len(_cache) > CACHE_SIZE or _cache_chars > CACHE_MAX_CHARS:
+                _cache_chars -= len(_cache.popitem(last=False)[1])
+    return markdown
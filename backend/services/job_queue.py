@@ -0,0 +1,302 @@
+import asyncio
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from services.email_processor import EmailProcessor
+from services import metrics
+
+
+# Stavy úlohy - queued/running jsou rozpracované, done/failed konečné
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED)
+
+# Rozpracovaná úloha, jejíž updated_at je starší než lease, patří workeru,
+# který spadl - vrátí se do fronty. Živý worker ji obnovuje každou čtvrtinu lease.
+LEASE_SECONDS = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    project_in_inbox INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    eml_path TEXT NOT NULL,
+    status_code INTEGER,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+"""
+
+
+class QueueFullError(Exception):
+    """Ve frontě je příliš mnoho nezpracovaných úloh"""
+
+
+class JobQueue:
+    """
+    Perzistentní fronta konverzí.
+
+    Upload se jen uloží do adresáře fronty a zapíše se úloha do SQLite -
+    klient hned dostane job_id a průběh sleduje dotazováním nebo přes SSE.
+    Frontu zpracovává `workers` asynchronních pracovníků nad sdíleným
+    EmailProcessorem. Úlohy i jejich .eml soubory jsou na disku, takže
+    přežijí restart: úlohy, které byly při pádu rozpracované, se vrátí do
+    fronty, jakmile vyprší jejich lease.
+
+    Frontu může sdílet víc workerů (procesů i strojů nad stejným JOBS_FOLDER) -
+    převzetí úlohy je zápis pod zámkem SQLite. Úlohy přidané jiným workerem
+    se najdou při procházení fronty každých poll_interval sekund.
+    """
+
+    def __init__(
+        self,
+        jobs_folder: str,
+        processor: EmailProcessor,
+        inbox_folder: str,
+        workers: int = 2,
+        max_queued: int = 1000,
+        retention_seconds: float = 24 * 3600,
+        lease_seconds: float = LEASE_SECONDS,
+        poll_interval: float = 2.0
+    ):
+        self.jobs_path = Path(jobs_folder)
+        self.db_path = self.jobs_path / "jobs.sqlite"
+        self.processor = processor
+        self.inbox_folder = inbox_folder
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changed: Optional[asyncio.Event] = None
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self) -> None:
+        self.jobs_path.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        self._purge()
+
+    def _purge(self) -> None:
+        """Smaže dokončené úlohy starší než retention_seconds"""
+        with self._connect() as conn:
+            conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATUSES))}) AND updated_at < ?",
+                (*FINISHED_STATUSES, time.time() - self.retention_seconds)
+            )
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Event()
+        await self.processor._run_io(self._init_db)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        # Probudit pracovníky kvůli úlohám obnoveným po restartu
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def new_job_path(self) -> Path:
+        """Cesta pro uložení .eml nové úlohy (v adresáři fronty, aby přežila restart)"""
+        return self.jobs_path / f"{uuid.uuid4().hex}.eml"
+
+    def _insert(self, job_id: str, eml_path: Path, filename: str, project_name: str, project_in_inbox: bool) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            queued = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (JOB_QUEUED, JOB_RUNNING)
+            ).fetchone()[0]
+            if queued >= self.max_queued:
+                raise QueueFullError(f"Ve frontě je maximum úloh ({self.max_queued}), zkuste to později")
+            conn.execute(
+                """
+                INSERT INTO jobs (id, status, stage, project_name, project_in_inbox, filename, eml_path,
+                                  created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, JOB_QUEUED, JOB_QUEUED, project_name, int(project_in_inbox), filename,
+                 str(eml_path), now, now)
+            )
+
+    async def submit(self, eml_path: Path, filename: str, project_name: str, project_in_inbox: bool) -> Dict[str, Any]:
+        """Zařadí uložený .eml do fronty a vrátí stav nové úlohy"""
+        job_id = uuid.uuid4().hex
+        await self.processor._run_io(self._insert, job_id, eml_path, filename, project_name, project_in_inbox)
+        self._wakeup.set()
+        self._notify()
+        return await self.get(job_id)
+
+    def _get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = {
+                "job_id": row["id"],
+                "status": row["status"],
+                "stage": row["stage"],
+                "project_name": row["project_name"],
+                "filename": row["filename"],
+                "status_code": row["status_code"],
+                "result": json.loads(row["result"]) if row["result"] else None,
+                "error": row["error"],
+                "created_at": row["created_at"],
+                "updated_at": row["updated_at"]
+            }
+            if row["status"] == JOB_QUEUED:
+                job["position"] = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?",
+                    (JOB_QUEUED, row["created_at"])
+                ).fetchone()[0]
+            return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.processor._run_io(self._get, job_id)
+
+    async def events(self, job_id: str, poll_interval: float = 1.0) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Vrací stav úlohy při každé změně, dokud úloha neskončí.
+        Změny v tomto procesu přijdou hned, jinak se stav ověřuje každých poll_interval sekund.
+        """
+        last = None
+        while True:
+            changed = self._changed
+            job = await self.get(job_id)
+            if job is None:
+                return
+            state = (job["status"], job["stage"], job.get("position"))
+            if state != last:
+                last = state
+                yield job
+            if job["status"] in FINISHED_STATUSES:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _notify(self) -> None:
+        # Probudit všechny odběratele událostí a připravit novou událost
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Vezme nejstarší úlohu z fronty a označí ji jako rozpracovanou"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Úlohy workeru, který spadl nebo byl restartován, vrátit do fronty
+            now = time.time()
+            expired = conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, updated_at = ? WHERE status = ? AND updated_at < ?",
+                (JOB_QUEUED, JOB_QUEUED, now, JOB_RUNNING, now - self.lease_seconds)
+            ).rowcount
+            if expired:
+                print(f"[WARNING] {expired} rozpracovaných úloh bez živého workeru vráceno do fronty")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (JOB_QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, updated_at = ? WHERE id = ?",
+                (JOB_RUNNING, "parsing", time.time(), row["id"])
+            )
+            return dict(row)
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    async def _set_stage(self, job_id: str, stage: str) -> None:
+        await self.processor._run_io(self._update, job_id, stage=stage)
+        self._notify()
+
+    async def _worker(self) -> None:
+        while True:
+            # Událost se maže před pokusem o převzetí, aby se neztratilo
+            # probuzení od úlohy přidané během něj
+            self._wakeup.clear()
+            job = await self.processor._run_io(self._claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._notify()
+            heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+            try:
+                await self._process(job)
+            finally:
+                heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Obnovuje lease rozpracované úlohy, aby ji jiný worker nepovažoval za opuštěnou"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 4)
+            try:
+                await self.processor._run_io(self._update, job_id)
+            except Exception as e:
+                print(f"[WARNING] Nepodařilo se obnovit lease úlohy {job_id}: {str(e)}")
+
+    async def _process(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        eml_path = Path(job["eml_path"])
+        try:
+            email_data = await self.processor.parse_email(eml_path)
+            await self._set_stage(job_id, "saving")
+            # .eml maže až fronta po konečném výsledku - zápis ve vlákně
+            # doběhne i po zrušení úlohy a vstup vrácené úlohy smazat nesmí
+            result = await self.processor.convert_and_save(
+                eml_path,
+                email_data,
+                job["project_name"],
+                project_in_inbox=bool(job["project_in_inbox"]),
+                inbox_folder=self.inbox_folder,
+                keep_eml=True
+            )
+            update = {"status": JOB_DONE, "stage": JOB_DONE, "status_code": 200, "result": json.dumps(result)}
+        except FileExistsError as e:
+            update = {"status": JOB_FAILED, "stage": JOB_FAILED, "status_code": 409, "error": str(e)}
+        except asyncio.CancelledError:
+            # Zastavení aplikace (stop) - úloha se vrátí do fronty i se vstupem
+            # a dokončí ji další spuštěný worker. Zápis je synchronní, zrušený
+            # task už na nic dalšího čekat nemá.
+            self._update(job_id, status=JOB_QUEUED, stage=JOB_QUEUED)
+            raise
+        except Exception as e:
+            update = {"status": JOB_FAILED, "stage": JOB_FAILED, "status_code": 500, "error": str(e)}
+        eml_path.unlink(missing_ok=True)
+        metrics.CONVERSIONS.inc(source="job", status=str(update["status_code"]))
+        await self.processor._run_io(self._update, job_id, **update)
+        self._notify()
+        await self.processor._run_io(self._purge)
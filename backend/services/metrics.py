@@ -0,0 +1,202 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Výchozí hranice histogramů v sekundách (jako v klientech Prometheu, navíc delší konverze)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Content-Type textového formátu Prometheu
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in labels]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metrika {self.name} očekává labely {self.labelnames}, dostala {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotónně rostoucí počítadlo (požadavky, bajty, chyby)"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """Okamžitá hodnota - čte se z funkce až při výpisu /metrics"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.function = function
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.function())}"]
+
+
+class Histogram(_Metric):
+    """Rozdělení doby trvání (kumulativní buckety, součet a počet)"""
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Pro každou kombinaci labelů: počty v bucketech (nekumulativně), součet
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Změří dobu bloku with a zapíše ji do histogramu (i při výjimce)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels(labels + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Všechny metriky procesu, výpis v textovém formátu Prometheu"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metrika {metric.name} už je zaregistrovaná")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "Počet HTTP požadavků podle endpointu a status kódu", ("method", "route", "status")
+))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Doba zpracování HTTP požadavku (u streamů do odeslání hlaviček)", ("method", "route")
+))
+CONVERSIONS = REGISTRY.register(Counter(
+    "email_conversions_total", "Dokončené konverze emailů podle zdroje (upload, job, batch) a výsledku", ("source", "status")
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "email_stage_duration_seconds", "Doba jednotlivých fází konverze emailu", ("stage",)
+))
+BYTES_IN = REGISTRY.register(Counter(
+    "email_bytes_in_total", "Velikost zpracovaných .eml souborů v bajtech"
+))
+BYTES_OUT = REGISTRY.register(Counter(
+    "email_bytes_out_total", "Zapsané bajty podle druhu (markdown, attachments)", ("kind",)
+))
+ATTACHMENTS = REGISTRY.register(Counter(
+    "email_attachments_total", "Počet uložených příloh a inline obrázků"
+))
+
+
+@contextmanager
+def span(timings: Dict[str, float], stage: str):
+    """
+    Změří dobu fáze konverze do slovníku timings (stage -> sekundy).
+    Slovník putuje s metadaty emailu i z procesového poolu, do histogramu
+    se zapíše až v hlavním procesu přes observe_stages.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def observe_stages(timings: Dict[str, float], stages: Optional[Iterable[str]] = None) -> None:
+    """Zapíše změřené fáze (všechny, nebo jen vybrané) do histogramu STAGE_SECONDS"""
+    for stage in (timings if stages is None else stages):
+        if stage in timings:
+            STAGE_SECONDS.observe(timings[stage], stage=stage)
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """Jednořádkový výpis fází pro log, např. 'parse=12.3ms write_markdown=0.4ms'"""
+    return " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in timings.items())
@@ -0,0 +1,426 @@
+import binascii
+import codecs
+import hashlib
+import unicodedata
+import uuid
+from email.parser import HeaderParser
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+
+# Velikost bloku pro čtení a dekódování těla přílohy
+EXTRACT_CHUNK_SIZE = 1024 * 1024
+
+# Maximální délka jednoho čtení řádku - ani soubor bez konců řádků nenačte víc najednou
+MAX_LINE_READ = 64 * 1024
+
+# Textová část větší než tento limit se nedrží v paměti, ale průběžně se
+# dekóduje do souboru ve stagingu (v UTF-8)
+DEFAULT_TEXT_SPILL_SIZE = 1024 * 1024
+
+# Kódování přenosu, u kterých mailparser text normalizuje do NFC (7bit/8bit ne)
+_UNNORMALIZED_ENCODINGS = ("", "7bit", "8bit")
+
+# Bajty, které nepatří do base64 abecedy (konce řádků, mezery, nečistoty) - před dekódováním se mažou
+_NOT_BASE64 = bytes(
+    byte for byte in range(256)
+    if byte not in b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+)
+
+
+def safe_filename(name: str) -> str:
+    """
+    Název přílohy bezpečný pro uložení do attachments/ - název volí odesílatel,
+    takže se z něj bere jen poslední část cesty bez oddělovačů a NUL
+    ("../../evil.pdf" -> "evil.pdf"). Prázdný název, "." a ".." -> "unknown".
+    """
+    name = Path(name.replace("\\", "/").replace("\0", "")).name.strip()
+    return "unknown" if name in ("", ".", "..") else name
+
+
+def _strip_eol(line: bytes) -> bytes:
+    if line.endswith(b"\r\n"):
+        return line[:-2]
+    if line.endswith(b"\n"):
+        return line[:-1]
+    return line
+
+
+class _Reader:
+    """Čtení .eml po řádcích i po blocích s možností vrátit přečtená data zpět"""
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self._buffer = b""
+        self._pos = 0
+
+    def unread(self, data: bytes) -> None:
+        self._buffer = data + self._buffer[self._pos:]
+        self._pos = 0
+
+    def readline(self) -> bytes:
+        if self._pos < len(self._buffer):
+            end = self._buffer.find(b"\n", self._pos, self._pos + MAX_LINE_READ)
+            if end >= 0:
+                line = self._buffer[self._pos:end + 1]
+                self._pos = end + 1
+                return line
+            line = self._buffer[self._pos:self._pos + MAX_LINE_READ]
+            self._pos += len(line)
+            if self._pos >= len(self._buffer) and len(line) < MAX_LINE_READ:
+                line += self.f.readline(MAX_LINE_READ - len(line))
+            return line
+        return self.f.readline(MAX_LINE_READ)
+
+    def read_lines_block(self) -> bytes:
+        """Vrátí blok celých řádků (cca EXTRACT_CHUNK_SIZE), na konci souboru b''"""
+        if self._pos < len(self._buffer):
+            block = self._buffer[self._pos:]
+            self._buffer = b""
+            self._pos = 0
+        else:
+            block = self.f.read(EXTRACT_CHUNK_SIZE)
+        if block and not block.endswith(b"\n"):
+            block += self.f.readline(MAX_LINE_READ)
+        return block
+
+
+def decode_text(data: bytes, charset: Optional[str], encoding: str) -> str:
+    """
+    Dekóduje textovou část podle znakové sady z Content-Type. Neznámá sada
+    nebo neplatné bajty -> UTF-8 s vynecháním chyb. Výsledek odpovídá
+    mailparseru (kvůli stejnému hashi obsahu u dříve uložených emailů), jen
+    8bit části v jiné sadě než UTF-8 už nepřijdou o diakritiku.
+    """
+    try:
+        text = data.decode(charset or "utf-8")
+    except (LookupError, UnicodeDecodeError):
+        text = data.decode("utf-8", "ignore")
+    if encoding in _UNNORMALIZED_ENCODINGS:
+        return text
+    return unicodedata.normalize("NFC", text)
+
+
+class _TextSink:
+    """
+    Příjemce dekódovaného těla textové části. Do limit bajtů drží data
+    v paměti, pak je průběžně převádí do UTF-8 a zapisuje do souboru ve
+    stagingu - paměť tak nezávisí na velikosti části.
+    """
+
+    def __init__(self, staging_path: Path, charset: Optional[str], encoding: str, limit: int):
+        self.staging_path = staging_path
+        self.charset = charset
+        self.encoding = encoding
+        self.limit = limit
+        self.buffer = bytearray()
+        self.path: Optional[Path] = None
+        self.size = 0
+        self._out: Optional[BinaryIO] = None
+        self._decoder = None
+        # Nedokončený řádek - NFC normalizace nesmí rozdělit znak s diakritikou
+        self._pending = ""
+
+    def write(self, data: bytes) -> None:
+        if self._out is None:
+            self.buffer += data
+            if len(self.buffer) > self.limit:
+                self._spill()
+            return
+        self._write_text(self._decoder.decode(data))
+
+    def _spill(self) -> None:
+        try:
+            self._decoder = codecs.getincrementaldecoder(self.charset or "utf-8")("replace")
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        self.path = self.staging_path / f"{uuid.uuid4().hex}.txt"
+        self._out = open(self.path, "wb")
+        buffered, self.buffer = bytes(self.buffer), bytearray()
+        self._write_text(self._decoder.decode(buffered))
+
+    def _write_text(self, text: str, final: bool = False) -> None:
+        if self.encoding not in _UNNORMALIZED_ENCODINGS:
+            text = self._pending + text
+            cut = len(text) if final else text.rfind("\n") + 1
+            if cut == 0 and len(text) > MAX_LINE_READ:
+                cut = len(text)
+            text, self._pending = unicodedata.normalize("NFC", text[:cut]), text[cut:]
+        data = text.encode("utf-8")
+        self._out.write(data)
+        self.size += len(data)
+
+    def finish(self) -> Dict[str, Any]:
+        """Vrátí {"text": ...} pro část v paměti, nebo {"path", "size"} pro část v souboru"""
+        if self._out is None:
+            return {"text": decode_text(bytes(self.buffer), self.charset, self.encoding)}
+        self._write_text(self._decoder.decode(b"", final=True), final=True)
+        self._out.close()
+        self._out = None
+        return {"path": self.path, "size": self.size}
+
+    def discard(self) -> None:
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+class MimeExtractor:
+    """
+    Jeden streamovaný průchod .eml souborem bez načtení celé zprávy do paměti.
+
+    Těla příloh se dekódují po blocích (base64, quoted-printable, 7bit/8bit)
+    přímo do souborů ve staging adresáři úložiště příloh a zároveň se počítá
+    jejich SHA-256 a velikost. Vše ostatní - hlavičky a textové části - se
+    zkopíruje do "kostry" zprávy, ze které mailparser vyčte metadata a text.
+    Paměť je tak omezená velikostí bloku a textových částí, ne velikostí příloh.
+
+    Textové části (text/plain) dekóduje extractor sám podle jejich znakové
+    sady a v pořadí zprávy je vrací v text_parts - do kostry jde jen jejich
+    hlavička, mailparser prázdnou část přeskočí. Části větší než
+    text_spill_size se převádí do UTF-8 souborů ve stagingu.
+
+    Přílohou je (stejně jako v mailparseru) koncová část s názvem souboru,
+    s Content-ID a typem jiným než text/plain a text/html, nebo text/rtf.
+    """
+
+    def __init__(self, staging_path: Path, text_spill_size: int = DEFAULT_TEXT_SPILL_SIZE):
+        self.staging_path = Path(staging_path)
+        self.text_spill_size = text_spill_size
+        self.skeleton: List[bytes] = []
+        self.attachments: List[Dict[str, Any]] = []
+        self.text_parts: List[Dict[str, Any]] = []
+        self._reader: Optional[_Reader] = None
+
+    def extract(self, eml_path: Path) -> Tuple[bytes, List[Dict[str, Any]]]:
+        """
+        Vrátí kostru zprávy (bez těl příloh) a seznam příloh. Každá příloha má
+        klíče filename, mail_content_type, content-id, content-disposition,
+        size, sha256 a path (soubor ve staging adresáři, None u prázdné přílohy).
+        """
+        self.staging_path.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(eml_path, "rb") as f:
+                self._reader = _Reader(f)
+                line = self._parse_entity([])
+                while line:
+                    # Data za koncem zprávy (poškozená struktura) - ponechat v kostře
+                    self.skeleton.append(line)
+                    line = self._reader.readline()
+        except BaseException:
+            self.discard()
+            raise
+        return b"".join(self.skeleton), self.attachments
+
+    def discard(self) -> None:
+        """Smaže soubory příloh a textových částí, které se nepoužily"""
+        for part in [*self.attachments, *self.text_parts]:
+            if part.get("path") is not None:
+                Path(part["path"]).unlink(missing_ok=True)
+
+    @staticmethod
+    def _match_boundary(line: bytes, boundaries: List[bytes]) -> Optional[Tuple[bytes, bool]]:
+        """Pokud je řádek oddělovačem některé z otevřených multipart částí, vrátí (boundary, je_konec)"""
+        if not line.startswith(b"--"):
+            return None
+        stripped = line.rstrip(b" \t\r\n")
+        for boundary in reversed(boundaries):
+            if stripped == b"--" + boundary:
+                return boundary, False
+            if stripped == b"--" + boundary + b"--":
+                return boundary, True
+        return None
+
+    def _copy_until_boundary(self, boundaries: List[bytes]) -> bytes:
+        """Zkopíruje řádky do kostry až po oddělovač, který vrátí (b'' na konci souboru)"""
+        while True:
+            line = self._reader.readline()
+            if not line or self._match_boundary(line, boundaries):
+                return line
+            self.skeleton.append(line)
+
+    def _parse_entity(self, boundaries: List[bytes]) -> bytes:
+        """
+        Zpracuje jednu část (hlavičky + tělo). Vrací řádek, kterým tělo skončilo
+        - oddělovač nadřazené multipart části, nebo b'' na konci souboru.
+        """
+        header_lines = []
+        while True:
+            line = self._reader.readline()
+            if not line:
+                break
+            if self._match_boundary(line, boundaries):
+                # Část bez těla (a bez prázdného řádku za hlavičkami)
+                self.skeleton.extend(header_lines)
+                return line
+            header_lines.append(line)
+            if not line.strip():
+                break
+        self.skeleton.extend(header_lines)
+        # Hlavičky se dekódují stejně jako v mailparseru (text UTF-8, chyby se ignorují).
+        # Výchozí policy HeaderParseru je compat32 - email.policy se neimportuje (pomalý import)
+        headers = HeaderParser().parsestr(
+            b"".join(header_lines).decode("utf-8", "ignore"), headersonly=True
+        )
+
+        if headers.get_content_maintype() == "multipart" and headers.get_boundary():
+            return self._parse_multipart(headers.get_boundary(), boundaries)
+        if headers.get_content_type() == "message/rfc822":
+            return self._parse_entity(boundaries)
+
+        # mailparser se importuje až při parsování (rychlejší start aplikace)
+        from mailparser.utils import decode_header_part
+        filename = decode_header_part(headers.get_filename())
+        content_id = headers.get("content-id") or ""
+        subtype = headers.get_content_subtype()
+        if not filename and content_id and subtype not in ("html", "plain"):
+            filename = content_id
+        elif not filename and subtype == "rtf":
+            filename = f"{uuid.uuid4().hex[:10]}.rtf"
+        if not filename:
+            if headers.get_content_type() == "text/plain":
+                return self._extract_text(headers, boundaries)
+            return self._copy_until_boundary(boundaries)
+
+        attachment = {
+            "filename": safe_filename(filename),
+            "mail_content_type": headers.get_content_type(),
+            "content-id": str(content_id),
+            "content-disposition": str(headers.get("content-disposition") or ""),
+            "size": 0,
+            "sha256": "",
+            "path": None
+        }
+        self.attachments.append(attachment)
+        encoding = str(headers.get("content-transfer-encoding") or "").strip().lower()
+        return self._extract_body(attachment, encoding, boundaries)
+
+    def _parse_multipart(self, boundary: str, boundaries: List[bytes]) -> bytes:
+        own = boundary.encode("utf-8", "ignore")
+        inner = boundaries + [own]
+        line = self._copy_until_boundary(inner)
+        while line:
+            matched, closing = self._match_boundary(line, inner)
+            if matched != own:
+                # Oddělovač nadřazené části - tato multipart část skončila bez uzavření
+                return line
+            self.skeleton.append(line)
+            if closing:
+                # Epilog až po oddělovač nadřazené části
+                return self._copy_until_boundary(boundaries)
+            line = self._parse_entity(inner)
+        return line
+
+    def _extract_text(self, headers, boundaries: List[bytes]) -> bytes:
+        """Dekóduje textovou část do text_parts (v paměti, nebo velkou do souboru)"""
+        encoding = str(headers.get("content-transfer-encoding") or "").strip().lower()
+        sink = _TextSink(self.staging_path, headers.get_content_charset(), encoding, self.text_spill_size)
+        try:
+            if encoding == "base64":
+                terminator = self._decode_base64(sink.write, boundaries)
+            else:
+                # Mimo multipart patří konec řádku na konci souboru k textu (jako v mailparseru)
+                terminator = self._decode_lines(sink.write, encoding, boundaries, keep_final_eol=not boundaries)
+            part = sink.finish()
+        except BaseException:
+            sink.discard()
+            raise
+        self.text_parts.append(part)
+        return terminator
+
+    def _extract_body(self, attachment: Dict[str, Any], encoding: str, boundaries: List[bytes]) -> bytes:
+        """Dekóduje tělo přílohy po blocích do souboru ve staging adresáři"""
+        path = self.staging_path / f"{uuid.uuid4().hex}.part"
+        attachment["path"] = path
+        digest = hashlib.sha256()
+        size = 0
+
+        with open(path, "wb") as out:
+            def write(data: bytes) -> None:
+                nonlocal size
+                if data:
+                    digest.update(data)
+                    out.write(data)
+                    size += len(data)
+
+            if encoding == "base64":
+                terminator = self._decode_base64(write, boundaries)
+            else:
+                terminator = self._decode_lines(write, encoding, boundaries)
+
+        attachment["size"] = size
+        if size:
+            attachment["sha256"] = digest.hexdigest()
+        else:
+            path.unlink(missing_ok=True)
+            attachment["path"] = None
+        return terminator
+
+    def _decode_base64(self, write, boundaries: List[bytes]) -> bytes:
+        # Base64 abeceda neobsahuje "-", oddělovač se tak hledá jen na řádcích začínajících "--"
+        pending = b""
+        while True:
+            block = self._reader.read_lines_block()
+            if not block:
+                terminator = b""
+                break
+            cut = 0 if block.startswith(b"--") else block.find(b"\n--") + 1
+            terminator = None
+            if cut > 0 or block.startswith(b"--"):
+                self._reader.unread(block[cut:])
+                block = block[:cut]
+                candidate = self._reader.readline()
+                if self._match_boundary(candidate, boundaries):
+                    terminator = candidate
+                else:
+                    # Nečistota v těle - zahodí ji filtr base64 abecedy
+                    block += candidate
+            data = pending + block.translate(None, _NOT_BASE64)
+            usable = len(data) - len(data) % 4
+            try:
+                write(binascii.a2b_base64(data[:usable]))
+            except binascii.Error:
+                pass
+            pending = data[usable:]
+            if terminator is not None:
+                break
+        if pending:
+            try:
+                write(binascii.a2b_base64(pending + b"=" * (-len(pending) % 4)))
+            except binascii.Error:
+                pass
+        return terminator
+
+    def _decode_lines(self, write, encoding: str, boundaries: List[bytes], keep_final_eol: bool = False) -> bytes:
+        # Poslední konec řádku před oddělovačem patří k oddělovači, proto se
+        # řádek zapisuje až po přečtení dalšího. Textová kódování se čtou
+        # s konci řádků \n (jako dřív v mailparseru), binary beze změny.
+        textual = encoding != "binary"
+        quoted_printable = encoding == "quoted-printable"
+        uuencoded = "uuencode" in encoding or encoding in ("uue", "x-uue")
+        previous = None
+        while True:
+            line = self._reader.readline()
+            at_end = not line or self._match_boundary(line, boundaries)
+            if previous is not None:
+                data = previous
+                if at_end and (line or not keep_final_eol):
+                    data = _strip_eol(data)
+                elif textual and data.endswith(b"\r\n"):
+                    data = data[:-2] + b"\n"
+                if uuencoded:
+                    stripped = data.strip()
+                    if stripped and not stripped.startswith(b"begin ") and stripped != b"end":
+                        try:
+                            write(binascii.a2b_uu(stripped))
+                        except binascii.Error:
+                            pass
+                elif quoted_printable:
+                    write(binascii.a2b_qp(data))
+                else:
+                    write(data)
+            if at_end:
+                return line
+            previous = line
@@ -0,0 +1,79 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class ProjectCache:
+    """
+    Cache seznamu projektů (podadresářů) v INBOX_FOLDER a v ROOT_FOLDER.
+
+    Seznam adresáře se drží v paměti spolu s mtime adresáře, ze kterého byl
+    načten. Při dotazu stačí jeden stat() - pokud se mtime nezměnilo (žádný
+    podadresář nepřibyl ani nezmizel), vrátí se uložený seznam bez procházení
+    adresáře. Vlastní zápisy (nový projekt v convert_and_save) cache zneplatní
+    explicitně přes invalidate(), nezávisle na přesnosti mtime na síťovém disku.
+    Projekt, který vytvořil jiný worker, najde find_project i před změnou
+    mtime - při chybějícím názvu se adresář ověří přímo.
+    """
+
+    def __init__(self, root_folder: str, inbox_folder: str):
+        self.root_path = Path(root_folder)
+        self.inbox_folder = inbox_folder
+        self.inbox_path = self.root_path / inbox_folder
+        self._lock = threading.Lock()
+        # adresář -> (mtime_ns, seřazené názvy podadresářů)
+        self._entries: Dict[Path, Tuple[int, List[str]]] = {}
+
+    def invalidate(self) -> None:
+        """Zahodí uložené seznamy (volá se po vytvoření nového projektu)"""
+        with self._lock:
+            self._entries.clear()
+
+    def _list_dirs(self, path: Path) -> List[str]:
+        """Vrátí seřazené názvy podadresářů (bez skrytých), cachované podle mtime adresáře"""
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+        with self._lock:
+            cached = self._entries.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+
+        with os.scandir(path) as entries:
+            names = sorted(
+                entry.name for entry in entries
+                if not entry.name.startswith('.') and entry.is_dir()
+            )
+        with self._lock:
+            self._entries[path] = (mtime_ns, names)
+        return names
+
+    def list_projects(self, include_others: bool = False) -> List[str]:
+        """
+        Projekty v INBOX_FOLDER (include_others=False), nebo všechny ostatní
+        složky v ROOT_FOLDER kromě INBOX_FOLDER (include_others=True).
+        """
+        if not include_others:
+            return list(self._list_dirs(self.inbox_path))
+        return [name for name in self._list_dirs(self.root_path) if name != self.inbox_folder]
+
+    def find_project(self, project_name: str) -> Optional[Path]:
+        """Najde adresář projektu - nejprve v INBOX_FOLDER, pak v ROOT_FOLDER"""
+        if project_name in self._list_dirs(self.inbox_path):
+            return self.inbox_path / project_name
+        if project_name != self.inbox_folder and project_name in self._list_dirs(self.root_path):
+            return self.root_path / project_name
+        # Seznam v cache nemusí znát projekt vytvořený jiným workerem (hrubé mtime
+        # na síťovém disku) - ověřit přímo a při nálezu cache zahodit
+        if not project_name or project_name.startswith('.') or os.sep in project_name:
+            return None
+        candidates = [self.inbox_path / project_name]
+        if project_name != self.inbox_folder:
+            candidates.append(self.root_path / project_name)
+        for project_path in candidates:
+            if project_path.is_dir():
+                self.invalidate()
+                return project_path
+        return None
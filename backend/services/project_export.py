@@ -0,0 +1,303 @@
+import bisect
+import hashlib
+import os
+import struct
+import tarfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from services.email_index import EmailIndex, read_front_matter
+
+
+# Podporované formáty exportu. Oba se skládají bez komprese, takže velikost
+# i obsah archivu jsou předem dané a lze z něj vracet libovolný rozsah bajtů.
+EXPORT_FORMATS = ("zip", "tar")
+
+MEDIA_TYPES = {"zip": "application/zip", "tar": "application/x-tar"}
+
+# Velikost bloku při čtení souborů do archivu
+EXPORT_CHUNK_SIZE = 1024 * 1024
+
+# Počet zapamatovaných CRC32 souborů (pro navázání přerušeného stahování zipu)
+CRC_CACHE_SIZE = 100000
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP_FLAGS = 0x0808  # CRC a velikosti za daty (data descriptor), názvy v UTF-8
+
+
+class Crc32Cache:
+    """
+    CRC32 souborů podle (zařízení, inode, velikost, mtime).
+
+    Zip potřebuje CRC každého souboru v data descriptoru a v centrálním
+    adresáři na konci archivu. Při plném stahování se CRC počítá průběžně
+    z posílaných dat; při navázání stahování (Range) se vezme odsud a soubory
+    před požadovaným rozsahem se tak nemusí číst znovu. Stejná příloha ve více
+    projektech je hardlink, takže má jediný záznam.
+    """
+
+    def __init__(self, max_size: int = CRC_CACHE_SIZE):
+        self.max_size = max_size
+        self._values: "OrderedDict[Tuple[int, int, int, int], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, int, int, int]) -> Optional[int]:
+        with self._lock:
+            value = self._values.get(key)
+            if value is not None:
+                self._values.move_to_end(key)
+            return value
+
+    def put(self, key: Tuple[int, int, int, int], value: int) -> None:
+        with self._lock:
+            self._values[key] = value
+            if len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+
+    def compute(self, entry: Dict[str, Any]) -> int:
+        """Vrátí CRC32 souboru z cache, nebo ho spočítá přečtením souboru"""
+        value = self.get(entry["key"])
+        if value is None:
+            value = 0
+            for chunk in _read_file(entry, 0, entry["size"]):
+                value = zlib.crc32(chunk, value)
+            self.put(entry["key"], value)
+        return value
+
+
+def _read_file(entry: Dict[str, Any], start: int, end: int) -> Iterator[bytes]:
+    """Vrací bajty start..end souboru, při změně velikosti od sestavení archivu vyhodí OSError"""
+    with open(entry["path"], 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(EXPORT_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise OSError(f"Soubor {entry['arcname']} se během exportu změnil")
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _entry(path: Path, arcname: str) -> Dict[str, Any]:
+    stat = path.stat()
+    return {
+        "path": path,
+        "arcname": arcname,
+        "size": stat.st_size,
+        "mtime": int(stat.st_mtime),
+        "key": (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    }
+
+
+def collect_entries(
+    project_path: Path,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    include_attachments: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Seznam souborů projektu pro export (markdown, pak přílohy, obojí seřazené).
+    Bez filtru data se exportuje celý projekt kromě skrytých souborů (indexy),
+    s filtrem jen emaily z indexu v daném rozsahu a přílohy, na které odkazují.
+    """
+    entries = []
+    attachments_path = project_path / "attachments"
+    if date_from or date_to:
+        emails = EmailIndex(project_path).list_emails(sort="date", order="asc", date_from=date_from, date_to=date_to)
+        md_names = sorted(email["filename"] for email in emails["emails"])
+        attachment_names = set()
+        for name in md_names:
+            md_path = project_path / name
+            if not md_path.is_file():
+                continue
+            entries.append(_entry(md_path, name))
+            if include_attachments:
+                front_matter = read_front_matter(md_path) or {}
+                attachment_names.update(str(att) for att in front_matter.get("attachments") or [])
+                if front_matter.get("body_file"):
+                    attachment_names.add(str(front_matter["body_file"]))
+        for name in sorted(attachment_names):
+            attachment_path = attachments_path / name
+            if Path(name).name == name and not name.startswith('.') and attachment_path.is_file():
+                entries.append(_entry(attachment_path, f"attachments/{name}"))
+        return entries
+
+    for directory, prefix in ((project_path, ""), (attachments_path, "attachments/")):
+        if directory == attachments_path and not include_attachments:
+            break
+        if not directory.is_dir():
+            continue
+        with os.scandir(directory) as scanned:
+            files = sorted(entry.name for entry in scanned if not entry.name.startswith('.') and entry.is_file())
+        entries.extend(_entry(directory / name, prefix + name) for name in files)
+    return entries
+
+
+class ProjectArchive:
+    """
+    Archiv projektu skládaný za běhu bez dočasného souboru.
+
+    Při vytvoření se z velikostí souborů spočítá rozložení archivu (hlavičky,
+    data, centrální adresář), nic se nečte. iter_range() pak vrací libovolný
+    rozsah bajtů - hlavičky se generují, data se čtou ze souborů po blocích.
+    Stejné soubory dají bajtově stejný archiv, takže ETag a Range fungují
+    i mezi požadavky (navázání přerušeného stahování).
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], archive_format: str, root_name: str, crc_cache: Crc32Cache):
+        if archive_format not in EXPORT_FORMATS:
+            raise ValueError(f"Nepodporovaný formát exportu: {archive_format}")
+        self.entries = entries
+        self.format = archive_format
+        self.root_name = root_name
+        self.crc_cache = crc_cache
+        # Segmenty archivu: (offset, velikost, druh, hodnota)
+        self._segments: List[Tuple[int, int, str, Any]] = []
+        self.size = 0
+        if archive_format == "zip":
+            self._layout_zip()
+        else:
+            self._layout_tar()
+        self._offsets = [segment[0] for segment in self._segments]
+
+        digest = hashlib.sha256(f"{archive_format}\0{root_name}".encode())
+        for entry in entries:
+            digest.update(f"\0{entry['arcname']}\0{entry['key']}".encode())
+        self.etag = f'"{digest.hexdigest()[:32]}"'
+
+    def _add(self, size: int, kind: str, value: Any) -> None:
+        if size:
+            self._segments.append((self.size, size, kind, value))
+            self.size += size
+
+    def _layout_tar(self) -> None:
+        for entry in self.entries:
+            info = tarfile.TarInfo(f"{self.root_name}/{entry['arcname']}")
+            info.size = entry["size"]
+            info.mtime = entry["mtime"]
+            info.mode = 0o644
+            self._add_bytes(info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape"))
+            self._add(entry["size"], "file", entry)
+            self._add_bytes(b"\0" * (-entry["size"] % tarfile.BLOCKSIZE))
+        # Konec archivu - dva prázdné bloky, doplněno na celý záznam
+        end = self.size + 2 * tarfile.BLOCKSIZE
+        self._add_bytes(b"\0" * (2 * tarfile.BLOCKSIZE + (-end % tarfile.RECORDSIZE)))
+
+    def _add_bytes(self, data: bytes) -> None:
+        self._add(len(data), "bytes", data)
+
+    @staticmethod
+    def _dos_datetime(mtime: int) -> Tuple[int, int]:
+        t = time.localtime(max(mtime, 315532800))  # zip neumí data před rokem 1980
+        return (
+            (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((max(t.tm_year, 1980) - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+        )
+
+    def _layout_zip(self) -> None:
+        central = []
+        for entry in self.entries:
+            name = f"{self.root_name}/{entry['arcname']}".encode("utf-8")
+            size = entry["size"]
+            large = size >= _ZIP64_LIMIT
+            offset = self.size
+            dos_time, dos_date = self._dos_datetime(entry["mtime"])
+            extra = struct.pack("<HHQQ", 1, 16, 0, 0) if large else b""
+            self._add_bytes(struct.pack(
+                "<IHHHHHIIIHH", 0x04034b50, 45 if large else 20, _ZIP_FLAGS, 0, dos_time, dos_date,
+                0, _ZIP64_LIMIT if large else 0, _ZIP64_LIMIT if large else 0, len(name), len(extra)
+            ) + name + extra)
+            self._add(size, "file", entry)
+            self._add(24 if large else 16, "lazy", lambda entry=entry, large=large: struct.pack(
+                "<IIQQ" if large else "<IIII", 0x08074b50, self.crc_cache.compute(entry), entry["size"], entry["size"]
+            ))
+            central.append((entry, name, offset, dos_time, dos_date))
+
+        central_offset = self.size
+        for entry, name, offset, dos_time, dos_date in central:
+            zip64 = entry["size"] >= _ZIP64_LIMIT or offset >= _ZIP64_LIMIT
+            extra_size = 28 if zip64 else 0
+            self._add(46 + len(name) + extra_size, "lazy", lambda entry=entry, name=name, offset=offset, zip64=zip64,
+                      dos_time=dos_time, dos_date=dos_date: self._zip_central_header(
+                          entry, name, offset, zip64, dos_time, dos_date))
+        central_size = self.size - central_offset
+
+        count = len(central)
+        if count >= 0xFFFF or central_offset >= _ZIP64_LIMIT or central_size >= _ZIP64_LIMIT:
+            zip64_end_offset = self.size
+            self._add_bytes(
+                struct.pack("<IQHHIIQQQQ", 0x06064b50, 44, 45, 45, 0, 0, count, count, central_size, central_offset)
+                + struct.pack("<IIQI", 0x07064b50, 0, zip64_end_offset, 1)
+            )
+            self._add_bytes(struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, 0xFFFF, 0xFFFF,
+                                        _ZIP64_LIMIT, _ZIP64_LIMIT, 0))
+        else:
+            self._add_bytes(struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, count, count, central_size, central_offset, 0))
+
+    def _zip_central_header(
+        self, entry: Dict[str, Any], name: bytes, offset: int, zip64: bool, dos_time: int, dos_date: int
+    ) -> bytes:
+        size = entry["size"]
+        extra = struct.pack("<HHQQQ", 1, 24, size, size, offset) if zip64 else b""
+        stored_size = _ZIP64_LIMIT if zip64 else size
+        return struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014b50, (3 << 8) | 45, 45 if zip64 else 20, _ZIP_FLAGS, 0,
+            dos_time, dos_date, self.crc_cache.compute(entry), stored_size, stored_size,
+            len(name), len(extra), 0, 0, 0, 0o100644 << 16, _ZIP64_LIMIT if zip64 else offset
+        ) + name + extra
+
+    def iter_range(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Vrací bajty archivu start..end (end včetně, None = do konce)"""
+        end = self.size - 1 if end is None else min(end, self.size - 1)
+        index = max(0, bisect.bisect_right(self._offsets, start) - 1)
+        for offset, size, kind, value in self._segments[index:]:
+            if offset > end:
+                break
+            low = max(start, offset) - offset
+            high = min(end + 1, offset + size) - offset
+            if low >= high:
+                continue
+            if kind == "bytes":
+                yield value[low:high]
+            elif kind == "lazy":
+                yield value()[low:high]
+            else:
+                yield from self._iter_file(value, low, high)
+
+    def _iter_file(self, entry: Dict[str, Any], low: int, high: int) -> Iterator[bytes]:
+        if self.format != "zip" or low != 0 or high != entry["size"] or self.crc_cache.get(entry["key"]) is not None:
+            yield from _read_file(entry, low, high)
+            return
+        # Celý soubor se posílá - CRC pro data descriptor spočítat rovnou z posílaných dat
+        crc = 0
+        for chunk in _read_file(entry, low, high):
+            crc = zlib.crc32(chunk, crc)
+            yield chunk
+        self.crc_cache.put(entry["key"], crc)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Rozsah z hlavičky Range (jen jeden rozsah bajtů) jako (start, end včetně).
+    Vrací None pro chybějící nebo nepodporovanou hlavičku (pošle se celý
+    archiv), ValueError pro rozsah mimo archiv.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if not first:
+            # Posledních N bajtů
+            length = int(last)
+            return (max(0, size - length), size - 1) if length > 0 else None
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise ValueError(f"Rozsah {header} je mimo archiv velikosti {size}")
+    return start, min(end, size - 1)
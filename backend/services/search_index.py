@@ -0,0 +1,293 @@
+import argparse
+import os
+import re
+import sqlite3
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.email_index import FRONT_MATTER_DELIMITER, yaml_loader
+
+
+# Název souboru s indexem v ROOT_FOLDER (tečka = nezobrazí se jako projekt)
+SEARCH_INDEX_FILENAME = ".search-index.sqlite"
+
+# Verze schématu - při změně se index zahodí (naplní se znovu přes --rebuild)
+SCHEMA_VERSION = 1
+
+# Text se do FTS ukládá už normalizovaný (bez diakritiky, casefold), tokenizer
+# ho proto nemusí dál upravovat
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    project_path TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    from_email TEXT NOT NULL,
+    date TEXT NOT NULL,
+    UNIQUE (project_path, filename)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    subject, addresses, body,
+    tokenize = "unicode61 remove_diacritics 0"
+);
+"""
+
+# Váhy sloupců pro bm25 (subject, addresses, body) - shoda v předmětu je nejcennější
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Z těla se indexuje jen začátek (znaky) - obří výpisy logů by index jen nafukovaly
+MAX_INDEXED_BODY_SIZE = 1024 * 1024
+
+
+def strip_diacritics(text: str) -> str:
+    """Odstraní diakritiku (NFKD rozklad bez kombinujících znaků), ostatní znaky ponechá"""
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def normalize_search_text(text: str) -> str:
+    """Normalizace pro fulltext - stejná pro indexovaný text i dotaz"""
+    return strip_diacritics(text).casefold()
+
+
+def build_match_query(query: str) -> str:
+    """
+    Převede dotaz uživatele na FTS5 výraz: všechna slova musí být v emailu
+    (AND), poslední slovo se doplňuje jako prefix (hledání při psaní).
+    Speciální syntaxe FTS5 se z dotazu nepřebírá.
+    """
+    tokens = [f'"{token}"' for token in re.findall(r"\w+", normalize_search_text(query))]
+    if tokens:
+        tokens[-1] += "*"
+    return " ".join(tokens)
+
+
+def read_email_markdown(md_path: Path) -> Optional[Tuple[Dict[str, Any], str]]:
+    """Načte front-matter i tělo markdown souboru emailu (None, pokud front-matter chybí)"""
+    lines = []
+    with open(md_path, 'rb') as f:
+        if f.readline().rstrip(b'\r\n') != FRONT_MATTER_DELIMITER:
+            return None
+        for line in f:
+            if line.rstrip(b'\r\n') == FRONT_MATTER_DELIMITER:
+                break
+            lines.append(line)
+        else:
+            return None
+        body = f.read(MAX_INDEXED_BODY_SIZE * 4).decode('utf-8', 'replace')
+    import yaml
+    front_matter = yaml.load(b''.join(lines).decode('utf-8'), Loader=yaml_loader()) or {}
+    return front_matter, body
+
+
+class SearchIndex:
+    """
+    Fulltextový index všech emailů v ROOT_FOLDER (SQLite FTS5).
+
+    Plní ho convert_and_save při uložení emailu, existující archiv se naplní
+    příkazem `python -m services.search_index --rebuild`. Předmět, adresy
+    a tělo se indexují bez diakritiky, takže "prilohy" najde i "přílohy".
+    Smazané soubory se z výsledků vyřadí při hledání.
+    """
+
+    def __init__(self, root_folder: str):
+        self.root_path = Path(root_folder)
+        self.index_path = self.root_path / SEARCH_INDEX_FILENAME
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.index_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            # Journal se jen zkracuje místo mazání - jinak by každý zápis měnil
+            # mtime ROOT_FOLDER a zneplatnil cache seznamu projektů
+            conn.execute("PRAGMA journal_mode=TRUNCATE")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                # Zámek na zápis a nové ověření - jiný worker mohl schéma právě vytvořit
+                conn.execute("BEGIN IMMEDIATE")
+                if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    conn.execute("DROP TABLE IF EXISTS documents")
+                    conn.execute("DROP TABLE IF EXISTS documents_fts")
+                    for statement in SCHEMA.split(";"):
+                        if statement.strip():
+                            conn.execute(statement)
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                conn.commit()
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _relative_project_path(self, project_path: Path) -> str:
+        return Path(project_path).relative_to(self.root_path).as_posix()
+
+    @staticmethod
+    def _upsert(
+        conn: sqlite3.Connection,
+        project_path: str,
+        filename: str,
+        front_matter: Dict[str, Any],
+        body: str
+    ) -> None:
+        subject = str(front_matter.get('subject') or '')
+        from_email = str(front_matter.get('from') or '')
+        addresses = [from_email]
+        for key in ('to', 'cc'):
+            values = front_matter.get(key) or []
+            addresses.extend(str(value) for value in values if value)
+
+        row = conn.execute(
+            "SELECT id FROM documents WHERE project_path = ? AND filename = ?", (project_path, filename)
+        ).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (row["id"],))
+            conn.execute("DELETE FROM documents WHERE id = ?", (row["id"],))
+        cursor = conn.execute(
+            "INSERT INTO documents (project_path, filename, subject, from_email, date) VALUES (?, ?, ?, ?, ?)",
+            (project_path, filename, subject, from_email, str(front_matter.get('date') or ''))
+        )
+        conn.execute(
+            "INSERT INTO documents_fts (rowid, subject, addresses, body) VALUES (?, ?, ?, ?)",
+            (
+                cursor.lastrowid,
+                normalize_search_text(subject),
+                normalize_search_text(" ".join(addresses)),
+                normalize_search_text(body[:MAX_INDEXED_BODY_SIZE])
+            )
+        )
+
+    def add(self, project_path: Path, md_path: Path, front_matter: Dict[str, Any], body: str) -> None:
+        """Zaindexuje právě uložený email (volá convert_and_save)"""
+        with self._connect() as conn:
+            self._upsert(conn, self._relative_project_path(project_path), md_path.name, front_matter, body)
+
+    def rebuild(self, project_paths: Iterable[Path]) -> int:
+        """
+        Vytvoří index znovu ze všech .md souborů v zadaných projektech.
+        Vrací počet zaindexovaných emailů.
+        """
+        count = 0
+        with self._connect() as conn:
+            conn.execute("DELETE FROM documents")
+            conn.execute("DELETE FROM documents_fts")
+            for project_path in project_paths:
+                relative_path = self._relative_project_path(project_path)
+                with os.scandir(project_path) as entries:
+                    for entry in entries:
+                        if not entry.name.endswith('.md') or not entry.is_file():
+                            continue
+                        try:
+                            parsed = read_email_markdown(Path(entry.path))
+                        except Exception as e:
+                            print(f"[WARNING] Chyba při parsování souboru {entry.path}: {str(e)}")
+                            continue
+                        if parsed is None:
+                            continue
+                        self._upsert(conn, relative_path, entry.name, *parsed)
+                        count += 1
+            conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('optimize')")
+        return count
+
+    def search(
+        self,
+        query: str,
+        project: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Vrátí emaily odpovídající dotazu seřazené podle relevance (bm25).
+
+        Args:
+            query: Hledaná slova (bez ohledu na diakritiku a velikost písmen)
+            project: Jen emaily z projektu s tímto názvem
+            offset, limit: Stránkování
+        """
+        match = build_match_query(query)
+        if not match:
+            raise ValueError("Dotaz neobsahuje žádné slovo")
+
+        if project:
+            # Filtr projektu potřebuje join s documents už při řazení. "_" a "%" jsou
+            # v LIKE zástupné znaky - v názvu projektu (a_b, _from_email) se escapují
+            escaped = project.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            filtered = (
+                "JOIN documents d ON d.id = f.rowid WHERE f.documents_fts MATCH ? "
+                "AND (d.project_path = ? OR d.project_path LIKE ? ESCAPE '\\')"
+            )
+            params: List[Any] = [match, project, f"%/{escaped}"]
+        else:
+            filtered = "WHERE f.documents_fts MATCH ?"
+            params = [match]
+
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM documents_fts f {filtered}", params).fetchone()[0]
+            # Nejdřív seřadit a oříznout v FTS5, metadata se dočtou jen pro vrácenou stránku
+            rows = conn.execute(
+                f"""
+                SELECT d.id, d.project_path, d.filename, d.subject, d.from_email, d.date, top.score
+                FROM (
+                    SELECT f.rowid AS id, bm25(documents_fts, {', '.join(str(w) for w in BM25_WEIGHTS)}) AS score
+                    FROM documents_fts f {filtered}
+                    ORDER BY score LIMIT ? OFFSET ?
+                ) AS top
+                JOIN documents d ON d.id = top.id
+                ORDER BY top.score
+                """,
+                [*params, limit, offset]
+            ).fetchall()
+
+            hits = []
+            stale = []
+            for row in rows:
+                if not (self.root_path / row["project_path"] / row["filename"]).is_file():
+                    stale.append(row["id"])
+                    continue
+                hits.append({
+                    "project": row["project_path"].rsplit('/', 1)[-1],
+                    "path": f'{row["project_path"]}/{row["filename"]}',
+                    "filename": row["filename"],
+                    "subject": row["subject"],
+                    "from": row["from_email"],
+                    "date": row["date"],
+                    "score": round(-row["score"], 3)
+                })
+            if stale:
+                # Soubor byl mezitím smazán - odebrat z indexu
+                conn.executemany("DELETE FROM documents_fts WHERE rowid = ?", [(i,) for i in stale])
+                conn.executemany("DELETE FROM documents WHERE id = ?", [(i,) for i in stale])
+        return {
+            "query": query,
+            "hits": hits,
+            "total": total - len(stale),
+            "offset": offset,
+            "limit": limit
+        }
+
+
+def main() -> None:
+    from services.project_cache import ProjectCache
+
+    parser = argparse.ArgumentParser(description="Fulltextový index emailů v ROOT_FOLDER")
+    parser.add_argument("--rebuild", action="store_true", help="vytvořit index znovu ze všech .md souborů")
+    parser.add_argument("--root-folder", default=os.getenv("ROOT_FOLDER", "/app/output"))
+    parser.add_argument("--inbox-folder", default=os.getenv("INBOX_FOLDER", "_from_email"))
+    parser.add_argument("query", nargs="*", help="hledaná slova")
+    args = parser.parse_args()
+
+    index = SearchIndex(args.root_folder)
+    if args.rebuild:
+        cache = ProjectCache(args.root_folder, args.inbox_folder)
+        project_paths = [cache.inbox_path / name for name in cache.list_projects()]
+        project_paths += [cache.root_path / name for name in cache.list_projects(include_others=True)]
+        count = index.rebuild(project_paths)
+        print(f"[INFO] Zaindexováno {count} emailů z {len(project_paths)} projektů")
+    if args.query:
+        for hit in index.search(" ".join(args.query))["hits"]:
+            print(f'{hit["score"]:8.2f}  {hit["path"]}  {hit["subject"]}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    from watchfiles import Change, awatch
+except ImportError:  # watchfiles (součást uvicorn[standard]) je volitelný - bez něj se adresář jen prochází
+    Change = None
+    awatch = None
+
+from services.durable_writes import publish_exclusive
+from services.email_processor import EmailProcessor
+from services import metrics
+from models.schemas import EmailMetadata
+
+
+# Podadresáře spoolu - rozpracované, zkonvertované a chybné soubory. Jsou na
+# stejném disku jako spool, takže přesun je atomické přejmenování.
+PROCESSING_FOLDER = ".processing"
+PROCESSED_FOLDER = "processed"
+FAILED_FOLDER = "failed"
+
+# Soubor v .processing/, jehož mtime je starší než lease, patří workeru, který
+# spadl - vrátí se do spoolu. Živý worker mtime obnovuje každou čtvrtinu lease.
+LEASE_SECONDS = 60.0
+
+# Podmínky, které může pravidlo směrování obsahovat
+ROUTE_CONDITIONS = ("from_domain", "from_email", "to", "subject")
+
+
+class UnroutableError(Exception):
+    """Zprávě nevyhovuje žádné pravidlo směrování a není nastavený výchozí projekt"""
+
+
+class SpoolRouter:
+    """
+    Směrování zpráv ze spoolu do projektů podle pravidel.
+
+    Pravidla se zkouší v pořadí a použije se první, kterému zpráva vyhoví ve
+    všech uvedených podmínkách. Hodnota podmínky je řetězec nebo seznam
+    řetězců (stačí shoda s jedním z nich):
+
+    - from_domain  doména odesílatele včetně subdomén (firma.cz i praha.firma.cz)
+    - from_email   adresa odesílatele
+    - to           adresa v To nebo Cc
+    - subject      regulární výraz hledaný v předmětu (bez ohledu na velikost písmen)
+
+    Zpráva, které nevyhoví žádné pravidlo, jde do default_project; bez něj
+    skončí ve failed/.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], default_project: str = ""):
+        self.rules = [self._compile(rule, index) for index, rule in enumerate(rules)]
+        self.default_project = default_project
+
+    @classmethod
+    def from_file(cls, path: str, default_project: str = "") -> "SpoolRouter":
+        """
+        Načte pravidla z JSON souboru - seznam pravidel, nebo objekt
+        {"default_project": ..., "rules": [...]}.
+        """
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        if isinstance(config, dict):
+            default_project = config.get("default_project") or default_project
+            config = config.get("rules", [])
+        if not isinstance(config, list):
+            raise ValueError(f"Pravidla v {path} musí být seznam")
+        return cls(config, default_project)
+
+    @staticmethod
+    def _compile(rule: Dict[str, Any], index: int) -> Dict[str, Any]:
+        if not isinstance(rule, dict) or not rule.get("project"):
+            raise ValueError(f"Pravidlo {index + 1}: chybí 'project'")
+        unknown = set(rule) - set(ROUTE_CONDITIONS) - {"project"}
+        if unknown:
+            raise ValueError(f"Pravidlo {index + 1}: neznámé podmínky {', '.join(sorted(unknown))}")
+        compiled = {"project": rule["project"]}
+        for condition in ROUTE_CONDITIONS:
+            if condition not in rule:
+                continue
+            values = rule[condition] if isinstance(rule[condition], list) else [rule[condition]]
+            if condition == "subject":
+                compiled[condition] = [re.compile(value, re.IGNORECASE) for value in values]
+            else:
+                compiled[condition] = [value.lower().lstrip('@') for value in values]
+        return compiled
+
+    @staticmethod
+    def _matches(rule: Dict[str, Any], email_data: EmailMetadata) -> bool:
+        from_email = email_data.from_email.lower()
+        from_domain = email_data.from_domain.lower()
+        if "from_domain" in rule and not any(
+            from_domain == domain or from_domain.endswith(f".{domain}") for domain in rule["from_domain"]
+        ):
+            return False
+        if "from_email" in rule and from_email not in rule["from_email"]:
+            return False
+        if "to" in rule:
+            recipients = {address.lower() for address in [*email_data.to, *email_data.cc]}
+            if recipients.isdisjoint(rule["to"]):
+                return False
+        if "subject" in rule and not any(pattern.search(email_data.subject) for pattern in rule["subject"]):
+            return False
+        return True
+
+    def route(self, email_data: EmailMetadata) -> Optional[str]:
+        """Vrátí název projektu pro zprávu, nebo None pokud ji nelze nikam zařadit"""
+        for rule in self.rules:
+            if self._matches(rule, email_data):
+                return rule["project"]
+        return self.default_project or None
+
+
+class SpoolWatcher:
+    """
+    Automatický import .eml souborů, které do sledovaného adresáře (spoolu)
+    zapisuje mailová brána.
+
+    Nové soubory se hlásí přes inotify (watchfiles), adresář se navíc prochází
+    každých poll_interval sekund - to stačí i bez watchfiles nebo na síťovém
+    disku, kde inotify nefunguje. Soubor se převezme až když se settle_seconds
+    nezměnil (brána ho mohla ještě zapisovat).
+
+    Převzetí je přejmenování do .processing/, takže soubor zpracuje jen jeden
+    pracovník. Po konverzi se přesune do processed/ (včetně duplicit, ty už
+    v archivu jsou), při chybě nebo bez pravidla směrování do failed/ spolu
+    s popisem chyby v <soubor>.error. Soubory rozpracované při pádu se vrátí
+    do spoolu, jakmile vyprší jejich lease (mtime v .processing/) - spool tak
+    může sdílet víc workerů, procesů i strojů.
+    """
+
+    def __init__(
+        self,
+        spool_folder: str,
+        processor: EmailProcessor,
+        router: SpoolRouter,
+        resolve_project_in_inbox: Callable[[str], bool],
+        inbox_folder: str,
+        workers: int = 2,
+        poll_interval: float = 5.0,
+        settle_seconds: float = 2.0,
+        force_polling: bool = False,
+        lease_seconds: float = LEASE_SECONDS
+    ):
+        self.spool_path = Path(spool_folder)
+        self.processing_path = self.spool_path / PROCESSING_FOLDER
+        self.processed_path = self.spool_path / PROCESSED_FOLDER
+        self.failed_path = self.spool_path / FAILED_FOLDER
+        self.processor = processor
+        self.router = router
+        self.resolve_project_in_inbox = resolve_project_in_inbox
+        self.inbox_folder = inbox_folder
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.lease_seconds = lease_seconds
+        self.use_inotify = awatch is not None and not force_polling
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._queue: Optional[asyncio.Queue] = None
+        # Soubory převzaté tímto procesem, kterým se obnovuje lease
+        self._claimed: Set[Path] = set()
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._queue = asyncio.Queue(maxsize=self.workers)
+        await self.processor._run_io(self._prepare)
+        self._tasks = [asyncio.create_task(self._dispatch()), asyncio.create_task(self._heartbeat())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.use_inotify:
+            self._tasks.append(asyncio.create_task(self._watch()))
+        mode = "inotify" if self.use_inotify else f"procházení každých {self.poll_interval:g} s"
+        print(f"[INFO] Spool {self.spool_path}: {self.workers} pracovníků, {mode}")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _prepare(self) -> None:
+        for path in (self.spool_path, self.processing_path, self.processed_path, self.failed_path):
+            path.mkdir(parents=True, exist_ok=True)
+
+    def _recover(self) -> None:
+        """Vrátí do spoolu soubory rozpracované workerem, který spadl (s prošlým lease)"""
+        threshold = time.time() - self.lease_seconds
+        with os.scandir(self.processing_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime >= threshold:
+                        continue
+                    original = entry.name.split("_", 1)[-1]
+                    os.rename(entry.path, self.spool_path / EmailProcessor._free_filename(self.spool_path, original))
+                except FileNotFoundError:
+                    # Soubor mezitím dokončil jeho worker nebo ho vrátil jiný worker
+                    continue
+                print(f"[WARNING] Spool {original}: rozpracovaný soubor bez živého workeru vrácen do spoolu")
+
+    def _scan(self) -> Tuple[List[Path], Optional[float]]:
+        """
+        Vrátí .eml soubory připravené ke zpracování (nejstarší první) a za kolik
+        sekund bude připravený nejbližší soubor, který se ještě zapisuje.
+        """
+        self._recover()
+        ready = []
+        next_ready = None
+        now = time.time()
+        with os.scandir(self.spool_path) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.name.lower().endswith('.eml'):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    mtime = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                wait = mtime + self.settle_seconds - now
+                if wait <= 0:
+                    ready.append((mtime, Path(entry.path)))
+                elif next_ready is None or wait < next_ready:
+                    next_ready = wait
+        return [path for _, path in sorted(ready)], next_ready
+
+    def _claim(self, path: Path) -> Optional[Path]:
+        """Přesune soubor do .processing/, vrátí None pokud ho už vzal někdo jiný"""
+        claimed = self.processing_path / f"{uuid.uuid4().hex[:12]}_{path.name}"
+        try:
+            # mtime převzetí = začátek lease. Nastavuje se před přejmenováním - soubor
+            # se v .processing/ nesmí objevit se starým mtime, jinak by ho _recover
+            # jiného workeru hned vrátil do spoolu
+            os.utime(path)
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return None
+        return claimed
+
+    async def _watch(self) -> None:
+        """Budí procházení spoolu při změnách hlášených přes inotify"""
+        def watch_filter(change, path: str) -> bool:
+            name = os.path.basename(path)
+            return change != Change.deleted and not name.startswith('.') and name.lower().endswith('.eml')
+
+        try:
+            async for _ in awatch(self.spool_path, watch_filter=watch_filter, recursive=False, debounce=200):
+                self._wakeup.set()
+        except Exception as e:
+            self.use_inotify = False
+            print(f"[WARNING] Sledování spoolu přes inotify selhalo ({str(e)}), adresář se jen prochází")
+
+    async def _dispatch(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                ready, next_ready = await self.processor._run_io(self._scan)
+                for path in ready:
+                    claimed = await self.processor._run_io(self._claim, path)
+                    if claimed is not None:
+                        self._claimed.add(claimed)
+                        await self._queue.put(claimed)
+            except Exception as e:
+                ready, next_ready = [], None
+                print(f"[ERROR] Chyba při procházení spoolu {self.spool_path}: {str(e)}")
+            timeout = self.poll_interval if next_ready is None else min(self.poll_interval, next_ready)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self) -> None:
+        while True:
+            claimed = await self._queue.get()
+            try:
+                await self._process(claimed)
+            finally:
+                self._claimed.discard(claimed)
+
+    async def _heartbeat(self) -> None:
+        """
+        Obnovuje lease převzatých souborů (ve frontě i rozpracovaných), aby je
+        jiný worker nevrátil do spoolu
+        """
+        while True:
+            await asyncio.sleep(self.lease_seconds / 4)
+            for claimed in list(self._claimed):
+                try:
+                    await self.processor._run_io(os.utime, claimed)
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    print(f"[WARNING] Nepodařilo se obnovit lease souboru {claimed.name}: {str(e)}")
+
+    async def _process(self, claimed: Path) -> None:
+        original = claimed.name.split("_", 1)[-1]
+        project_name = None
+        try:
+            email_data = await self.processor.parse_email(claimed)
+            project_name = self.router.route(email_data)
+            project_name = self.processor._normalize_project_name(project_name) if project_name else None
+            if not project_name:
+                raise UnroutableError(f"Žádné pravidlo pro odesílatele {email_data.from_email or '?'}")
+            result = await self.processor.convert_and_save(
+                claimed,
+                email_data,
+                project_name,
+                project_in_inbox=self.resolve_project_in_inbox(project_name),
+                inbox_folder=self.inbox_folder,
+                keep_eml=True
+            )
+            status, detail = 200, result["filename"]
+        except FileExistsError as e:
+            status, detail = 409, str(e)
+        except UnroutableError as e:
+            status, detail = 422, str(e)
+        except Exception as e:
+            status, detail = 500, str(e)
+        metrics.CONVERSIONS.inc(source="spool", status=str(status))
+
+        target_folder = self.failed_path if status >= 422 else self.processed_path
+        try:
+            await self.processor._run_io(self._finish, claimed, original, target_folder, None if status < 422 else detail)
+        except OSError as e:
+            print(f"[ERROR] Soubor {claimed} se nepodařilo přesunout do {target_folder.name}/: {str(e)}")
+        level = "INFO" if status < 422 else "ERROR"
+        print(f"[{level}] Spool {original} -> {project_name or '-'}: {status} {detail}")
+
+    @staticmethod
+    def _finish(claimed: Path, original: str, target_folder: Path, error: Optional[str]) -> None:
+        """
+        Přesune zpracovaný soubor do processed/ nebo failed/ (u chyby i s popisem).
+        Existující soubor se nepřepíše - stejně pojmenovaný soubor, který tam
+        mezitím přesunul jiný worker, vede k dalšímu volnému názvu.
+        """
+        stem, suffix = os.path.splitext(original)
+        counter = 1
+        while True:
+            filename = original if counter == 1 else f"{stem}_{counter}{suffix}"
+            counter += 1
+            target_path = target_folder / filename
+            error_path = target_folder / f"{filename}.error"
+            if target_path.exists():
+                continue
+            wrote_error = False
+            try:
+                if error is not None:
+                    # Popis chyby zapsat dřív než přesun - ve failed/ se .eml nikdy neobjeví bez něj
+                    with open(error_path, 'x', encoding="utf-8") as f:
+                        f.write(f"{error}\n")
+                    wrote_error = True
+                publish_exclusive(claimed, target_path)
+                return
+            except FileExistsError:
+                # Název mezitím obsadil jiný worker (nebo zbyl popis chyby po pádu)
+                if wrote_error:
+                    error_path.unlink(missing_ok=True)
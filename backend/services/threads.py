@@ -0,0 +1,113 @@
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from services.email_index import EmailIndex, FRONT_MATTER_DELIMITER
+
+
+# Úvodní řádek citace ("On ... wrote:", "Dne ... napsal(a):", "Am ... schrieb ...:")
+_ATTRIBUTION_RE = re.compile(
+    r"^\s*(On\s.+\bwrote|Dne\s.+\bnapsal(a|\(a\))?|Am\s.+\bschrieb\b.*)\s*:\s*$",
+    re.IGNORECASE
+)
+
+# Oddělovač přeposlané/citované zprávy - vše od něj dál je historie
+_ORIGINAL_MESSAGE_RE = re.compile(
+    r"^\s*-{2,}\s*(Original Message|Původní zpráva|Ursprüngliche Nachricht)\s*-{2,}\s*$",
+    re.IGNORECASE
+)
+
+# Hlavička citace z Outlooku ("From: ..." a hned za ní "Sent: ...", i s tučným **From:**)
+_OUTLOOK_FROM_RE = re.compile(r"^\s*\**\s*(From|Od)\s*:\**\s*\S", re.IGNORECASE)
+_OUTLOOK_SENT_RE = re.compile(r"^\s*\**\s*(Sent|Date|Odesláno|Datum)\s*:\**\s*\S", re.IGNORECASE)
+
+
+def strip_quoted_text(text: str) -> str:
+    """
+    Odstraní z těla odpovědi citovanou historii - řádky začínající '>' včetně
+    úvodního "On ... wrote:" a vše od oddělovače původní zprávy (Outlook,
+    "-----Original Message-----"). Vlastní text odpovědi zůstane beze změny.
+    """
+    lines = text.splitlines()
+    kept: List[str] = []
+    for index, line in enumerate(lines):
+        if _ORIGINAL_MESSAGE_RE.match(line):
+            break
+        if _OUTLOOK_FROM_RE.match(line) and any(
+            _OUTLOOK_SENT_RE.match(following) for following in lines[index + 1:index + 3]
+        ):
+            break
+        if line.lstrip().startswith('>'):
+            continue
+        kept.append(line)
+
+    # Úvodní řádek citace a prázdné řádky před ní
+    while kept and not kept[-1].strip():
+        kept.pop()
+    if kept and _ATTRIBUTION_RE.match(kept[-1]):
+        kept.pop()
+        while kept and not kept[-1].strip():
+            kept.pop()
+    # Úvodní řádek může být zalomený na dva řádky ("On Mon, ... <a@b.cz>\nwrote:")
+    elif len(kept) >= 2 and _ATTRIBUTION_RE.match(f"{kept[-2]} {kept[-1]}"):
+        del kept[-2:]
+        while kept and not kept[-1].strip():
+            kept.pop()
+
+    stripped = "\n".join(kept)
+    # Když by z odpovědi nic nezbylo (celá je citace), vrátit ji celou
+    if not stripped.strip():
+        return text
+    return f"{stripped}\n" if text.endswith("\n") else stripped
+
+
+def read_body(md_path: Path) -> str:
+    """Tělo uloženého emailu - markdown za YAML front-matter"""
+    with open(md_path, 'rb') as f:
+        content = f.read()
+    if content.startswith(FRONT_MATTER_DELIMITER):
+        lines = content.split(b'\n')
+        for index in range(1, len(lines)):
+            if lines[index].rstrip(b'\r') == FRONT_MATTER_DELIMITER:
+                content = b'\n'.join(lines[index + 1:])
+                break
+    return content.decode('utf-8', errors='replace').strip('\n')
+
+
+def build_thread(project_path: Path, thread_id: str, strip_quotes: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Načte emaily vlákna seřazené podle data i s těly (None, pokud vlákno
+    neexistuje). Se strip_quotes se z odpovědí odstraní citace předchozích
+    zpráv - první email vlákna zůstává celý.
+    """
+    messages = EmailIndex(project_path).thread_messages(thread_id)
+    if not messages:
+        return None
+    for position, message in enumerate(messages):
+        try:
+            body = read_body(project_path / message["filename"])
+        except FileNotFoundError:
+            # Smazaný mezi dotazem na index a čtením
+            body = ""
+        if strip_quotes and position > 0:
+            body = strip_quoted_text(body)
+        message["body"] = body
+    return {
+        "thread_id": thread_id,
+        "subject": messages[0]["subject"],
+        "messages": messages
+    }
+
+
+def thread_to_markdown(thread: Dict[str, Any]) -> str:
+    """Vlákno jako jeden markdown dokument (emaily za sebou s hlavičkou odesílatele a data)"""
+    parts = [f"# {thread['subject'] or '(bez předmětu)'}\n"]
+    for message in thread["messages"]:
+        parts.append(f"## {message['from'] or '?'} — {message['date']}\n")
+        if message["subject"] != thread["subject"]:
+            parts.append(f"**Předmět:** {message['subject']}\n")
+        if message["attachments"]:
+            parts.append(f"*Příloh: {message['attachments']}* ([{message['filename']}]({message['filename']}))\n")
+        parts.append(f"{message['body']}\n")
+        parts.append("---\n")
+    return "\n".join(parts)
@@ -0,0 +1,127 @@
+import hashlib
+import importlib.util
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Pillow je volitelný - bez něj se místo náhledu vrací originál. Importuje se
+# až při prvním náhledu, start aplikace na něj nečeká.
+PILLOW_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+
+# Adresář cache náhledů v ROOT_FOLDER (tečka = nezobrazí se jako projekt)
+THUMBNAIL_FOLDER = ".thumbnails"
+
+# Povolené velikosti náhledu (delší strana v px) - pevná sada omezuje velikost cache
+THUMBNAIL_SIZES = (128, 256, 512)
+DEFAULT_THUMBNAIL_SIZE = 256
+
+# Přípony souborů, ze kterých se náhled vytváří
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".tif", ".tiff")
+
+JPEG_QUALITY = 80
+
+# Počet zapamatovaných SHA-256 obsahu příloh (podle inode, velikosti a mtime)
+HASH_CACHE_SIZE = 4096
+
+# Velikost bloku pro počítání SHA-256
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class UnsupportedImageError(Exception):
+    """Soubor nejde načíst jako obrázek (poškozený, nepodporovaný formát, příliš velký)"""
+
+
+def thumbnails_available() -> bool:
+    return PILLOW_AVAILABLE
+
+
+def render_thumbnail(image_path: Path, target_base: Path, size: int) -> Path:
+    """
+    Vytvoří náhled obrázku (delší strana max. size px) a vrátí jeho cestu.
+    Obrázky s průhledností se ukládají jako PNG, ostatní jako JPEG - přípona
+    se doplní k target_base. Funkce je na úrovni modulu, aby ji šlo spustit
+    v procesovém poolu.
+    """
+    from PIL import Image, ImageOps
+    try:
+        with Image.open(image_path) as original:
+            # JPEG se rovnou dekóduje ve zmenšeném měřítku (zlomek času a paměti)
+            original.draft("RGB", (size, size))
+            image = ImageOps.exif_transpose(original)
+            image.thumbnail((size, size))
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise UnsupportedImageError(f"Soubor {image_path.name} nejde načíst jako obrázek: {str(e)}")
+
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        target_path = target_base.with_suffix(".png")
+        options = {"format": "PNG", "optimize": True}
+    else:
+        image = image.convert("RGB")
+        target_path = target_base.with_suffix(".jpg")
+        options = {"format": "JPEG", "quality": JPEG_QUALITY, "optimize": True}
+
+    # Zápis přes dočasný soubor - souběžný požadavek nikdy nevidí nedopsaný náhled
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = target_path.parent / f".{uuid.uuid4().hex}.tmp"
+    try:
+        image.save(temp_path, **options)
+        os.replace(temp_path, target_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return target_path
+
+
+class ThumbnailCache:
+    """
+    Cache náhledů obrázkových příloh na disku (`.thumbnails/ab/<sha256>_<size>.jpg`).
+
+    Klíčem je SHA-256 obsahu, takže stejný obrázek ve více emailech nebo
+    projektech (sdílený blob v úložišti příloh) má jediný náhled. SHA-256 se
+    pro každý soubor počítá jen jednou - pamatuje se podle inode, velikosti
+    a mtime. Adresář lze kdykoliv smazat, náhledy se vytvoří znovu.
+    """
+
+    def __init__(self, root_folder: str):
+        self.cache_path = Path(root_folder) / THUMBNAIL_FOLDER
+        self._hashes: "OrderedDict[Tuple[int, int, int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def content_hash(self, path: Path) -> str:
+        stat = path.stat()
+        key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            sha256 = self._hashes.get(key)
+            if sha256 is not None:
+                self._hashes.move_to_end(key)
+                return sha256
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+
+        with self._lock:
+            self._hashes[key] = sha256
+            if len(self._hashes) > HASH_CACHE_SIZE:
+                self._hashes.popitem(last=False)
+        return sha256
+
+    def target_base(self, sha256: str, size: int) -> Path:
+        """Cesta náhledu bez přípony (tu určí render_thumbnail podle průhlednosti)"""
+        return self.cache_path / sha256[:2] / f"{sha256}_{size}"
+
+    def lookup(self, image_path: Path, size: int) -> Tuple[str, Optional[Path]]:
+        """Vrátí (SHA-256 obsahu, cesta k existujícímu náhledu nebo None)"""
+        sha256 = self.content_hash(image_path)
+        base = self.target_base(sha256, size)
+        for suffix in (".jpg", ".png"):
+            candidate = base.with_suffix(suffix)
+            if candidate.exists():
+                return sha256, candidate
+        return sha256, None
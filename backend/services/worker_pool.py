@@ -0,0 +1,111 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Callable, Optional
+
+
+class PoolBusyError(Exception):
+    """Fronta konverzí je plná - klient má požadavek zopakovat později"""
+
+
+class WorkerPool:
+    """
+    Pool pracovníků pro konverzi emailů.
+
+    - CPU náročná práce (parsování .eml, HTML -> Markdown) běží v procesech,
+      aby neblokovala event loop ani GIL ostatních požadavků.
+    - Souborové I/O běží ve vláknech.
+    - Počet rozpracovaných konverzí je omezen na max_pending, další požadavky
+      jsou okamžitě odmítnuty (PoolBusyError) místo hromadění v paměti.
+
+    Pokud je processes=0, CPU práce běží ve vláknovém poolu (vhodné pro vývoj
+    a prostředí bez podpory procesů).
+    """
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        io_threads: int = 4,
+        max_pending: Optional[int] = None
+    ):
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.io_threads = max(1, io_threads)
+        self.max_pending = max_pending if max_pending is not None else max(1, self.processes) * 4
+        self.pending = 0
+        self._cpu_executor: Optional[Executor] = None
+        self._io_executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_cpu_executor(self) -> Executor:
+        # Executory se vytváří líně, až při první konverzi
+        if self._cpu_executor is None:
+            if self.processes > 0:
+                # spawn - bezpečné i při běžících vláknech uvicornu
+                self._cpu_executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._cpu_executor = ThreadPoolExecutor(
+                    max_workers=self.io_threads,
+                    thread_name_prefix="convert-cpu"
+                )
+        return self._cpu_executor
+
+    def _get_io_executor(self) -> ThreadPoolExecutor:
+        if self._io_executor is None:
+            self._io_executor = ThreadPoolExecutor(
+                max_workers=self.io_threads,
+                thread_name_prefix="convert-io"
+            )
+        return self._io_executor
+
+    async def run_cpu(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Spustí CPU náročnou funkci v procesovém poolu (func musí jít picklovat)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_cpu_executor(), partial(func, *args, **kwargs))
+
+    async def run_io(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Spustí blokující souborové I/O ve vláknovém poolu"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_io_executor(), partial(func, *args, **kwargs))
+
+    async def warm_up(self, func: Callable) -> None:
+        """
+        Spustí pracovníky předem a v každém procesu zavolá func (např. import
+        knihoven konverze), aby na to nečekala první konverze. Ve vláknovém
+        režimu stačí jedno volání - vlákna sdílí importované moduly.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_cpu_executor()
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, func) for _ in range(max(1, self.processes))
+        ))
+
+    @asynccontextmanager
+    async def slot(self, count: int = 1):
+        """
+        Rezervuje místo ve frontě konverzí po dobu zpracování jednoho emailu
+        (nebo count míst pro count souběžných konverzí dávky).
+        Vyhodí PoolBusyError, pokud ve frontě tolik volných míst není.
+        """
+        if self.pending + count > self.max_pending:
+            raise PoolBusyError(
+                f"Server zpracovává maximum konverzí ({self.max_pending}), zkuste to později"
+            )
+        self.pending += count
+        try:
+            yield
+        finally:
+            self.pending -= count
+
+    def shutdown(self) -> None:
+        """Ukončí všechny pracovníky (volá se při vypnutí aplikace)"""
+        if self._cpu_executor is not None:
+            self._cpu_executor.shutdown(wait=True, cancel_futures=True)
+            self._cpu_executor = None
+        if self._io_executor is not None:
+            self._io_executor.shutdown(wait=True, cancel_futures=True)
+            self._io_executor = None
@@ -12,6 +12,7 @@ class App {
   constructor() {
     this.state = {
       status: 'idle', // 'idle' | 'converting' | 'success' | 'error'
+      batch: false, // true při dávkové konverzi (více souborů, zip, mbox)
       projectName: '',
       version: null
     };
@@ -61,7 +62,7 @@ class App {
   initComponents() {
     // Dropzone
     const dropzoneContainer = document.getElementById('dropzone-container');
-    this.dropzone = new Dropzone(dropzoneContainer, (file) => this.handleFileDrop(file));
+    this.dropzone = new Dropzone(dropzoneContainer, (files) => this.handleFilesDrop(files));
 
     // Processing Status
     const processingOverlay = document.getElementById('processing-overlay');
@@ -126,37 +127,42 @@ class App {
     }
   }
 
-  async handleFileDrop(file) {
-    if (!file.name.endsWith('.eml')) {
-      alert('Prosím nahrajte pouze .eml soubory');
-      return;
-    }
-
+  async handleFilesDrop(files) {
     if (!this.state.projectName || !this.state.projectName.trim()) {
       alert('Prosím zadejte název projektu');
       return;
     }
 
+    // Jeden .eml soubor jde přes /api/convert-email, ostatní dávkově
+    const isSingleEml = files.length === 1 && files[0].name.toLowerCase().endsWith('.eml');
+
     try {
-      this.setState({ status: 'converting' });
+      this.setState({ status: 'converting', batch: !isSingleEml });
       this.messageBanner.hide();
 
-      // Použít REST API pro všechny soubory
-      await this.sendFileViaREST(file);
+      if (isSingleEml) {
+        await this.sendFileViaREST(files[0]);
+      } else {
+        await this.sendFilesViaBatch(files);
+      }
     } catch (error) {
       console.error('Chyba při zpracování:', error);
-      this.setState({ status: 'idle' });
+      this.setState({ status: 'idle', batch: false });
       const errorMsg = error.message || 'Nastala chyba při zpracování emailu';
       this.messageBanner.showError(errorMsg);
     }
   }
 
+  /**
+   * Jeden email - upload se zařadí do fronty (POST /api/jobs) a průběh
+   * konverze se sleduje přes Server-Sent Events
+   */
   async sendFileViaREST(file) {
     const formData = new FormData();
     formData.append('file', file);
     formData.append('project_name', this.state.projectName.trim());
 
-    const response = await fetch('/api/convert-email', {
+    const response = await fetch('/api/jobs', {
       method: 'POST',
       body: formData
     });
@@ -166,11 +172,115 @@ class App {
       throw new Error(errorData.detail || `HTTP ${response.status}: ${response.statusText}`);
     }
 
-    const result = await response.json();
+    const job = await this.waitForJob(await response.json());
+    if (job.status !== 'done') {
+      throw new Error(job.error || 'Nastala chyba při zpracování emailu');
+    }
+
     this.setState({ status: 'idle' });
-    const message = `Email byl úspěšně uložen: ${result.filename}`;
+    const message = `Email byl úspěšně uložen: ${job.result.filename}`;
     this.messageBanner.showSuccess(message);
     
+    await this.refreshLists();
+  }
+
+  /**
+   * Čeká na dokončení úlohy a průběžně zobrazuje její fázi
+   */
+  waitForJob(job) {
+    return new Promise((resolve, reject) => {
+      const events = new EventSource(`/api/jobs/${job.job_id}/events`);
+      events.onmessage = (event) => {
+        const current = JSON.parse(event.data);
+        this.processingStatus.setStage(current);
+        if (current.status === 'done' || current.status === 'failed') {
+          events.close();
+          resolve(current);
+        }
+      };
+      events.onerror = () => {
+        // Spojení se přerušilo - dotázat se na stav úlohy přímo
+        events.close();
+        fetch(`/api/jobs/${job.job_id}`)
+          .then((response) => (response.ok ? response.json() : Promise.reject(new Error(`HTTP ${response.status}`))))
+          .then((current) => (current.status === 'done' || current.status === 'failed'
+            ? resolve(current)
+            : this.waitForJob(current).then(resolve, reject)))
+          .catch(reject);
+      };
+    });
+  }
+
+  /**
+   * Dávková konverze - odpověď je NDJSON stream s výsledkem pro každý email
+   * a souhrnem na konci
+   */
+  async sendFilesViaBatch(files) {
+    const formData = new FormData();
+    files.forEach((file) => formData.append('files', file));
+    formData.append('project_name', this.state.projectName.trim());
+
+    const response = await fetch('/api/convert-batch', {
+      method: 'POST',
+      body: formData
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.detail || `HTTP ${response.status}: ${response.statusText}`);
+    }
+
+    const progress = { total: 0, succeeded: 0, duplicates: 0, failed: 0 };
+    const errors = [];
+    let summary = null;
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    const handleLine = (line) => {
+      if (!line.trim()) return;
+      const item = JSON.parse(line);
+      if (item.done) {
+        summary = item;
+        return;
+      }
+      progress.total += 1;
+      if (item.status === 200) {
+        progress.succeeded += 1;
+      } else if (item.status === 409) {
+        progress.duplicates += 1;
+      } else {
+        progress.failed += 1;
+        errors.push(`${item.source}: ${item.detail}`);
+      }
+      this.processingStatus.setProgress(progress);
+    };
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      lines.forEach(handleLine);
+    }
+    handleLine(buffer);
+
+    this.setState({ status: 'idle', batch: false });
+    const result = summary || progress;
+    const message = `Zpracováno ${result.total} emailů: uloženo ${result.succeeded}, `
+      + `duplicit ${result.duplicates}, chyb ${result.failed}`;
+    if (result.failed > 0) {
+      console.error('Chyby dávkové konverze:', errors);
+      this.messageBanner.showError(message);
+    } else {
+      this.messageBanner.showSuccess(message);
+    }
+
+    await this.refreshLists();
+  }
+
+  async refreshLists() {
     // Aktualizovat seznam projektů po úspěšném uložení
     if (this.projectList) {
       await this.projectList.loadProjects();
@@ -199,7 +309,7 @@ class App {
 
     // Zobrazit/skrýt processing overlay
     if (this.state.status === 'converting') {
-      this.processingStatus.render('converting');
+      this.processingStatus.render(this.state.batch ? 'batch' : 'converting');
       this.processingStatus.show();
       if (this.dropzone) {
         this.dropzone.setEnabled(false);
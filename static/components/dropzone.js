@@ -1,10 +1,15 @@
+// Podporované soubory - .eml jednotlivě, .zip a .mbox pro dávkový import
+const ACCEPTED_EXTENSIONS = ['.eml', '.zip', '.mbox'];
+
+const isAccepted = (file) => ACCEPTED_EXTENSIONS.some((ext) => file.name.toLowerCase().endsWith(ext));
+
 /**
  * Dropzone komponenta pro drag & drop upload
  */
 export class Dropzone {
-  constructor(container, onFileDrop) {
+  constructor(container, onFilesDrop) {
     this.container = container;
-    this.onFileDrop = onFileDrop;
+    this.onFilesDrop = onFilesDrop;
     this.isDragging = false;
     this.init();
   }
@@ -19,16 +24,17 @@ export class Dropzone {
       <div class="dropzone" id="dropzone">
         <div class="dropzone-content">
           <div class="dropzone-icon">📧</div>
-          <h2 class="dropzone-title">Přetáhněte .eml soubor sem</h2>
-          <p class="dropzone-subtitle">nebo klikněte pro výběr souboru</p>
+          <h2 class="dropzone-title">Přetáhněte .eml soubory sem</h2>
+          <p class="dropzone-subtitle">nebo klikněte pro výběr souborů (také .zip nebo .mbox)</p>
           <input
             type="file"
-            accept=".eml"
+            accept="${ACCEPTED_EXTENSIONS.join(',')}"
             class="dropzone-input"
             id="file-input"
+            multiple
           />
           <label for="file-input" class="dropzone-button">
-            Vybrat soubor
+            Vybrat soubory
           </label>
         </div>
       </div>
@@ -65,22 +71,21 @@ export class Dropzone {
     this.isDragging = false;
     this.dropzone.classList.remove('dragging');
 
-    const files = Array.from(e.dataTransfer.files);
-    const emlFile = files.find(f => f.name.endsWith('.eml'));
+    const files = Array.from(e.dataTransfer.files).filter(isAccepted);
 
-    if (emlFile) {
-      this.onFileDrop(emlFile);
+    if (files.length > 0) {
+      this.onFilesDrop(files);
     } else {
-      alert('Prosím nahrajte pouze .eml soubory');
+      alert('Prosím nahrajte pouze .eml, .zip nebo .mbox soubory');
     }
   }
 
   handleFileInput(e) {
-    const file = e.target.files[0];
-    if (file && file.name.endsWith('.eml')) {
-      this.onFileDrop(file);
+    const files = Array.from(e.target.files).filter(isAccepted);
+    if (files.length > 0) {
+      this.onFilesDrop(files);
     } else {
-      alert('Prosím vyberte .eml soubor');
+      alert('Prosím vyberte .eml, .zip nebo .mbox soubory');
     }
     // Reset input
     e.target.value = '';
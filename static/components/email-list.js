@@ -1,46 +1,108 @@
 /**
  * Komponenta pro zobrazení seznamu emailů v projektu
  */
+const PAGE_SIZE = 50;
+
+// Sloupce tabulky a jim odpovídající klíče řazení na serveru
+const COLUMNS = [
+  { sort: 'date', label: 'Datum' },
+  { sort: 'from', label: 'Odesílatel' },
+  { sort: 'subject', label: 'Předmět' }
+];
+
 export class EmailList {
   constructor(container) {
     this.container = container;
     this.emails = [];
+    this.total = 0;
+    this.projectName = '';
+    this.sort = 'date';
+    this.order = 'desc';
+    this.filters = {
+      date_from: '',
+      date_to: '',
+      domain: '',
+      has_attachments: ''
+    };
   }
 
+  buildUrl(offset) {
+    const params = new URLSearchParams({
+      offset: String(offset),
+      limit: String(PAGE_SIZE),
+      sort: this.sort,
+      order: this.order
+    });
+    Object.entries(this.filters).forEach(([key, value]) => {
+      if (value) params.set(key, value);
+    });
+    return `/api/projects/${encodeURIComponent(this.projectName)}/emails?${params}`;
+  }
+
+  /**
+   * Načte první stránku emailů projektu (se stávajícím řazením a filtry)
+   */
   async loadEmails(projectName) {
+    if (projectName !== this.projectName) {
+      this.projectName = projectName;
+      this.filters = { date_from: '', date_to: '', domain: '', has_attachments: '' };
+    }
     if (!projectName) {
-      this.render([]);
+      this.clear();
       return;
     }
+    this.emails = [];
+    await this.loadPage();
+  }
 
+  /**
+   * Načte další stránku a připojí ji za již zobrazené emaily
+   */
+  async loadPage() {
     try {
-      const response = await fetch(`/api/projects/${encodeURIComponent(projectName)}/emails`);
+      const response = await fetch(this.buildUrl(this.emails.length));
       if (!response.ok) {
         if (response.status === 404) {
           // Projekt neexistuje nebo nemá emaily
-          this.render([]);
+          this.clear();
           return;
         }
         throw new Error('Nepodařilo se načíst emaily');
       }
       const data = await response.json();
-      this.emails = data.emails || [];
+      this.emails = this.emails.concat(data.emails || []);
+      this.total = data.total || 0;
       this.render(this.emails);
     } catch (error) {
       console.error('Chyba při načítání emailů:', error);
       this.emails = [];
+      this.total = 0;
       this.render([]);
     }
   }
 
+  changeSort(sort) {
+    if (this.sort === sort) {
+      this.order = this.order === 'desc' ? 'asc' : 'desc';
+    } else {
+      this.sort = sort;
+      this.order = sort === 'date' ? 'desc' : 'asc';
+    }
+    this.loadEmails(this.projectName);
+  }
+
+  hasFilters() {
+    return Object.values(this.filters).some((value) => value);
+  }
+
   render(emails) {
     if (!this.container) {
       console.error('EmailList: container is null');
       return;
     }
 
-    // Skrýt boxík pokud není žádný email
-    if (emails.length === 0) {
+    // Skrýt boxík pokud není žádný email (a není aktivní filtr, který by šel zrušit)
+    if (emails.length === 0 && !this.hasFilters()) {
       this.container.innerHTML = '';
       this.container.style.display = 'none';
       return;
@@ -75,25 +137,67 @@ export class EmailList {
       `)
       .join('');
 
+    const headersHtml = COLUMNS
+      .map((column) => {
+        const arrow = this.sort === column.sort ? (this.order === 'desc' ? ' ▼' : ' ▲') : '';
+        return `<th class="email-table-header email-table-sortable" data-sort="${column.sort}">${column.label}${arrow}</th>`;
+      })
+      .join('');
+
+    const moreHtml = emails.length < this.total
+      ? `<button type="button" class="email-list-more">Načíst další (${emails.length} z ${this.total})</button>`
+      : '';
+
     this.container.innerHTML = `
       <div class="email-list box">
-        <h3 class="email-list-title">Seznam emailů</h3>
+        <h3 class="email-list-title">Seznam emailů (${this.total})</h3>
+        <form class="email-list-filters">
+          <input type="date" name="date_from" value="${this.escapeHtml(this.filters.date_from)}" title="Od data" />
+          <input type="date" name="date_to" value="${this.escapeHtml(this.filters.date_to)}" title="Do data" />
+          <input type="text" name="domain" value="${this.escapeHtml(this.filters.domain)}" placeholder="Doména odesílatele" />
+          <select name="has_attachments">
+            <option value="" ${this.filters.has_attachments === '' ? 'selected' : ''}>Přílohy: vše</option>
+            <option value="true" ${this.filters.has_attachments === 'true' ? 'selected' : ''}>S přílohami</option>
+            <option value="false" ${this.filters.has_attachments === 'false' ? 'selected' : ''}>Bez příloh</option>
+          </select>
+        </form>
         <div class="email-list-content">
           <table class="email-table">
             <thead>
               <tr>
-                <th class="email-table-header">Datum</th>
-                <th class="email-table-header">Odesílatel</th>
-                <th class="email-table-header">Předmět</th>
+                ${headersHtml}
               </tr>
             </thead>
             <tbody>
               ${emailsHtml}
             </tbody>
           </table>
+          ${moreHtml}
         </div>
       </div>
     `;
+
+    this.attachEvents();
+  }
+
+  attachEvents() {
+    this.container.querySelectorAll('.email-table-sortable').forEach((header) => {
+      header.addEventListener('click', () => this.changeSort(header.dataset.sort));
+    });
+
+    const form = this.container.querySelector('.email-list-filters');
+    if (form) {
+      form.addEventListener('change', (e) => {
+        this.filters[e.target.name] = e.target.value.trim();
+        this.loadEmails(this.projectName);
+      });
+      form.addEventListener('submit', (e) => e.preventDefault());
+    }
+
+    const moreButton = this.container.querySelector('.email-list-more');
+    if (moreButton) {
+      moreButton.addEventListener('click', () => this.loadPage());
+    }
   }
 
   escapeHtml(text) {
@@ -104,6 +208,8 @@ export class EmailList {
 
   clear() {
     this.emails = [];
+    this.total = 0;
+    this.filters = { date_from: '', date_to: '', domain: '', has_attachments: '' };
     this.render([]);
   }
 }
@@ -5,8 +5,37 @@ export class ProcessingStatus {
   constructor(container) {
     this.container = container;
     this.statusMessages = {
-      converting: 'Konvertuji email do markdown...'
+      converting: 'Konvertuji email do markdown...',
+      batch: 'Konvertuji emaily do markdown...'
     };
+    this.stageMessages = {
+      queued: 'Čeká ve frontě',
+      parsing: 'Načítám email',
+      saving: 'Ukládám markdown a přílohy'
+    };
+  }
+
+  /**
+   * Zobrazí fázi úlohy z fronty konverzí pod nadpisem
+   */
+  setStage(job) {
+    const progressEl = this.container.querySelector('.processing-progress');
+    if (!progressEl) return;
+    const message = this.stageMessages[job.stage];
+    if (!message) return;
+    progressEl.textContent = job.stage === 'queued' && job.position
+      ? `${message} (před ním ${job.position})`
+      : `${message}...`;
+  }
+
+  /**
+   * Zobrazí průběh dávkové konverze pod nadpisem
+   */
+  setProgress(progress) {
+    const progressEl = this.container.querySelector('.processing-progress');
+    if (!progressEl) return;
+    progressEl.textContent = `Zpracováno ${progress.total} emailů `
+      + `(uloženo ${progress.succeeded}, duplicit ${progress.duplicates}, chyb ${progress.failed})`;
   }
 
   render(status = 'converting') {
@@ -17,6 +46,7 @@ export class ProcessingStatus {
         <div class="processing-content">
           <div class="spinner"></div>
           <h2 class="processing-title">${message}</h2>
+          <p class="processing-progress"></p>
         </div>
       </div>
     `;